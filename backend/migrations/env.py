@@ -5,7 +5,7 @@ from sqlalchemy import engine_from_config, pool
 from alembic import context
 
 from src.models import *  # This will import all models
-from src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.src.core.database import Base
+from src.core.database import Base
 from src.core.config import settings
 
 # Load environment variables
@@ -21,11 +21,7 @@ if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
 # Update database URL from environment
-config.set_main_option(
-    "sqlalchemy.url",
-    f"postgresql://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}@"
-    f"{settings.POSTGRES_HOST}:{settings.POSTGRES_PORT}/{settings.POSTGRES_DB}"
-)
+config.set_main_option("sqlalchemy.url", str(settings.SQLALCHEMY_DATABASE_URI))
 
 # add your model's MetaData object here
 # for 'autogenerate' support
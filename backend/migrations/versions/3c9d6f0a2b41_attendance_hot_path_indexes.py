@@ -0,0 +1,135 @@
+"""attendance hot path indexes
+
+Revision ID: 3c9d6f0a2b41
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9d6f0a2b41'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns, unique, where)
+INDEXES = [
+    ("uq_student_attendances_student_date_period", "student_attendances",
+     ["student_id", "date", "period_number"], True, None),
+    ("ix_student_attendances_student_history", "student_attendances",
+     ["student_id", "date", sa.text("coalesce(period_number, 0)"), "id"], False, None),
+    ("ix_student_attendances_student_subject_date", "student_attendances",
+     ["student_id", "subject_id", "date"], False, None),
+    ("ix_students_class_section_id", "students",
+     ["class_section_id"], False, None),
+    ("ix_attendance_audit_logs_attendance_id", "attendance_audit_logs",
+     ["attendance_id"], False, None),
+    ("ix_qr_code_attendances_qr_code", "qr_code_attendances",
+     ["qr_code"], False, None),
+    ("ix_offline_attendance_syncs_pending", "offline_attendance_syncs",
+     ["created_at"], False, "sync_status = 'PENDING'"),
+    ("ix_offline_attendance_syncs_processing", "offline_attendance_syncs",
+     ["claimed_at"], False, "sync_status = 'PROCESSING'"),
+    ("ix_attendance_daily_rollup_student_date", "attendance_daily_rollup",
+     ["student_id", "date"], False, None),
+    ("ix_attendance_daily_rollup_class_section_date", "attendance_daily_rollup",
+     ["class_section_id", "date"], False, None),
+    ("ix_attendance_daily_rollup_subject_date", "attendance_daily_rollup",
+     ["subject_id", "date"], False, None),
+]
+
+def upgrade() -> None:
+    # Tables were created by init_db's create_all before migrations existed,
+    # so bring columns added since then up to date first.
+    op.execute("ALTER TABLE student_attendances ADD COLUMN IF NOT EXISTS device_id VARCHAR")
+    op.execute("ALTER TABLE student_attendances ADD COLUMN IF NOT EXISTS local_id VARCHAR")
+    op.execute("ALTER TABLE offline_attendance_syncs ADD COLUMN IF NOT EXISTS device_id VARCHAR")
+    op.execute("ALTER TABLE offline_attendance_syncs ADD COLUMN IF NOT EXISTS sync_result JSON")
+    op.execute("ALTER TABLE offline_attendance_syncs ADD COLUMN IF NOT EXISTS submitted_by INTEGER REFERENCES staff (id)")
+    op.execute("ALTER TABLE offline_attendance_syncs ADD COLUMN IF NOT EXISTS ip_address VARCHAR")
+    op.execute("ALTER TABLE offline_attendance_syncs ADD COLUMN IF NOT EXISTS user_agent VARCHAR")
+    op.execute("ALTER TABLE offline_attendance_syncs ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP WITHOUT TIME ZONE")
+
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("attendance_daily_rollup"):
+        op.create_table(
+            "attendance_daily_rollup",
+            sa.Column("id", sa.Integer(), primary_key=True, index=True),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("class_section_id", sa.Integer(), sa.ForeignKey("class_sections.id"), nullable=True),
+            sa.Column("subject_id", sa.Integer(), sa.ForeignKey("subjects.id"), nullable=True),
+            sa.Column("student_id", sa.Integer(), sa.ForeignKey("students.id"), nullable=False),
+            sa.Column("present_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("absent_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("late_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("excused_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+            sa.UniqueConstraint(
+                "date", "class_section_id", "subject_id", "student_id",
+                name="uq_attendance_daily_rollup_key",
+                postgresql_nulls_not_distinct=True
+            ),
+        )
+
+    unique_constraints = {
+        constraint["name"]
+        for constraint in sa.inspect(bind).get_unique_constraints("student_attendances")
+    }
+    if "uq_student_attendances_device_local" not in unique_constraints:
+        op.create_unique_constraint(
+            "uq_student_attendances_device_local",
+            "student_attendances",
+            ["device_id", "local_id"]
+        )
+
+    duplicates = bind.execute(sa.text(
+        "SELECT count(*) FROM ("
+        " SELECT 1 FROM student_attendances"
+        " GROUP BY student_id, date, period_number HAVING count(*) > 1"
+        ") AS d"
+    )).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f"{duplicates} (student_id, date, period_number) groups have more than "
+            "one attendance mark; resolve them before applying this migration"
+        )
+
+    # Present when init_db's create_all built the tables from the models;
+    # CONCURRENTLY is rejected on partitioned tables even with IF NOT EXISTS
+    existing_indexes = set(bind.execute(sa.text("SELECT indexname FROM pg_indexes")).scalars())
+
+    # Build concurrently so marking is not blocked on large tables
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique, where in INDEXES:
+            if name in existing_indexes:
+                continue
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=unique,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None
+            )
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _, _ in reversed(INDEXES):
+            if table == "attendance_daily_rollup":
+                continue  # dropped with the table
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+
+    op.drop_table("attendance_daily_rollup")
+    op.execute(
+        "ALTER TABLE student_attendances DROP CONSTRAINT IF EXISTS uq_student_attendances_device_local"
+    )
+    for column in ("local_id", "device_id"):
+        op.drop_column("student_attendances", column)
+    for column in ("claimed_at", "user_agent", "ip_address", "submitted_by", "sync_result", "device_id"):
+        op.drop_column("offline_attendance_syncs", column)
@@ -0,0 +1,35 @@
+"""attendance class section
+
+Revision ID: 4f1c8a6e3b97
+Revises: 9e4b7c2a6d18
+Create Date: 2026-10-18 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f1c8a6e3b97'
+down_revision: Union[str, None] = '9e4b7c2a6d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.execute(
+        "ALTER TABLE student_attendances ADD COLUMN IF NOT EXISTS class_section_id INTEGER"
+        " REFERENCES class_sections (id)"
+    )
+    # Existing marks take the student's current section, which is what the
+    # rollup counted them under; run rebuild_attendance_rollup afterwards to
+    # realign counters for students that have moved since
+    op.execute(
+        "UPDATE student_attendances AS a SET class_section_id = s.class_section_id"
+        " FROM students AS s"
+        " WHERE s.id = a.student_id AND a.class_section_id IS NULL"
+    )
+
+def downgrade() -> None:
+    op.drop_column("student_attendances", "class_section_id")
@@ -0,0 +1,37 @@
+"""attendance report indexes
+
+Revision ID: 6a2d9f4c8e15
+Revises: 4f1c8a6e3b97
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a2d9f4c8e15'
+down_revision: Union[str, None] = '4f1c8a6e3b97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # Partitioned parent, so not CONCURRENTLY; each partition gets its own index
+    op.create_index(
+        "ix_student_attendances_section_date",
+        "student_attendances",
+        ["class_section_id", "date"],
+        if_not_exists=True
+    )
+    op.create_index(
+        "ix_student_attendances_subject_date_period",
+        "student_attendances",
+        ["subject_id", "date", "period_number"],
+        if_not_exists=True
+    )
+
+def downgrade() -> None:
+    op.drop_index("ix_student_attendances_subject_date_period", table_name="student_attendances")
+    op.drop_index("ix_student_attendances_section_date", table_name="student_attendances")
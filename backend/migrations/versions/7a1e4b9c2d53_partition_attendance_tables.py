@@ -0,0 +1,156 @@
+"""partition attendance tables by month
+
+Revision ID: 7a1e4b9c2d53
+Revises: 3c9d6f0a2b41
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a1e4b9c2d53'
+down_revision: Union[str, None] = '3c9d6f0a2b41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+# table -> (partition key, constraints when partitioned, constraints when plain)
+TABLES = {
+    "student_attendances": (
+        "date",
+        [
+            "ALTER TABLE student_attendances ADD CONSTRAINT student_attendances_pkey PRIMARY KEY (id, date)",
+            "ALTER TABLE student_attendances ADD CONSTRAINT uq_student_attendances_device_local"
+            " UNIQUE (device_id, local_id, date)",
+        ],
+        [
+            "ALTER TABLE student_attendances ADD CONSTRAINT student_attendances_pkey PRIMARY KEY (id)",
+            "ALTER TABLE student_attendances ADD CONSTRAINT uq_student_attendances_device_local"
+            " UNIQUE (device_id, local_id)",
+        ],
+    ),
+    "attendance_audit_logs": (
+        "created_at",
+        [
+            "ALTER TABLE attendance_audit_logs ADD CONSTRAINT attendance_audit_logs_pkey PRIMARY KEY (id, created_at)",
+        ],
+        [
+            "ALTER TABLE attendance_audit_logs ADD CONSTRAINT attendance_audit_logs_pkey PRIMARY KEY (id)",
+        ],
+    ),
+}
+
+# Indexes shared by both layouts
+INDEXES = {
+    "student_attendances": [
+        "CREATE INDEX ix_student_attendances_id ON student_attendances (id)",
+        "CREATE UNIQUE INDEX uq_student_attendances_student_date_period"
+        " ON student_attendances (student_id, date, period_number)",
+        "CREATE INDEX ix_student_attendances_student_history"
+        " ON student_attendances (student_id, date, coalesce(period_number, 0), id)",
+        "CREATE INDEX ix_student_attendances_student_subject_date"
+        " ON student_attendances (student_id, subject_id, date)",
+    ],
+    "attendance_audit_logs": [
+        "CREATE INDEX ix_attendance_audit_logs_id ON attendance_audit_logs (id)",
+        "CREATE INDEX ix_attendance_audit_logs_attendance_id ON attendance_audit_logs (attendance_id)",
+    ],
+}
+
+# NOT VALID: audit rows may point at marks in partitions that were detached
+AUDIT_LOG_FK = (
+    "ALTER TABLE attendance_audit_logs ADD CONSTRAINT attendance_audit_logs_attendance_id_fkey"
+    " FOREIGN KEY (attendance_id) REFERENCES student_attendances (id) NOT VALID"
+)
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def _rebuild(table: str, partition_key: Union[str, None], statements: Sequence[str]) -> None:
+    """
+    Copy `table` into a fresh table with the same columns, partitioned on
+    `partition_key` (or plain when None), and swap it in. The copy runs
+    inside the migration transaction, so schedule it for a quiet window.
+    """
+    bind = op.get_bind()
+    old = f"{table}_old"
+    op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+
+    foreign_keys = [
+        fk for fk in sa.inspect(bind).get_foreign_keys(old)
+        if fk["referred_table"] != "student_attendances"
+    ]
+
+    # Free the constraint and index names for the new table
+    for name in bind.execute(sa.text(
+        "SELECT conname FROM pg_constraint"
+        " WHERE conrelid = CAST(:table AS regclass) AND contype IN ('p', 'u', 'f')"
+    ), {"table": old}).scalars().all():
+        op.execute(f"ALTER TABLE {old} DROP CONSTRAINT {name}")
+    for name in bind.execute(sa.text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = :table"
+    ), {"table": old}).scalars().all():
+        op.execute(f"DROP INDEX {name}")
+
+    partition_clause = f" PARTITION BY RANGE ({partition_key})" if partition_key else ""
+    op.execute(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS){partition_clause}")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+
+    if partition_key:
+        op.execute(f"UPDATE {old} SET {partition_key} = now() WHERE {partition_key} IS NULL")
+        first, last = bind.execute(sa.text(
+            f"SELECT min({partition_key}), max({partition_key}) FROM {old}"
+        )).one()
+        current = date.today().replace(day=1)
+        month = first.date().replace(day=1) if first else current
+        end = max(last.date().replace(day=1) if last else current, _add_months(current, MONTHS_AHEAD))
+        while month <= end:
+            op.execute(
+                f"CREATE TABLE {table}_y{month.year}m{month.month:02d} PARTITION OF {table}"
+                f" FOR VALUES FROM ('{month}') TO ('{_add_months(month, 1)}')"
+            )
+            month = _add_months(month, 1)
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+    op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+    op.execute(f"DROP TABLE {old}")
+
+    for statement in [*statements, *INDEXES[table]]:
+        op.execute(statement)
+    for fk in foreign_keys:
+        op.create_foreign_key(
+            fk["name"], table, fk["referred_table"],
+            fk["constrained_columns"], fk["referred_columns"]
+        )
+
+def _is_partitioned(table: str) -> bool:
+    return op.get_bind().execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table"
+        " WHERE partrelid = CAST(:table AS regclass))"
+    ), {"table": table}).scalar()
+
+def upgrade() -> None:
+    # Partitioned student_attendances.id is only unique together with date,
+    # so audit rows can no longer reference it with a foreign key
+    op.execute(
+        "ALTER TABLE attendance_audit_logs"
+        " DROP CONSTRAINT IF EXISTS attendance_audit_logs_attendance_id_fkey"
+    )
+    for table, (partition_key, partitioned, _) in TABLES.items():
+        # Already partitioned when init_db's create_all built it from the models
+        if not _is_partitioned(table):
+            _rebuild(table, partition_key, partitioned)
+
+def downgrade() -> None:
+    # Partitions detached by the maintenance command are left untouched
+    for table, (_, _, plain) in TABLES.items():
+        if _is_partitioned(table):
+            _rebuild(table, None, plain)
+    op.execute(AUDIT_LOG_FK)
@@ -0,0 +1,24 @@
+"""offline sync attempts
+
+Revision ID: 9e4b7c2a6d18
+Revises: a7c3e9f15b20
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b7c2a6d18'
+down_revision: Union[str, None] = 'a7c3e9f15b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE offline_attendance_syncs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0")
+
+def downgrade() -> None:
+    op.drop_column("offline_attendance_syncs", "attempts")
@@ -0,0 +1,70 @@
+"""refresh tokens
+
+Revision ID: a7c3e9f15b20
+Revises: f6b2d8e4a1c3
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e9f15b20'
+down_revision: Union[str, None] = 'f6b2d8e4a1c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # Instances started before init_db stopped running create_all already have these
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("refresh_tokens"):
+        op.create_table(
+            "refresh_tokens",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("token_hash", sa.String(), nullable=False),
+            sa.Column("session_id", sa.String(), nullable=False),
+            sa.Column("kind", sa.String(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.Column("rotated_at", sa.DateTime(), nullable=True),
+            sa.Column("revoked_at", sa.DateTime(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+            sa.PrimaryKeyConstraint("id")
+        )
+    op.create_index("ix_refresh_tokens_id", "refresh_tokens", ["id"], if_not_exists=True)
+    op.create_index(
+        "ix_refresh_tokens_token_hash", "refresh_tokens", ["token_hash"], unique=True, if_not_exists=True
+    )
+    op.create_index("ix_refresh_tokens_session_id", "refresh_tokens", ["session_id"], if_not_exists=True)
+    # Revoking every session of a user on password change
+    op.create_index(
+        "ix_refresh_tokens_user_active",
+        "refresh_tokens",
+        ["kind", "user_id"],
+        postgresql_where=sa.text("revoked_at IS NULL AND rotated_at IS NULL"),
+        if_not_exists=True
+    )
+
+    if not inspector.has_table("revoked_sessions"):
+        op.create_table(
+            "revoked_sessions",
+            sa.Column("session_id", sa.String(), nullable=False),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+            sa.PrimaryKeyConstraint("session_id")
+        )
+    op.create_index(
+        "ix_revoked_sessions_expires_at", "revoked_sessions", ["expires_at"], if_not_exists=True
+    )
+
+def downgrade() -> None:
+    op.drop_index("ix_revoked_sessions_expires_at", table_name="revoked_sessions")
+    op.drop_table("revoked_sessions")
+    op.drop_index("ix_refresh_tokens_user_active", table_name="refresh_tokens")
+    op.drop_index("ix_refresh_tokens_session_id", table_name="refresh_tokens")
+    op.drop_index("ix_refresh_tokens_token_hash", table_name="refresh_tokens")
+    op.drop_index("ix_refresh_tokens_id", table_name="refresh_tokens")
+    op.drop_table("refresh_tokens")
@@ -0,0 +1,36 @@
+"""qr token revocations
+
+Revision ID: b52f8d1e6a07
+Revises: 7a1e4b9c2d53
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b52f8d1e6a07'
+down_revision: Union[str, None] = '7a1e4b9c2d53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # Instances started before init_db stopped running create_all already have it
+    if not sa.inspect(op.get_bind()).has_table("qr_token_revocations"):
+        op.create_table(
+            "qr_token_revocations",
+            sa.Column("token_id", sa.String(), primary_key=True),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.Column("revoked_by", sa.Integer(), sa.ForeignKey("staff.id"), nullable=True),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        )
+    op.create_index(
+        "ix_qr_token_revocations_expires_at", "qr_token_revocations", ["expires_at"], if_not_exists=True
+    )
+
+def downgrade() -> None:
+    op.drop_index("ix_qr_token_revocations_expires_at", table_name="qr_token_revocations")
+    op.drop_table("qr_token_revocations")
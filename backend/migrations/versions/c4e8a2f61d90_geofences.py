@@ -0,0 +1,52 @@
+"""geofences
+
+Revision ID: c4e8a2f61d90
+Revises: b52f8d1e6a07
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2f61d90'
+down_revision: Union[str, None] = 'b52f8d1e6a07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # Instances started before init_db stopped running create_all already have these
+    if not sa.inspect(op.get_bind()).has_table("geofences"):
+        op.create_table(
+            "geofences",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("campus", sa.String(), nullable=False),
+            sa.Column("center_latitude", sa.Float(), nullable=True),
+            sa.Column("center_longitude", sa.Float(), nullable=True),
+            sa.Column("radius_meters", sa.Float(), nullable=True),
+            sa.Column("polygon", sa.JSON(), nullable=True),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+        )
+    op.create_index("ix_geofences_id", "geofences", ["id"], if_not_exists=True)
+    op.create_index("ix_geofences_campus", "geofences", ["campus"], if_not_exists=True)
+
+    op.execute("ALTER TABLE geolocation_attendances ADD COLUMN IF NOT EXISTS accuracy FLOAT")
+    op.execute("ALTER TABLE geolocation_attendances ADD COLUMN IF NOT EXISTS device_info JSON")
+    op.execute(
+        "ALTER TABLE geolocation_attendances"
+        " ADD COLUMN IF NOT EXISTS geofence_id INTEGER REFERENCES geofences (id)"
+    )
+
+def downgrade() -> None:
+    op.drop_column("geolocation_attendances", "geofence_id")
+    op.drop_column("geolocation_attendances", "device_info")
+    op.drop_column("geolocation_attendances", "accuracy")
+    op.drop_index("ix_geofences_campus", table_name="geofences")
+    op.drop_index("ix_geofences_id", table_name="geofences")
+    op.drop_table("geofences")
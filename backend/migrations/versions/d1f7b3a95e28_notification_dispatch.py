@@ -0,0 +1,47 @@
+"""notification dispatch
+
+Revision ID: d1f7b3a95e28
+Revises: c4e8a2f61d90
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1f7b3a95e28'
+down_revision: Union[str, None] = 'c4e8a2f61d90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # Instances started before init_db stopped running create_all already have these
+    op.execute("ALTER TABLE attendance_notifications ADD COLUMN IF NOT EXISTS channel VARCHAR")
+    op.execute("ALTER TABLE attendance_notifications ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0")
+    op.execute("ALTER TABLE attendance_notifications ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()")
+    op.execute("ALTER TABLE attendance_notifications ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP WITHOUT TIME ZONE")
+    op.create_index(
+        "ix_attendance_notifications_pending",
+        "attendance_notifications",
+        ["next_attempt_at"],
+        postgresql_where=sa.text("status = 'PENDING'"),
+        if_not_exists=True
+    )
+    op.create_index(
+        "ix_attendance_notifications_sending",
+        "attendance_notifications",
+        ["claimed_at"],
+        postgresql_where=sa.text("status = 'SENDING'"),
+        if_not_exists=True
+    )
+
+def downgrade() -> None:
+    op.drop_index("ix_attendance_notifications_sending", table_name="attendance_notifications")
+    op.drop_index("ix_attendance_notifications_pending", table_name="attendance_notifications")
+    op.drop_column("attendance_notifications", "claimed_at")
+    op.drop_column("attendance_notifications", "next_attempt_at")
+    op.drop_column("attendance_notifications", "attempts")
+    op.drop_column("attendance_notifications", "channel")
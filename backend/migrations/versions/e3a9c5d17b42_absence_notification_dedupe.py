@@ -0,0 +1,43 @@
+"""absence notification dedupe
+
+Revision ID: e3a9c5d17b42
+Revises: d1f7b3a95e28
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a9c5d17b42'
+down_revision: Union[str, None] = 'd1f7b3a95e28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # Instances started before init_db stopped running create_all already have these
+    op.execute("ALTER TABLE attendance_notifications ADD COLUMN IF NOT EXISTS attendance_date DATE")
+    op.create_index(
+        "uq_attendance_notifications_student_type_date",
+        "attendance_notifications",
+        ["student_id", "notification_type", "attendance_date"],
+        unique=True,
+        postgresql_where=sa.text("attendance_date IS NOT NULL"),
+        if_not_exists=True
+    )
+    # Created on the partitioned parent, so every monthly partition gets one
+    op.create_index(
+        "ix_student_attendances_absent_date_period",
+        "student_attendances",
+        ["date", "period_number"],
+        postgresql_where=sa.text("status = 'ABSENT'"),
+        if_not_exists=True
+    )
+
+def downgrade() -> None:
+    op.drop_index("ix_student_attendances_absent_date_period", table_name="student_attendances")
+    op.drop_index("uq_attendance_notifications_student_type_date", table_name="attendance_notifications")
+    op.drop_column("attendance_notifications", "attendance_date")
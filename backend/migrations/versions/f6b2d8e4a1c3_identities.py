@@ -0,0 +1,87 @@
+"""identities
+
+Revision ID: f6b2d8e4a1c3
+Revises: e3a9c5d17b42
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b2d8e4a1c3'
+down_revision: Union[str, None] = 'e3a9c5d17b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Upserts or deletes the identity of the changed row; the trigger argument is its kind
+SYNC_IDENTITY_TRIGGER = """
+CREATE OR REPLACE FUNCTION sync_identity_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM identities WHERE kind = TG_ARGV[0] AND user_id = OLD.id;
+        RETURN NULL;
+    END IF;
+    INSERT INTO identities (kind, user_id, email, role, hashed_password, is_active)
+    VALUES (
+        TG_ARGV[0], NEW.id, NEW.email,
+        coalesce(lower(to_jsonb(NEW) ->> 'role'), 'student'),
+        NEW.hashed_password, NEW.is_active
+    )
+    ON CONFLICT (kind, user_id) DO UPDATE SET
+        email = EXCLUDED.email,
+        role = EXCLUDED.role,
+        hashed_password = EXCLUDED.hashed_password,
+        is_active = EXCLUDED.is_active;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# table -> (kind, columns whose updates are synced)
+TRIGGERS = {
+    "students": ("student", "email, hashed_password, is_active"),
+    "staff": ("staff", "email, hashed_password, is_active, role"),
+}
+
+def upgrade() -> None:
+    # Derived from students and staff, so rebuild it: instances started before
+    # init_db stopped running create_all already have it, empty and without triggers
+    op.execute("DROP TABLE IF EXISTS identities")
+    op.create_table(
+        "identities",
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("role", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint("kind", "user_id"),
+        sa.UniqueConstraint("kind", "email", name="uq_identities_kind_email")
+    )
+    op.create_index("ix_identities_email", "identities", ["email"])
+
+    op.execute(SYNC_IDENTITY_TRIGGER)
+    for table, (kind, columns) in TRIGGERS.items():
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_sync_identity ON {table}")
+        op.execute(
+            f"CREATE TRIGGER {table}_sync_identity "
+            f"AFTER INSERT OR DELETE OR UPDATE OF {columns} ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION sync_identity_trigger('{kind}')"
+        )
+
+    op.execute("""
+        INSERT INTO identities (kind, user_id, email, role, hashed_password, is_active)
+        SELECT 'student', id, email, 'student', hashed_password, is_active FROM students
+        UNION ALL
+        SELECT 'staff', id, email, lower(role::text), hashed_password, is_active FROM staff
+    """)
+
+def downgrade() -> None:
+    for table in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_sync_identity ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS sync_identity_trigger()")
+    op.drop_table("identities")
@@ -3,4 +3,3 @@ from . import models  # noqa: F401
 from . import schemas  # noqa: F401
 from . import crud  # noqa: F401
 from . import core  # noqa: F401
-from . import api  # noqa: F401
@@ -1,18 +1,34 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Request, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, date
+import json
 
-from ...core.deps import get_db, get_current_user
+from ...core.config import settings
+from ...core.database import SessionLocal
+from ...core.deps import get_async_db, get_current_user, get_current_active_staff
+from ...core import qr_tokens
 from ...schemas.attendance import (
     StudentAttendance,
     StudentAttendanceCreate,
+    StudentAttendanceBulkCreate,
+    BulkAttendanceResult,
     QRCodeAttendance,
     QRCodeAttendanceCreate,
+    QRToken,
+    QRTokenCreate,
+    QRTokenClaims,
+    QRTokenRevoke,
+    QRScanBatch,
     GeolocationAttendance,
     GeolocationAttendanceCreate,
+    GeolocationAttendanceBatch,
     OfflineAttendanceSync,
     OfflineAttendanceSyncCreate,
+    OfflineAttendanceSyncAccepted,
+    OfflineAttendanceSyncResult,
     AttendanceNotification,
     AttendanceNotificationCreate,
     StudentAttendanceSummary,
@@ -20,6 +36,8 @@ from ...schemas.attendance import (
     SubjectAttendanceReport
 )
 from ...crud import attendance as crud
+from ...workers.offline_sync import drain_offline_syncs
+from ...workers.live_attendance import live_attendance_broker
 
 router = APIRouter()
 
@@ -28,28 +46,120 @@ router = APIRouter()
 async def create_attendance(
     attendance: StudentAttendanceCreate,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """Create new attendance record with audit logging"""
-    return crud.create_attendance(
-        db=db,
+    return await db.run_sync(
+        crud.create_attendance,
         attendance=attendance,
         user_id=current_user.id,
         ip_address=request.client.host,
         user_agent=request.headers.get("user-agent", "")
     )
 
+@router.post("/bulk", response_model=BulkAttendanceResult)
+async def create_attendance_bulk(
+    attendance_in: StudentAttendanceBulkCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    """Create attendance records for a whole class in one transaction"""
+    return await db.run_sync(
+        crud.create_attendance_bulk,
+        attendances=attendance_in.records,
+        user_id=current_user.id,
+        ip_address=request.client.host,
+        user_agent=request.headers.get("user-agent", "")
+    )
+
 @router.get("/student/{student_id}", response_model=List[StudentAttendance])
-def get_student_attendance(
+async def get_student_attendance(
     student_id: int,
+    request: Request,
+    response: Response,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     subject_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get attendance records for a specific student"""
-    return crud.get_student_attendance(db, student_id, start_date, end_date, subject_id)
+    """
+    Get attendance records for a specific student, one page at a time.
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    try:
+        after = crud.decode_attendance_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    records = await db.run_sync(
+        crud.get_student_attendance,
+        student_id, start_date, end_date, subject_id, after=after, limit=limit
+    )
+    if len(records) == limit:
+        next_cursor = crud.encode_attendance_cursor(records[-1])
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = (
+            f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+        )
+    return records
+
+@router.get("/student/{student_id}/stream")
+def stream_student_attendance(
+    student_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    subject_id: Optional[int] = None
+):
+    """Stream a student's full attendance history as NDJSON"""
+    def generate():
+        # Own session so it stays open for as long as the response streams
+        db = SessionLocal()
+        try:
+            for record in crud.stream_student_attendance(
+                db, student_id, start_date, end_date, subject_id
+            ):
+                row = {
+                    column.name: getattr(record, column.name)
+                    for column in record.__table__.columns
+                }
+                yield json.dumps(jsonable_encoder(row)) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@router.get("/live")
+async def live_attendance(
+    request: Request,
+    class_section_ids: Optional[List[int]] = Query(None),
+    current_user = Depends(get_current_active_staff)
+):
+    """
+    Server-Sent Events feed of marking progress per class section, at most
+    one update per section per LIVE_ATTENDANCE_COALESCE_SECONDS
+    """
+    subscription = live_attendance_broker.subscribe(class_section_ids)
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                update = await subscription.get(settings.LIVE_ATTENDANCE_KEEPALIVE_SECONDS)
+                if update is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield f"event: progress\ndata: {json.dumps(jsonable_encoder(update))}\n\n"
+        finally:
+            live_attendance_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.put("/{attendance_id}", response_model=StudentAttendance)
 async def update_attendance(
@@ -57,12 +167,12 @@ async def update_attendance(
     new_status: str,
     reason: str,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """Update attendance status with audit logging"""
-    return crud.update_attendance(
-        db=db,
+    return await db.run_sync(
+        crud.update_attendance,
         attendance_id=attendance_id,
         new_status=new_status,
         user_id=current_user.id,
@@ -73,120 +183,219 @@ async def update_attendance(
 
 # QR Code Attendance
 @router.post("/qr", response_model=QRCodeAttendance)
-def create_qr_attendance(
+async def create_qr_attendance(
     qr_data: QRCodeAttendanceCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create QR code based attendance record"""
-    return crud.create_qr_attendance(db, qr_data)
+    return await db.run_sync(crud.create_qr_attendance, qr_data)
 
-@router.get("/qr/verify/{qr_code}", response_model=QRCodeAttendance)
-def verify_qr_attendance(
-    qr_code: str,
-    db: Session = Depends(get_db)
+@router.post("/qr/token", response_model=QRToken)
+def issue_qr_token(
+    token_in: QRTokenCreate,
+    current_user = Depends(get_current_active_staff)
 ):
-    """Verify QR code for attendance"""
-    result = crud.verify_qr_code(db, qr_code)
-    if not result:
+    """Issue a signed QR code for a period; clients fetch a new one before it expires"""
+    token, expires_at = qr_tokens.issue_qr_token(
+        class_section_id=token_in.class_section_id,
+        subject_id=token_in.subject_id,
+        period_number=token_in.period_number,
+        teacher_id=current_user.id
+    )
+    return QRToken(
+        **token_in.dict(),
+        token=token,
+        teacher_id=current_user.id,
+        expires_at=datetime.utcfromtimestamp(expires_at)
+    )
+
+@router.post("/qr/revoke", response_model=QRTokenClaims)
+async def revoke_qr_token(
+    revoke_in: QRTokenRevoke,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_active_staff)
+):
+    """Invalidate a QR code before it expires"""
+    try:
+        claims = qr_tokens.verify_qr_token(revoke_in.token)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await db.run_sync(crud.revoke_qr_token, claims, current_user.id)
+    return claims
+
+@router.get("/qr/verify/{qr_code}", response_model=QRTokenClaims)
+def verify_qr_attendance(qr_code: str):
+    """Verify QR code for attendance, checked in memory without a database lookup"""
+    try:
+        return qr_tokens.verify_qr_token(qr_code)
+    except ValueError:
         raise HTTPException(status_code=404, detail="Invalid or expired QR code")
-    return result
+
+@router.post("/qr/scan", response_model=BulkAttendanceResult)
+async def record_qr_scans(
+    scan_in: QRScanBatch,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    """Mark attendance for a batch of QR scans, reporting each scan's outcome"""
+    return await db.run_sync(
+        crud.record_qr_scans,
+        scans=scan_in.scans,
+        student_id=None if current_user.is_staff else current_user.id,
+        ip_address=request.client.host,
+        user_agent=request.headers.get("user-agent", "")
+    )
 
 # Geolocation Attendance
 @router.post("/geolocation", response_model=GeolocationAttendance)
-def create_geolocation_attendance(
+async def create_geolocation_attendance(
     geo_data: GeolocationAttendanceCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Create geolocation based attendance record"""
-    # TODO: Get school coordinates from configuration
-    school_coordinates = {"latitude": 0.0, "longitude": 0.0}
-    allowed_radius = 100  # meters
-    
-    return crud.create_geolocation_attendance(
-        db, geo_data, school_coordinates, allowed_radius
-    )
+    """Create geolocation based attendance record, checked against the campus geofences"""
+    return await db.run_sync(crud.create_geolocation_attendance, geo_data)
+
+@router.post("/geolocation/batch", response_model=List[GeolocationAttendance])
+async def create_geolocation_attendance_batch(
+    batch: GeolocationAttendanceBatch,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create geolocation attendance records for a batch of check-ins"""
+    return await db.run_sync(crud.create_geolocation_attendance_batch, batch.check_ins)
 
 # Offline Sync
-@router.post("/sync", response_model=OfflineAttendanceSync)
+@router.post("/sync", response_model=OfflineAttendanceSyncAccepted, status_code=202)
 async def create_sync_request(
     sync_data: OfflineAttendanceSyncCreate,
     request: Request,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
-    """Create offline attendance sync request"""
-    sync = crud.create_offline_sync(db, sync_data)
-    
-    # Process sync asynchronously
-    success = crud.process_offline_sync(
-        db,
-        sync.sync_id,
+    """Queue offline attendance records for processing by the sync workers"""
+    sync = await db.run_sync(
+        crud.create_offline_sync,
+        sync_data,
         current_user.id,
         request.client.host,
         request.headers.get("user-agent", "")
     )
     
-    if not success:
-        raise HTTPException(
-            status_code=400,
-            detail="Failed to process offline attendance records"
-        )
+    if settings.OFFLINE_SYNC_WORKER_MODE == "local":
+        background_tasks.add_task(drain_offline_syncs)
     
-    return sync
+    return {
+        "sync_id": sync.sync_id,
+        "sync_status": sync.sync_status,
+        "status_url": str(request.url_for("get_sync_status", sync_id=sync.sync_id))
+    }
+
+@router.get("/sync/{sync_id}", response_model=OfflineAttendanceSyncResult)
+async def get_sync_status(
+    sync_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get processing status and per-record outcome of an offline sync"""
+    sync = await db.run_sync(crud.get_offline_sync, sync_id)
+    if not sync:
+        raise HTTPException(status_code=404, detail="Sync request not found")
+    
+    return {
+        "sync_id": sync.sync_id,
+        "sync_status": sync.sync_status,
+        "synced_at": sync.synced_at,
+        "error_details": sync.error_details,
+        "outcomes": sync.sync_result
+    }
 
 # Attendance Analytics
 @router.get("/summary/student/{student_id}", response_model=StudentAttendanceSummary)
-def get_student_attendance_summary(
+async def get_student_attendance_summary(
     student_id: int,
     start_date: date,
     end_date: date,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get attendance summary for a student"""
-    return crud.get_attendance_summary(db, student_id, start_date, end_date)
+    return await db.run_sync(crud.get_attendance_summary, student_id, start_date, end_date)
+
+@router.get("/summary/class", response_model=List[ClassAttendanceSummary])
+async def get_class_attendance_summaries(
+    class_section_ids: List[int] = Query(...),
+    date: Optional[date] = None,
+    period_number: Optional[int] = None,
+    subject_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get attendance summaries for several classes in one call"""
+    return await db.run_sync(
+        crud.get_class_attendance_summaries,
+        class_section_ids,
+        date or datetime.utcnow().date(),
+        period_number,
+        subject_id
+    )
 
 @router.get("/summary/class/{class_section_id}", response_model=ClassAttendanceSummary)
-def get_class_attendance_summary(
+async def get_class_attendance_summary(
     class_section_id: int,
     date: Optional[date] = None,
     period_number: Optional[int] = None,
     subject_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get attendance summary for a class"""
-    # TODO: Implement class attendance summary in CRUD
-    ...
+    summaries = await db.run_sync(
+        crud.get_class_attendance_summaries,
+        [class_section_id],
+        date or datetime.utcnow().date(),
+        period_number,
+        subject_id
+    )
+    return summaries[0]
 
 @router.get("/summary/subject/{subject_id}", response_model=SubjectAttendanceReport)
-def get_subject_attendance_report(
+async def get_subject_attendance_report(
     subject_id: int,
-    class_section_id: int,
     start_date: date,
     end_date: date,
-    db: Session = Depends(get_db)
+    class_section_id: Optional[int] = None,
+    class_section_ids: Optional[List[int]] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get attendance report for a subject"""
-    # TODO: Implement subject attendance report in CRUD
-    ...
+    """Get attendance report for a subject across one or more classes"""
+    section_ids = list(class_section_ids or [])
+    if class_section_id:
+        section_ids.append(class_section_id)
+    
+    report = await db.run_sync(
+        crud.get_subject_attendance_report, subject_id, section_ids, start_date, end_date
+    )
+    if not report:
+        raise HTTPException(status_code=404, detail="Subject not found")
+    return report
 
 # Notifications
 @router.post("/notifications", response_model=AttendanceNotification)
-def create_notification(
+async def create_notification(
     notification: AttendanceNotificationCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create attendance notification"""
-    return crud.create_attendance_notification(db, notification)
+    return await db.run_sync(crud.create_attendance_notification, notification)
 
 @router.put("/notifications/{notification_id}/status", response_model=AttendanceNotification)
-def update_notification_status(
+async def update_notification_status(
     notification_id: int,
     status: str,
     error_message: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update notification status"""
-    result = crud.update_notification_status(db, notification_id, status, error_message)
+    result = await db.run_sync(
+        crud.update_notification_status, notification_id, status, error_message
+    )
     if not result:
         raise HTTPException(status_code=404, detail="Notification not found")
     return result
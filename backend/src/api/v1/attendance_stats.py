@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from datetime import date
 
-from ...core.deps import get_db, get_current_user, get_current_active_user
+from ...core.deps import get_async_read_db, get_current_user, get_current_active_user
 from ...crud import attendance_stats as crud
 from ...schemas import attendance_stats as schemas
-from ...core.models import User, UserRole
+from ...core.principals import Principal
 
 router = APIRouter(
     prefix="/attendance-stats",
@@ -17,15 +17,15 @@ router = APIRouter(
 @router.post("/student", response_model=schemas.StudentAttendanceReport)
 async def get_student_attendance_stats(
     request: schemas.AttendanceStatsRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get attendance statistics for a student."""
     if not request.student_id:
         raise HTTPException(status_code=400, detail="Student ID is required")
 
     # Check permissions
-    if (current_user.role == "STUDENT" and current_user.id != request.student_id):
+    if (current_user.role == "student" and current_user.id != request.student_id):
         raise HTTPException(status_code=403, detail="Not authorized to view other student's attendance")
 
     try:
@@ -40,8 +40,8 @@ async def get_student_attendance_stats(
             start_date = request.start_date
             end_date = request.end_date
 
-        return crud.get_student_attendance_stats(
-            db=db,
+        return await db.run_sync(
+            crud.get_student_attendance_stats,
             student_id=request.student_id,
             start_date=start_date,
             end_date=end_date,
@@ -53,15 +53,15 @@ async def get_student_attendance_stats(
 @router.post("/class", response_model=schemas.ClassAttendanceReport)
 async def get_class_attendance_stats(
     request: schemas.AttendanceStatsRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get attendance statistics for an entire class."""
     if not request.class_id:
         raise HTTPException(status_code=400, detail="Class ID is required")
 
     # Only teachers and admins can view class statistics
-    if current_user.role not in ["TEACHER", "ADMIN"]:
+    if current_user.role not in ["teacher", "admin"]:
         raise HTTPException(status_code=403, detail="Not authorized to view class statistics")
 
     try:
@@ -76,8 +76,8 @@ async def get_class_attendance_stats(
             start_date = request.start_date
             end_date = request.end_date
 
-        return crud.get_class_attendance_stats(
-            db=db,
+        return await db.run_sync(
+            crud.get_class_attendance_stats,
             class_id=request.class_id,
             start_date=start_date,
             end_date=end_date,
@@ -2,48 +2,113 @@ from datetime import timedelta
 from typing import Any, Dict
 from fastapi import APIRouter, Depends, HTTPException, status, Body, Form
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...core.config import settings
 from ...core import security
-from ...core.deps import get_db
+from ...core.deps import get_db, get_async_db
 from ...crud.auth import auth_crud
-from ...schemas.auth import Token
+from ...schemas.auth import RefreshTokenRequest, Token
 
 router = APIRouter()
 
 @router.post("/login", response_model=Token)
 async def login(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     credentials: Dict = Body(...)
 ) -> Any:
     """
-    Login endpoint that accepts JSON data
+    Login endpoint that accepts JSON data; an optional "role" of "student" or
+    "staff" picks the account when both use the same email
     """
-    user = auth_crud.authenticate(
-        db, email=credentials.get("username"), password=credentials.get("password")
+    identity = await db.run_sync(
+        auth_crud.get_identity, email=credentials.get("username"), role=credentials.get("role")
     )
-    if not user:
+    verified, new_hash = False, None
+    if identity:
+        try:
+            verified, new_hash = await security.password_hasher.verify_and_update(
+                credentials.get("password") or "", identity.hashed_password
+            )
+        except security.PasswordHasherBusy:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many login attempts in progress, try again shortly",
+                headers={"Retry-After": str(settings.LOGIN_RETRY_AFTER_SECONDS)},
+            )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    elif not user.is_active:
+    elif not identity.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Inactive user"
         )
+    if new_hash:
+        await db.run_sync(
+            auth_crud.update_password_hash,
+            kind=identity.kind,
+            user_id=identity.user_id,
+            hashed_password=new_hash
+        )
+
+    session_id, refresh_token = await db.run_sync(
+        auth_crud.create_session, kind=identity.kind, user_id=identity.user_id
+    )
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return {
+        "access_token": security.create_access_token(
+            identity.user_id,
+            expires_delta=access_token_expires,
+            role=identity.role,
+            session_id=session_id
+        ),
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
+
+@router.post("/refresh", response_model=Token)
+async def refresh(
+    body: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_async_db)
+) -> Any:
+    """
+    Exchange a refresh token for a new access token and refresh token.
+    Each refresh token works once; reusing one ends its session.
+    """
+    session = await db.run_sync(auth_crud.rotate_refresh_token, refresh_token=body.refresh_token)
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    role = user.role.value if hasattr(user, 'role') else 'student'
     return {
         "access_token": security.create_access_token(
-            user.id, expires_delta=access_token_expires, role=role
+            session["user_id"],
+            expires_delta=access_token_expires,
+            role=session["role"],
+            session_id=session["session_id"]
         ),
         "token_type": "bearer",
+        "refresh_token": session["refresh_token"],
     }
 
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    body: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_async_db)
+) -> None:
+    """
+    End the session of a refresh token; its access tokens stop working too
+    """
+    await db.run_sync(auth_crud.revoke_refresh_token_session, refresh_token=body.refresh_token)
+
 @router.post("/test-token", response_model=Token)
 def test_token(current_user: Any = Depends(get_db)) -> Any:
     """
@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from datetime import datetime
 
-from ...core.deps import get_db
+from ...core.deps import get_db, get_read_db
 from ...crud import fees as fees_crud
 from ...schemas.fees import (
     FeePayment,
@@ -47,7 +47,7 @@ def get_student_fees_summary(
 @router.get("/class-sections/summary")
 def get_class_fees_summary(
     student_ids: List[int],
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get fee summary for a group of students"""
     return fees_crud.get_class_fees_summary(db=db, student_ids=student_ids)
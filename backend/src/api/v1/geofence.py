@@ -0,0 +1,54 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from ...core.deps import get_db, get_current_active_staff, get_current_active_admin
+from ...crud.geofence import geofence
+from ...schemas.geofence import Geofence, GeofenceCreate, GeofenceUpdate
+
+router = APIRouter()
+
+@router.post("/", response_model=Geofence)
+def create_geofence(
+    *,
+    db: Session = Depends(get_db),
+    geofence_in: GeofenceCreate,
+    current_user = Depends(get_current_active_admin)
+):
+    """Create a campus geofence"""
+    return geofence.create(db=db, obj_in=geofence_in)
+
+@router.get("/", response_model=List[Geofence])
+def list_geofences(
+    db: Session = Depends(get_db),
+    campus: Optional[str] = None,
+    current_user = Depends(get_current_active_staff)
+):
+    """Get the active geofences, optionally for one campus"""
+    return geofence.get_active(db=db, campus=campus)
+
+@router.put("/{geofence_id}", response_model=Geofence)
+def update_geofence(
+    *,
+    db: Session = Depends(get_db),
+    geofence_id: int,
+    geofence_in: GeofenceUpdate,
+    current_user = Depends(get_current_active_admin)
+):
+    """Replace a geofence's name, campus and shape"""
+    db_geofence = geofence.get(db=db, id=geofence_id)
+    if not db_geofence:
+        raise HTTPException(status_code=404, detail="Geofence not found")
+    return geofence.update(db=db, db_obj=db_geofence, obj_in=geofence_in)
+
+@router.delete("/{geofence_id}", response_model=Geofence)
+def deactivate_geofence(
+    *,
+    db: Session = Depends(get_db),
+    geofence_id: int,
+    current_user = Depends(get_current_active_admin)
+):
+    """Deactivate a geofence; past check-ins keep referencing it"""
+    db_geofence = geofence.get(db=db, id=geofence_id)
+    if not db_geofence:
+        raise HTTPException(status_code=404, detail="Geofence not found")
+    return geofence.deactivate(db=db, db_obj=db_geofence)
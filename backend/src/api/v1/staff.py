@@ -3,6 +3,7 @@ from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from ...core.deps import get_db, get_current_user
+from ...core.principals import Principal
 from ...crud.staff import staff
 from ...schemas.staff import (
     StaffCreate,
@@ -23,10 +24,10 @@ def create_staff(
     *,
     db: Session = Depends(get_db),
     staff_in: StaffCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Create new staff member"""
-    return staff.create_with_audit(db=db, obj_in=staff_in, performed_by=current_user["id"])
+    return staff.create_with_audit(db=db, obj_in=staff_in, performed_by=current_user.id)
 
 @router.get("/", response_model=StaffList)
 def list_staff(
@@ -35,7 +36,7 @@ def list_staff(
     limit: int = 10,
     role: Optional[str] = None,
     is_active: Optional[bool] = True,
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get list of staff members"""
     filters = {}
@@ -52,7 +53,7 @@ def list_staff(
 def get_staff(
     staff_id: int,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get staff member by ID"""
     db_staff = staff.get(db=db, id=staff_id)
@@ -66,7 +67,7 @@ def update_staff(
     db: Session = Depends(get_db),
     staff_id: int,
     staff_in: StaffUpdate,
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Update staff member"""
     db_staff = staff.get(db=db, id=staff_id)
@@ -76,7 +77,7 @@ def update_staff(
         db=db,
         db_obj=db_staff,
         obj_in=staff_in,
-        performed_by=current_user["id"]
+        performed_by=current_user.id
     )
 
 @router.delete("/{staff_id}", response_model=StaffResponse)
@@ -84,13 +85,13 @@ def delete_staff(
     *,
     db: Session = Depends(get_db),
     staff_id: int,
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Delete staff member"""
     db_staff = staff.delete_with_audit(
         db=db,
         id=staff_id,
-        performed_by=current_user["id"]
+        performed_by=current_user.id
     )
     if not db_staff:
         raise HTTPException(status_code=404, detail="Staff member not found")
@@ -101,7 +102,7 @@ def assign_subject(
     *,
     db: Session = Depends(get_db),
     subject_in: TeacherSubjectCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Assign subject to teacher"""
     return staff.assign_subject(db=db, obj_in=subject_in)
@@ -110,7 +111,7 @@ def assign_subject(
 def get_teacher_subjects(
     teacher_id: int,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get subjects assigned to teacher"""
     return staff.get_teacher_subjects(db=db, teacher_id=teacher_id)
@@ -120,7 +121,7 @@ def set_availability(
     *,
     db: Session = Depends(get_db),
     availability_in: StaffAvailabilityCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Set staff availability"""
     # Check for conflicts
@@ -143,7 +144,7 @@ def get_staff_availability(
     staff_id: int,
     day_of_week: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get staff availability"""
     return staff.get_availability(db=db, staff_id=staff_id, day_of_week=day_of_week)
@@ -152,7 +153,7 @@ def get_staff_availability(
 def get_staff_audit_logs(
     staff_id: int,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get staff audit logs"""
     return staff.get_audit_logs(db=db, staff_id=staff_id)
@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from datetime import datetime, date
 
+from ...core.cache import cached_response
 from ...core.deps import get_db
 from ...schemas.teacher_schedule import (
     TeacherAvailability,
@@ -132,6 +133,7 @@ def create_room_schedule(
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/rooms/{room_id}/schedule", response_model=RoomScheduleResponse)
+@cached_response(RoomScheduleResponse, tags=["room_schedules", "room_allocations"])
 def get_room_schedule(
     room_id: int,
     day_of_week: Optional[str] = None,
@@ -0,0 +1,276 @@
+"""
+Response cache for read-heavy GET endpoints.
+
+`cached_response` stores the serialized response of an endpoint under its
+path and query string, tagged with the tables it reads, and answers with an
+ETag so clients can revalidate with If-None-Match. Sessions record which
+tables each transaction wrote (ORM flushes and Core INSERT/UPDATE/DELETE
+through the session) and invalidate those tags after commit, so no CRUD
+function has to know about the cache. Writes made with raw text() SQL are
+not seen and only expire with the TTL.
+
+Backends: "memory" is a per-process LRU, so other workers only see a write
+once their entry expires; "redis" shares entries and invalidations between
+processes. RESPONSE_CACHE_BACKEND="none" disables caching.
+"""
+import functools
+import hashlib
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Set, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+
+from .config import settings
+
+# (etag, body)
+CacheEntry = Tuple[str, bytes]
+
+class CacheBackend:
+    # Backends doing network I/O are called from the threadpool
+    blocking = False
+    # Shared backends hold entries cached by other processes
+    shared = False
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        raise NotImplementedError
+
+    def tag_versions(self, tags: Sequence[str]) -> Tuple[int, ...]:
+        raise NotImplementedError
+
+    def set(self, key: str, entry: CacheEntry, tags: Sequence[str],
+            versions: Tuple[int, ...], ttl: int) -> None:
+        """Store the entry unless one of its tags was invalidated since `versions` was read"""
+        raise NotImplementedError
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        raise NotImplementedError
+
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, CacheEntry]]" = OrderedDict()
+        self._keys_by_tag: Dict[str, Set[str]] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, entry = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def tag_versions(self, tags: Sequence[str]) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._versions.get(tag, 0) for tag in tags)
+
+    def set(self, key: str, entry: CacheEntry, tags: Sequence[str],
+            versions: Tuple[int, ...], ttl: int) -> None:
+        with self._lock:
+            if tuple(self._versions.get(tag, 0) for tag in tags) != versions:
+                return
+            self._entries[key] = (time.monotonic() + ttl, entry)
+            self._entries.move_to_end(key)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+                for key in self._keys_by_tag.pop(tag, ()):
+                    self._entries.pop(key, None)
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Entries are hashes {etag, body} with a TTL; each tag has a set of its keys
+    and a version counter. Pass `client` to use e.g. fakeredis.FakeRedis().
+    """
+    blocking = True
+    shared = True
+
+    def __init__(self, url: Optional[str] = None, client: Any = None, prefix: str = "cms:cache:"):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        etag, body = self.client.hmget(self.prefix + key, "etag", "body")
+        if etag is None or body is None:
+            return None
+        return etag.decode(), body
+
+    def tag_versions(self, tags: Sequence[str]) -> Tuple[int, ...]:
+        if not tags:
+            return ()
+        versions = self.client.mget([f"{self.prefix}tag:{tag}:version" for tag in tags])
+        return tuple(int(version or 0) for version in versions)
+
+    def set(self, key: str, entry: CacheEntry, tags: Sequence[str],
+            versions: Tuple[int, ...], ttl: int) -> None:
+        if self.tag_versions(tags) != versions:
+            return
+        etag, body = entry
+        pipeline = self.client.pipeline()
+        pipeline.hset(self.prefix + key, mapping={"etag": etag, "body": body})
+        pipeline.expire(self.prefix + key, ttl)
+        for tag in tags:
+            pipeline.sadd(f"{self.prefix}tag:{tag}", key)
+        pipeline.execute()
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        tag_keys = [f"{self.prefix}tag:{tag}" for tag in tags]
+        pipeline = self.client.pipeline()
+        for tag_key in tag_keys:
+            pipeline.incr(f"{tag_key}:version")
+        for tag_key in tag_keys:
+            pipeline.smembers(tag_key)
+        pipeline.delete(*tag_keys)
+        members = pipeline.execute()[len(tag_keys):-1]
+        keys = {self.prefix + key.decode() for tag_members in members for key in tag_members}
+        if keys:
+            self.client.delete(*keys)
+
+_backend: Optional[CacheBackend] = None
+_backend_lock = threading.Lock()
+
+def get_cache_backend() -> Optional[CacheBackend]:
+    global _backend
+    if settings.RESPONSE_CACHE_BACKEND == "none":
+        return None
+    with _backend_lock:
+        if _backend is None:
+            if settings.RESPONSE_CACHE_BACKEND == "redis":
+                _backend = RedisCacheBackend(settings.RESPONSE_CACHE_REDIS_URL)
+            else:
+                _backend = MemoryCacheBackend(settings.RESPONSE_CACHE_MAX_ENTRIES)
+        return _backend
+
+def set_cache_backend(backend: Optional[CacheBackend]) -> None:
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+# Tables cached endpoints in this process depend on. A per-process backend
+# skips writes to other tables; a shared one may hold entries cached by API
+# processes while this one is a worker, so it is told about every write.
+CACHED_TAGS: Set[str] = set()
+
+def invalidate_tags(tags: Iterable[str]) -> None:
+    backend = get_cache_backend()
+    if backend is None:
+        return
+    if not backend.shared:
+        tags = [tag for tag in tags if tag in CACHED_TAGS]
+    if tags:
+        backend.invalidate(list(tags))
+
+def cache_key(request: Request) -> str:
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+def cached_response(response_model: Any, tags: Sequence[str], ttl: Optional[int] = None) -> Callable:
+    """
+    Cache an endpoint's response, tagged with the table names it reads.
+    Dependencies (authentication included) still run on every request.
+    """
+    adapter = TypeAdapter(response_model)
+    CACHED_TAGS.update(tags)
+
+    def decorator(endpoint: Callable) -> Callable:
+        signature = inspect.signature(endpoint)
+        takes_request = "request" in signature.parameters
+        if not takes_request:
+            signature = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+            ])
+
+        async def call_backend(backend: CacheBackend, method: str, *args):
+            if backend.blocking:
+                return await run_in_threadpool(getattr(backend, method), *args)
+            return getattr(backend, method)(*args)
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            request: Request = kwargs["request"] if takes_request else kwargs.pop("request")
+            backend = get_cache_backend()
+            if backend is None:
+                if inspect.iscoroutinefunction(endpoint):
+                    return await endpoint(*args, **kwargs)
+                return await run_in_threadpool(endpoint, *args, **kwargs)
+
+            key = cache_key(request)
+            entry = await call_backend(backend, "get", key)
+            status = "HIT"
+            if entry is None:
+                status = "MISS"
+                versions = await call_backend(backend, "tag_versions", tags)
+                if inspect.iscoroutinefunction(endpoint):
+                    result = await endpoint(*args, **kwargs)
+                else:
+                    result = await run_in_threadpool(endpoint, *args, **kwargs)
+                if isinstance(result, Response):
+                    return result
+                body = adapter.dump_json(adapter.validate_python(result, from_attributes=True))
+                entry = (f'"{hashlib.sha1(body).hexdigest()}"', body)
+                await call_backend(
+                    backend, "set", key, entry, tags, versions,
+                    ttl or settings.RESPONSE_CACHE_TTL_SECONDS
+                )
+
+            etag, body = entry
+            headers = {"ETag": etag, "Cache-Control": "private, no-cache", "X-Cache": status}
+            if etag in request.headers.get("if-none-match", ""):
+                return Response(status_code=304, headers=headers)
+            return Response(content=body, media_type="application/json", headers=headers)
+
+        wrapper.__signature__ = signature
+        return wrapper
+    return decorator
+
+def track_cache_invalidation(session_class: type) -> None:
+    """Invalidate the tags of every table a session's transaction wrote, once it commits"""
+
+    def written_tables(session) -> Set[str]:
+        return session.info.setdefault("cache_tags", set())
+
+    @event.listens_for(session_class, "after_flush")
+    def after_flush(session, flush_context):
+        tables = written_tables(session)
+        for instance in (*session.new, *session.dirty, *session.deleted):
+            table = getattr(instance, "__table__", None)
+            if table is not None:
+                tables.add(table.name)
+
+    @event.listens_for(session_class, "do_orm_execute")
+    def do_orm_execute(orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            table = getattr(orm_execute_state.statement, "table", None)
+            if table is not None and getattr(table, "name", None):
+                written_tables(orm_execute_state.session).add(table.name)
+
+    @event.listens_for(session_class, "after_commit")
+    def after_commit(session):
+        tags = session.info.pop("cache_tags", None)
+        if tags:
+            invalidate_tags(tags)
+
+    @event.listens_for(session_class, "after_rollback")
+    def after_rollback(session):
+        session.info.pop("cache_tags", None)
@@ -46,7 +46,26 @@ class Settings(BaseSettings):
     # JWT Settings
     SECRET_KEY: str = "your-super-secret-key-change-this-in-production"
     ALGORITHM: str = "HS256"
+    # With a key directory tokens are signed RS256/ES256 by the active key
+    # instead of SECRET_KEY, and the public keys are served as a JWKS
+    JWT_KEYS_DIR: Optional[str] = None
+    JWT_ACTIVE_KEY_ID: Optional[str] = None
+    JWKS_CACHE_SECONDS: int = 300
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Refresh tokens rotate on every use; revoked sessions are re-read every refresh interval
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    SESSION_REVOCATION_REFRESH_SECONDS: float = 5.0
+    # Authenticated users are resolved from this cache before querying the database
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+
+    # Password Hashing Settings
+    # Changing the bcrypt cost rehashes each password on its next login;
+    # logins beyond the pending limit get 503 with Retry-After
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    LOGIN_RETRY_AFTER_SECONDS: int = 2
     
     # Database Settings
     POSTGRES_SERVER: str = "localhost"
@@ -60,6 +79,97 @@ class Settings(BaseSettings):
         host="localhost",
         path="/cms_db"
     )
+    # Read replica for reports and analytics, e.g. a streaming standby
+    SQLALCHEMY_REPLICA_URI: Optional[PostgresDsn] = None
+
+    # Connection Pool Settings
+    # Applies per engine and per process; size x workers must stay under max_connections.
+    # PgBouncer mode opens a connection per checkout and disables prepared statements
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_PGBOUNCER_MODE: bool = False
+
+    # Response Cache Settings
+    # "memory" (per process LRU), "redis" (shared between processes) or "none"
+    RESPONSE_CACHE_BACKEND: str = "memory"
+    RESPONSE_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
+    RESPONSE_CACHE_MAX_ENTRIES: int = 10000
+
+    # Offline Sync Worker Settings
+    # "queue" leaves syncs for the worker pool, "local" drains them in-process
+    OFFLINE_SYNC_WORKER_MODE: str = "queue"
+    OFFLINE_SYNC_BATCH_SIZE: int = 10
+    OFFLINE_SYNC_POLL_INTERVAL: float = 2.0
+    OFFLINE_SYNC_STALE_AFTER_SECONDS: int = 300
+    # Syncs that fail or stall this many times are marked FAILED, not retried
+    OFFLINE_SYNC_MAX_ATTEMPTS: int = 5
+
+    # Audit Log Writer Settings
+    # Buffered entries are written every interval or once the batch fills;
+    # while the buffer is full, submitters write their entries synchronously
+    AUDIT_LOG_FLUSH_INTERVAL_MS: int = 200
+    AUDIT_LOG_FLUSH_SIZE: int = 500
+    AUDIT_LOG_BUFFER_SIZE: int = 10000
+
+    # QR Attendance Token Settings
+    # Falls back to SECRET_KEY when unset; revocations are re-read every refresh interval
+    QR_TOKEN_SECRET: Optional[str] = None
+    QR_TOKEN_TTL_SECONDS: int = 300
+    QR_REVOCATION_REFRESH_SECONDS: float = 5.0
+
+    # Notification Dispatcher Settings
+    # Channels are "smtp", "sms" or "webhook"; fake channels record messages instead of sending
+    NOTIFICATION_DEFAULT_CHANNEL: str = "sms"
+    NOTIFICATION_FAKE_CHANNELS: bool = False
+    NOTIFICATION_BATCH_SIZE: int = 500
+    NOTIFICATION_SEND_CONCURRENCY: int = 8
+    NOTIFICATION_POLL_INTERVAL: float = 2.0
+    NOTIFICATION_STALE_AFTER_SECONDS: int = 300
+    # Messages per second per channel, with bursts up to one second's worth
+    NOTIFICATION_RATE_LIMITS: Dict[str, float] = {"smtp": 10.0, "sms": 20.0, "webhook": 50.0}
+    NOTIFICATION_MAX_ATTEMPTS: int = 5
+    NOTIFICATION_RETRY_BASE_SECONDS: float = 30.0
+    NOTIFICATION_RETRY_MAX_SECONDS: float = 3600.0
+    SMTP_HOST: Optional[str] = None
+    SMTP_PORT: int = 587
+    SMTP_USER: Optional[str] = None
+    SMTP_PASSWORD: Optional[str] = None
+    SMTP_USE_TLS: bool = True
+    SMTP_FROM: Optional[str] = None
+    SMS_GATEWAY_URL: Optional[str] = None
+    SMS_GATEWAY_TOKEN: Optional[str] = None
+    NOTIFICATION_WEBHOOK_URL: Optional[str] = None
+    NOTIFICATION_WEBHOOK_SECRET: Optional[str] = None
+    NOTIFICATION_SEND_TIMEOUT_SECONDS: float = 10.0
+
+    # Live Attendance Feed Settings
+    # Changes are coalesced into one update per section every interval;
+    # slow subscribers only keep the latest unsent update of each section
+    LIVE_ATTENDANCE_ENABLED: bool = True
+    LIVE_ATTENDANCE_COALESCE_SECONDS: float = 1.0
+    LIVE_ATTENDANCE_KEEPALIVE_SECONDS: float = 15.0
+
+    # Absence Notification Settings
+    # Notices for a period are generated once its marking window has closed
+    ABSENCE_NOTIFICATION_GRACE_MINUTES: int = 15
+    ABSENCE_NOTIFICATION_POLL_SECONDS: float = 60.0
+
+    # Geofence Settings
+    # Grid cell size of the in-memory index, and how long a process keeps it before reloading
+    GEOFENCE_GRID_DEGREES: float = 0.01
+    GEOFENCE_CACHE_SECONDS: int = 60
+
+    # Attendance Partition Settings
+    # Monthly partitions are created this far ahead, checked every poll by the
+    # partition worker; 0 retention keeps every month attached
+    ATTENDANCE_PARTITION_MONTHS_AHEAD: int = 3
+    ATTENDANCE_PARTITION_POLL_SECONDS: float = 3600.0
+    ATTENDANCE_PARTITION_RETENTION_MONTHS: int = 0
+    ATTENDANCE_ARCHIVE_TABLESPACE: Optional[str] = None
 
     # Initial Admin User Settings
     FIRST_SUPERUSER: str = "admin@example.com"
@@ -1,9 +1,122 @@
+from typing import Any, Dict, Optional, Type
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import Pool
 
+from .cache import track_cache_invalidation
 from .config import settings
+from .pool_metrics import (
+    TimedAsyncAdaptedQueuePool,
+    TimedNullPool,
+    TimedQueuePool,
+    instrument_engine
+)
+
+def engine_options(
+    name: str, pool_class: Type[Pool], pgbouncer: Optional[bool] = None, **overrides: Any
+) -> Dict[str, Any]:
+    """
+    Pool arguments for create_engine / create_async_engine. In PgBouncer mode
+    connections are opened per checkout and pooled by PgBouncer instead.
+    """
+    options: Dict[str, Any] = {
+        "pool_logging_name": name,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING
+    }
+    if pgbouncer is None:
+        pgbouncer = settings.DB_PGBOUNCER_MODE
+    if pgbouncer:
+        options["poolclass"] = TimedNullPool
+    else:
+        options.update(
+            poolclass=pool_class,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE
+        )
+    options.update(overrides)
+    return options
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    **engine_options("primary", TimedQueuePool)
+)
+instrument_engine(engine, "primary")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def create_asyncpg_engine(uri: str, name: str):
+    url = make_url(uri).set(drivername="postgresql+asyncpg")
+    connect_args: Dict[str, Any] = {}
+    if settings.DB_PGBOUNCER_MODE:
+        # Transaction pooling hands each transaction a different server connection,
+        # so statements prepared on one are missing on the next
+        url = url.update_query_dict({"prepared_statement_cache_size": "0"})
+        connect_args["statement_cache_size"] = 0
+    return create_async_engine(
+        url,
+        connect_args=connect_args,
+        **engine_options(name, TimedAsyncAdaptedQueuePool)
+    )
+
+# asyncpg engine for the API routers; the sync engine above stays for scripts and workers
+async_engine = create_asyncpg_engine(str(settings.SQLALCHEMY_DATABASE_URI), "primary_async")
+instrument_engine(async_engine.sync_engine, "primary_async")
+# Objects stay loaded after commit so responses serialize without lazy loads
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Read replica for reports and analytics; without one, reads stay on the primary
+if settings.SQLALCHEMY_REPLICA_URI:
+    replica_engine = create_engine(
+        str(settings.SQLALCHEMY_REPLICA_URI),
+        **engine_options("replica", TimedQueuePool)
+    )
+    instrument_engine(replica_engine, "replica")
+    async_replica_engine = create_asyncpg_engine(str(settings.SQLALCHEMY_REPLICA_URI), "replica_async")
+    instrument_engine(async_replica_engine.sync_engine, "replica_async")
+else:
+    replica_engine = engine
+    async_replica_engine = async_engine
+
+class RoutingSession(Session):
+    """
+    Sends reads to the replica and everything else to the primary. Once the
+    session has written (a flush, an INSERT/UPDATE/DELETE or SELECT ... FOR
+    UPDATE) or `use_primary()` is called, it stays on the primary so later
+    reads see its own writes, including after commit.
+    """
+
+    def __init__(self, primary_bind, replica_bind, **kwargs):
+        super().__init__(**kwargs)
+        self.primary_bind = primary_bind
+        self.replica_bind = replica_bind
+
+    def use_primary(self) -> None:
+        self.info["use_primary"] = True
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.info.get("use_primary"):
+            return self.primary_bind
+        if self._flushing or clause is None or not getattr(clause, "is_select", False) \
+                or getattr(clause, "_for_update_arg", None) is not None:
+            # Raw text() is treated as a write since it may be one
+            self.use_primary()
+            return self.primary_bind
+        return self.replica_bind
+
+ReadSessionLocal = sessionmaker(
+    class_=RoutingSession, autoflush=False,
+    primary_bind=engine, replica_bind=replica_engine
+)
+AsyncReadSessionLocal = async_sessionmaker(
+    sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False,
+    primary_bind=async_engine.sync_engine, replica_bind=async_replica_engine.sync_engine
+)
+
+# Cached responses are invalidated by the tables each committed transaction wrote
+track_cache_invalidation(Session)
+
 Base = declarative_base()
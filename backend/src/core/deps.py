@@ -1,21 +1,27 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from typing import AsyncGenerator, Generator, Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import ValidationError
 
 from .config import settings
-from .database import SessionLocal
+from .jwt_keys import get_key_ring
+from .database import SessionLocal, AsyncSessionLocal, ReadSessionLocal, AsyncReadSessionLocal
+from .principals import Principal, principal_cache, track_principal_invalidation
+from .security import revoked_sessions
 from ..crud.auth import auth_crud
 from ..schemas.auth import TokenPayload
-from ..models.student import Student
-from ..models.staff import Staff
+from ..models.identity import Identity
 
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
 )
 
+track_principal_invalidation(Session)
+
 def get_db() -> Generator:
     db = SessionLocal()
     try:
@@ -23,42 +29,90 @@ def get_db() -> Generator:
     finally:
         db.close()
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Clients that must see a write they just made send this header to skip the replica
+READ_PRIMARY_HEADER = "X-Read-Primary"
+
+def get_read_db(request: Request) -> Generator:
+    """Session for read-only endpoints; reads go to the replica, see RoutingSession"""
+    db = ReadSessionLocal()
+    if request.headers.get(READ_PRIMARY_HEADER):
+        db.use_primary()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncReadSessionLocal() as db:
+        if request.headers.get(READ_PRIMARY_HEADER):
+            db.sync_session.use_primary()
+        yield db
+
 async def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> Optional[Student | Staff]:
+    token: str = Depends(oauth2_scheme)
+) -> Principal:
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = get_key_ring().decode(token)
         token_data = TokenPayload(**payload)
     except (JWTError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
+    if token_data.sid and token_data.sid in revoked_sessions:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
-    user = None
     role = payload.get("role")
+    key = (role, token_data.sub, payload.get("iat"))
+    principal = principal_cache.get(key)
+    if principal is not None:
+        return principal
+
+    kind = None
     if role == "student":
-        user = db.query(Student).filter(Student.id == token_data.sub).first()
+        kind = "student"
     elif role in ["teacher", "admin", "accountant", "librarian"]:
-        user = db.query(Staff).filter(Staff.id == token_data.sub).first()
+        kind = "staff"
+    
+    row = None
+    if kind:
+        identities = Identity.__table__
+        generation = principal_cache.generation
+        # Own short-lived session, so the connection goes back to the pool
+        # before the handler runs instead of when the response is sent
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(
+                select(identities.c.role, identities.c.is_active).where(
+                    identities.c.kind == kind,
+                    identities.c.user_id == token_data.sub
+                )
+            )).first()
     
-    if not user:
+    if not row:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    principal = Principal(id=token_data.sub, role=row.role, is_active=bool(row.is_active))
+    principal_cache.put(key, principal, generation)
+    return principal
 
 def get_current_active_user(
-    current_user: Student | Staff = Depends(get_current_user),
-) -> Student | Staff:
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 def get_current_active_staff(
-    current_user: Staff = Depends(get_current_user),
-) -> Staff:
-    if not isinstance(current_user, Staff):
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
+    if not current_user.is_staff:
         raise HTTPException(
             status_code=403,
             detail="The user doesn't have enough privileges"
@@ -66,9 +120,9 @@ def get_current_active_staff(
     return current_user
 
 def get_current_active_admin(
-    current_user: Staff = Depends(get_current_active_staff),
-) -> Staff:
-    if current_user.role.value != "admin":
+    current_user: Principal = Depends(get_current_active_staff),
+) -> Principal:
+    if current_user.role != "admin":
         raise HTTPException(
             status_code=403,
             detail="The user doesn't have enough privileges"
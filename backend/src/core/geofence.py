@@ -0,0 +1,134 @@
+"""
+In-memory geofence evaluation.
+
+Fences are registered in a uniform latitude/longitude grid, so a batch of
+points is only tested against fences in the cells it touches, and every
+test runs over the whole batch at once with numpy.
+"""
+import math
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_METERS = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180
+
+# Fences spanning more cells than this are tested against every batch instead
+MAX_CELLS_PER_FENCE = 10000
+
+def haversine_meters(
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    center_latitude: float,
+    center_longitude: float
+) -> np.ndarray:
+    """Great-circle distance from every point to the center"""
+    lat = np.radians(latitudes)
+    center_lat = math.radians(center_latitude)
+    half_dlat = (lat - center_lat) / 2
+    half_dlon = (np.radians(longitudes) - math.radians(center_longitude)) / 2
+    a = np.sin(half_dlat) ** 2 + math.cos(center_lat) * np.cos(lat) * np.sin(half_dlon) ** 2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(a))
+
+def points_in_polygon(
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    vertices: np.ndarray
+) -> np.ndarray:
+    """Even-odd ray casting, treating latitude and longitude as planar at campus scale"""
+    inside = np.zeros(len(latitudes), dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for (lat1, lon1), (lat2, lon2) in zip(vertices, np.roll(vertices, 1, axis=0)):
+            crosses = (lat1 > latitudes) != (lat2 > latitudes)
+            edge_longitude = lon1 + (latitudes - lat1) * (lon2 - lon1) / (lat2 - lat1)
+            inside ^= crosses & (longitudes < edge_longitude)
+    return inside
+
+class GeofenceIndex:
+    """
+    Grid index over geofences. Accepts anything with id, polygon,
+    center_latitude, center_longitude and radius_meters attributes.
+    """
+
+    def __init__(self, fences: Iterable[Any], cell_degrees: float):
+        self.cell_degrees = cell_degrees
+        self._fences: Dict[int, Tuple[Tuple[float, float, float, float], str, Any]] = {}
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        self._unindexed: List[int] = []
+        for fence in fences:
+            self.add(fence)
+
+    def __len__(self) -> int:
+        return len(self._fences)
+
+    def add(self, fence: Any) -> None:
+        if fence.polygon:
+            vertices = np.asarray(fence.polygon, dtype=float)
+            bounds = (
+                vertices[:, 0].min(), vertices[:, 0].max(),
+                vertices[:, 1].min(), vertices[:, 1].max()
+            )
+            self._fences[fence.id] = (bounds, "polygon", vertices)
+        else:
+            half_lat = fence.radius_meters / METERS_PER_DEGREE
+            half_lon = half_lat / max(math.cos(math.radians(fence.center_latitude)), 1e-6)
+            bounds = (
+                fence.center_latitude - half_lat, fence.center_latitude + half_lat,
+                fence.center_longitude - half_lon, fence.center_longitude + half_lon
+            )
+            self._fences[fence.id] = (
+                bounds, "circle",
+                (fence.center_latitude, fence.center_longitude, fence.radius_meters)
+            )
+
+        min_lat, max_lat, min_lon, max_lon = bounds
+        rows = range(self._cell(min_lat), self._cell(max_lat) + 1)
+        columns = range(self._cell(min_lon), self._cell(max_lon) + 1)
+        if len(rows) * len(columns) > MAX_CELLS_PER_FENCE:
+            self._unindexed.append(fence.id)
+            return
+        for row in rows:
+            for column in columns:
+                self._cells.setdefault((row, column), []).append(fence.id)
+
+    def _cell(self, degrees: float) -> int:
+        return math.floor(degrees / self.cell_degrees)
+
+    def locate(self, latitudes: Sequence[float], longitudes: Sequence[float]) -> np.ndarray:
+        """
+        Return, for every point, the id of the first geofence (lowest id) that
+        contains it, or -1 when it is outside all of them.
+        """
+        lat = np.asarray(latitudes, dtype=float)
+        lon = np.asarray(longitudes, dtype=float)
+        result = np.full(len(lat), -1, dtype=np.int64)
+        if not len(lat) or not self._fences:
+            return result
+
+        cells = np.unique(
+            np.stack([
+                np.floor(lat / self.cell_degrees),
+                np.floor(lon / self.cell_degrees)
+            ], axis=1).astype(np.int64),
+            axis=0
+        )
+        candidates = set(self._unindexed)
+        for row, column in cells.tolist():
+            candidates.update(self._cells.get((row, column), ()))
+
+        for fence_id in sorted(candidates):
+            (min_lat, max_lat, min_lon, max_lon), kind, shape = self._fences[fence_id]
+            pending = np.nonzero(
+                (result < 0)
+                & (lat >= min_lat) & (lat <= max_lat)
+                & (lon >= min_lon) & (lon <= max_lon)
+            )[0]
+            if not len(pending):
+                continue
+            if kind == "polygon":
+                inside = points_in_polygon(lat[pending], lon[pending], shape)
+            else:
+                center_lat, center_lon, radius = shape
+                inside = haversine_meters(lat[pending], lon[pending], center_lat, center_lon) <= radius
+            result[pending[inside]] = fence_id
+        return result
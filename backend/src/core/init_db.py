@@ -1,11 +1,17 @@
-from sqlalchemy import text
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
 import logging
+import os
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
 from sqlalchemy.orm import Session
 from datetime import datetime
 
 from .database import Base, engine, SessionLocal
 from .config import settings
 from .security import get_password_hash
+from ..crud.attendance_partitions import ensure_attendance_partitions
 # Import all models to ensure they are registered
 from .. import models  # noqa: F401
 from ..models.staff import Staff, StaffRole
@@ -13,15 +19,55 @@ from ..models.staff import Staff, StaffRole
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "migrations"
+)
+# Serializes schema creation between processes starting at the same time
+SCHEMA_LOCK_ID = 7214309
+
+def migration_scripts() -> ScriptDirectory:
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    return ScriptDirectory.from_config(config)
+
+def create_schema(connection: Connection) -> bool:
+    """
+    Create the schema on an empty database. Alembic owns it from then on:
+    create_all only ever runs on an empty database, which is stamped at the
+    migrations head, and an existing one has to be brought up to date with
+    `alembic upgrade head`. Returns False while that is still outstanding.
+    """
+    connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": SCHEMA_LOCK_ID})
+    inspector = inspect(connection)
+    scripts = migration_scripts()
+    head = scripts.get_current_head()
+    if inspector.has_table("alembic_version"):
+        current = MigrationContext.configure(connection).get_current_heads()
+        if current != (head,):
+            logger.error(f"Database schema is at {current}, not {head}; run `alembic upgrade head`")
+            return False
+        return True
+    if inspector.has_table(Staff.__tablename__):
+        # Created by create_all before migrations were introduced
+        logger.error("Database schema is not managed by Alembic yet; run `alembic upgrade head`")
+        return False
+
+    Base.metadata.create_all(bind=connection)
+    MigrationContext.configure(connection).stamp(scripts, head)
+    logger.info("Database tables created successfully")
+    return True
+
 def init_db() -> None:
     try:
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created successfully")
+        with engine.begin() as connection:
+            if not create_schema(connection):
+                return
         
         # Create initial admin user if it doesn't exist
         db = SessionLocal()
         try:
+            # Partitioned tables reject rows until a matching partition exists
+            ensure_attendance_partitions(db, settings.ATTENDANCE_PARTITION_MONTHS_AHEAD)
             create_initial_admin(db)
         finally:
             db.close()
@@ -0,0 +1,137 @@
+"""
+Signing keys for access tokens.
+
+Without JWT_KEYS_DIR tokens are signed with SECRET_KEY using ALGORITHM
+(HS256), as before. With it, tokens are signed with a private key from the
+key ring and carry its id in the "kid" header, so anything holding the
+public keys from /.well-known/jwks.json can verify them without the secret.
+
+The directory holds `<kid>.pem` private keys and `<kid>.pub.pem` public
+keys of retired ones. RSA keys sign RS256, P-256 keys ES256. Keys are
+parsed once when the ring is loaded, not per request. To rotate:
+
+1. `python -m src.scripts.generate_jwt_key --kid <new>` and restart; the
+   new key is published in the JWKS but does not sign yet.
+2. Set JWT_ACTIVE_KEY_ID=<new> and restart once edge caches have the JWKS.
+3. After ACCESS_TOKEN_EXPIRE_MINUTES, `--retire <old>` keeps only its
+   public half; delete it later.
+"""
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwk, jwt, JWTError
+from jose.backends.base import Key
+
+from .config import settings
+
+PRIVATE_SUFFIX = ".pem"
+PUBLIC_SUFFIX = ".pub.pem"
+
+def algorithm_for(pem: bytes) -> str:
+    """RS256 for RSA keys, ES256 for P-256 keys, private or public"""
+    try:
+        parsed = serialization.load_pem_private_key(pem, password=None).public_key()
+    except (ValueError, TypeError):
+        parsed = serialization.load_pem_public_key(pem)
+    if isinstance(parsed, rsa.RSAPublicKey):
+        return "RS256"
+    if isinstance(parsed, ec.EllipticCurvePublicKey) and isinstance(parsed.curve, ec.SECP256R1):
+        return "ES256"
+    raise ValueError(f"Unsupported JWT signing key type {type(parsed).__name__}")
+
+class KeyRing:
+    """Verification keys by kid; `active_kid` also signs"""
+
+    def __init__(self, verify_keys: Dict[Optional[str], Tuple[str, Key]],
+                 active_kid: Optional[str], signing_key: Key):
+        # kid -> (algorithm, public key, or the secret for HMAC)
+        self.verify_keys = verify_keys
+        self.active_kid = active_kid
+        self.signing_key = signing_key
+
+    @classmethod
+    def from_secret(cls, secret: str, algorithm: str) -> "KeyRing":
+        """A single shared secret; tokens carry no kid"""
+        key = jwk.construct(secret, algorithm)
+        return cls({None: (algorithm, key)}, None, key)
+
+    @classmethod
+    def from_pem(cls, pems: Dict[str, bytes], active_kid: Optional[str] = None) -> "KeyRing":
+        keys = {}
+        for kid, pem in pems.items():
+            algorithm = algorithm_for(pem)
+            keys[kid] = (algorithm, jwk.construct(pem, algorithm))
+        private = [kid for kid, (_, key) in keys.items() if not key.is_public()]
+        if active_kid is None:
+            if len(private) != 1:
+                raise ValueError("Set JWT_ACTIVE_KEY_ID to choose the signing key")
+            active_kid = private[0]
+        if active_kid not in private:
+            raise ValueError(f"No private JWT signing key {active_kid!r} in the key ring")
+        verify_keys = {kid: (algorithm, key.public_key()) for kid, (algorithm, key) in keys.items()}
+        return cls(verify_keys, active_kid, keys[active_kid][1])
+
+    @classmethod
+    def from_directory(cls, path: str, active_kid: Optional[str] = None) -> "KeyRing":
+        pems = {}
+        for name in sorted(os.listdir(path)):
+            if name.endswith(PUBLIC_SUFFIX):
+                kid = name[:-len(PUBLIC_SUFFIX)]
+            elif name.endswith(PRIVATE_SUFFIX):
+                kid = name[:-len(PRIVATE_SUFFIX)]
+            else:
+                continue
+            # A private key wins over a leftover public copy of itself
+            if kid in pems and name.endswith(PUBLIC_SUFFIX):
+                continue
+            with open(os.path.join(path, name), "rb") as f:
+                pems[kid] = f.read()
+        return cls.from_pem(pems, active_kid)
+
+    @property
+    def asymmetric(self) -> bool:
+        return self.active_kid is not None
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        algorithm = self.verify_keys[self.active_kid][0]
+        headers = {"kid": self.active_kid} if self.asymmetric else None
+        return jwt.encode(claims, self.signing_key, algorithm=algorithm, headers=headers)
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Verified claims; raises JWTError for a bad token or an unknown kid"""
+        kid = jwt.get_unverified_header(token).get("kid") if self.asymmetric else None
+        if kid not in self.verify_keys:
+            raise JWTError(f"Unknown signing key {kid!r}")
+        algorithm, key = self.verify_keys[kid]
+        return jwt.decode(token, key, algorithms=[algorithm])
+
+    def jwks(self) -> Dict[str, Any]:
+        """Public keys as a JWK Set; empty for a shared secret, which must stay private"""
+        if not self.asymmetric:
+            return {"keys": []}
+        return {"keys": [
+            {**key.to_dict(), "kid": kid, "use": "sig"}
+            for kid, (_, key) in self.verify_keys.items()
+        ]}
+
+_key_ring: Optional[KeyRing] = None
+_key_ring_lock = threading.Lock()
+
+def get_key_ring() -> KeyRing:
+    global _key_ring
+    with _key_ring_lock:
+        if _key_ring is None:
+            if settings.JWT_KEYS_DIR:
+                _key_ring = KeyRing.from_directory(settings.JWT_KEYS_DIR, settings.JWT_ACTIVE_KEY_ID)
+            else:
+                _key_ring = KeyRing.from_secret(settings.SECRET_KEY, settings.ALGORITHM)
+        return _key_ring
+
+def set_key_ring(key_ring: Optional[KeyRing]) -> None:
+    """Replace the ring, e.g. after rotating keys; None reloads it from settings"""
+    global _key_ring
+    with _key_ring_lock:
+        _key_ring = key_ring
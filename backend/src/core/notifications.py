@@ -0,0 +1,213 @@
+"""
+Delivery channels for guardian notifications.
+
+Every channel takes a batch of `GuardianMessage`s and reports, per message,
+None on success or a `DeliveryError`. Errors are retryable unless the message
+can never be delivered through that channel (e.g. a guardian without an
+email address). `FakeChannel` records messages instead of sending them and
+stands in for any channel when NOTIFICATION_FAKE_CHANNELS is set.
+"""
+import hashlib
+import hmac
+import json
+import smtplib
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Sequence
+
+from .config import settings
+
+@dataclass
+class GuardianMessage:
+    """All notifications for one guardian on one channel, delivered as one message"""
+    guardian_id: int
+    guardian_name: str
+    email: Optional[str]
+    contact_number: Optional[str]
+    channel: str
+    notification_ids: List[int]
+    attempts: List[int]
+    lines: List[str] = field(default_factory=list)
+
+    @property
+    def body(self) -> str:
+        return "\n".join(self.lines)
+
+class DeliveryError(Exception):
+    def __init__(self, reason: str, retryable: bool = True):
+        super().__init__(reason)
+        self.retryable = retryable
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class NotificationChannel:
+    name: str = ""
+
+    def __init__(self, rate_limit: Optional[float] = None):
+        self.bucket = TokenBucket(rate_limit) if rate_limit else None
+
+    def send_batch(self, messages: Sequence[GuardianMessage]) -> List[Optional[DeliveryError]]:
+        results = []
+        for message in messages:
+            try:
+                if self.bucket:
+                    self.bucket.acquire()
+                self.send(message)
+                results.append(None)
+            except DeliveryError as e:
+                results.append(e)
+            except Exception as e:
+                results.append(DeliveryError(f"{type(e).__name__}: {e}"))
+        return results
+
+    def send(self, message: GuardianMessage) -> None:
+        raise NotImplementedError
+
+def _post_json(url: str, body: bytes, headers: Dict[str, str]) -> None:
+    request = urllib.request.Request(
+        url, data=body, method="POST",
+        headers={"Content-Type": "application/json", **headers}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=settings.NOTIFICATION_SEND_TIMEOUT_SECONDS):
+            pass
+    except urllib.error.HTTPError as e:
+        # Client errors other than throttling will fail the same way next time
+        raise DeliveryError(
+            f"HTTP {e.code} from {url}",
+            retryable=e.code >= 500 or e.code in (408, 429)
+        )
+    except (urllib.error.URLError, OSError) as e:
+        raise DeliveryError(f"Could not reach {url}: {e}")
+
+class SMTPChannel(NotificationChannel):
+    name = "smtp"
+
+    def __init__(self, rate_limit: Optional[float] = None):
+        super().__init__(rate_limit)
+        # Batches may be sent from several threads, each with its own connection
+        self._local = threading.local()
+
+    def send_batch(self, messages: Sequence[GuardianMessage]) -> List[Optional[DeliveryError]]:
+        # One connection for the whole batch rather than one per message
+        try:
+            connection = smtplib.SMTP(
+                settings.SMTP_HOST, settings.SMTP_PORT,
+                timeout=settings.NOTIFICATION_SEND_TIMEOUT_SECONDS
+            )
+            if settings.SMTP_USE_TLS:
+                connection.starttls()
+            if settings.SMTP_USER:
+                connection.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        except (smtplib.SMTPException, OSError) as e:
+            error = DeliveryError(f"SMTP connection failed: {e}")
+            return [error] * len(messages)
+        self._local.connection = connection
+        try:
+            return super().send_batch(messages)
+        finally:
+            self._local.connection = None
+            try:
+                connection.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+
+    def send(self, message: GuardianMessage) -> None:
+        if not message.email:
+            raise DeliveryError("Guardian has no email address", retryable=False)
+        email = EmailMessage()
+        email["From"] = settings.SMTP_FROM or settings.SMTP_USER
+        email["To"] = message.email
+        email["Subject"] = f"{settings.PROJECT_NAME}: attendance update"
+        email.set_content(f"Dear {message.guardian_name},\n\n{message.body}\n")
+        try:
+            self._local.connection.send_message(email)
+        except smtplib.SMTPRecipientsRefused as e:
+            raise DeliveryError(f"Recipient refused: {e}", retryable=False)
+        except (smtplib.SMTPException, OSError) as e:
+            raise DeliveryError(f"SMTP send failed: {e}")
+
+class SMSChannel(NotificationChannel):
+    """Posts {"to", "message"} as JSON to an HTTP SMS gateway"""
+    name = "sms"
+
+    def send(self, message: GuardianMessage) -> None:
+        if not message.contact_number:
+            raise DeliveryError("Guardian has no contact number", retryable=False)
+        headers = {}
+        if settings.SMS_GATEWAY_TOKEN:
+            headers["Authorization"] = f"Bearer {settings.SMS_GATEWAY_TOKEN}"
+        body = json.dumps({"to": message.contact_number, "message": message.body}).encode()
+        _post_json(settings.SMS_GATEWAY_URL, body, headers)
+
+class WebhookChannel(NotificationChannel):
+    """Posts the notifications as JSON, signed with an HMAC-SHA256 of the body"""
+    name = "webhook"
+
+    def send(self, message: GuardianMessage) -> None:
+        body = json.dumps({
+            "guardian_id": message.guardian_id,
+            "notification_ids": message.notification_ids,
+            "message": message.body
+        }).encode()
+        headers = {}
+        if settings.NOTIFICATION_WEBHOOK_SECRET:
+            headers["X-Signature-SHA256"] = hmac.new(
+                settings.NOTIFICATION_WEBHOOK_SECRET.encode(), body, hashlib.sha256
+            ).hexdigest()
+        _post_json(settings.NOTIFICATION_WEBHOOK_URL, body, headers)
+
+class FakeChannel(NotificationChannel):
+    """Records messages in `sent`; fails them with `fail_with` when set"""
+
+    def __init__(self, name: str, rate_limit: Optional[float] = None,
+                 fail_with: Optional[DeliveryError] = None):
+        super().__init__(rate_limit)
+        self.name = name
+        self.fail_with = fail_with
+        self.sent: List[GuardianMessage] = []
+        self._lock = threading.Lock()
+
+    def send(self, message: GuardianMessage) -> None:
+        if self.fail_with:
+            raise self.fail_with
+        with self._lock:
+            self.sent.append(message)
+
+CHANNEL_CLASSES = {
+    channel.name: channel
+    for channel in (SMTPChannel, SMSChannel, WebhookChannel)
+}
+
+def build_channels(fake: Optional[bool] = None) -> Dict[str, NotificationChannel]:
+    """Create every channel with its configured rate limit"""
+    if fake is None:
+        fake = settings.NOTIFICATION_FAKE_CHANNELS
+    rate_limits = settings.NOTIFICATION_RATE_LIMITS
+    if fake:
+        return {name: FakeChannel(name, rate_limits.get(name)) for name in CHANNEL_CLASSES}
+    return {name: cls(rate_limits.get(name)) for name, cls in CHANNEL_CLASSES.items()}
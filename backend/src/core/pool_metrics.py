@@ -0,0 +1,116 @@
+"""
+Connection pool metrics.
+
+Engines are created with the Timed* pool classes below and registered with
+`instrument_engine`, which counts checkouts, checkins, new connections and
+invalidations per pool. The pools themselves time every checkout, so the
+wait for a free connection and the number of `QueuePool limit` timeouts show
+up before requests start failing. `pool_metrics_snapshot` is served at
+/health/db.
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.engine: Optional[Engine] = None
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = {
+                "name": self.name,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.wait_seconds / self.waits * 1000, 3) if self.waits else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3)
+            }
+        pool = self.engine.pool if self.engine is not None else None
+        if pool is not None:
+            snapshot["pool_class"] = type(pool).__name__
+            if isinstance(pool, QueuePool):
+                snapshot.update(
+                    size=pool.size(),
+                    checked_in=pool.checkedin(),
+                    checked_out=pool.checkedout(),
+                    overflow=max(pool.overflow(), 0)
+                )
+        return snapshot
+
+POOL_METRICS: Dict[str, PoolMetrics] = {}
+_registry_lock = threading.Lock()
+
+def metrics_for(name: str) -> PoolMetrics:
+    with _registry_lock:
+        metrics = POOL_METRICS.get(name)
+        if metrics is None:
+            metrics = POOL_METRICS[name] = PoolMetrics(name)
+        return metrics
+
+class TimedPoolMixin:
+    """Times every checkout; the metrics are keyed by the pool's logging name"""
+
+    def _do_get(self):
+        metrics = metrics_for(self._orig_logging_name or "default")
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+class TimedNullPool(TimedPoolMixin, NullPool):
+    pass
+
+def instrument_engine(engine: Engine, name: str) -> PoolMetrics:
+    """Count pool events for a sync engine (pass `async_engine.sync_engine` for async ones)"""
+    metrics = metrics_for(name)
+    metrics.engine = engine
+    # Listeners on the engine carry over when the pool is recreated
+    event.listen(engine, "checkout", lambda *args: metrics.increment("checkouts"))
+    event.listen(engine, "checkin", lambda *args: metrics.increment("checkins"))
+    event.listen(engine, "connect", lambda *args: metrics.increment("connects"))
+    event.listen(engine, "invalidate", lambda *args: metrics.increment("invalidations"))
+    return metrics
+
+def pool_metrics_snapshot() -> List[Dict[str, Any]]:
+    with _registry_lock:
+        metrics = list(POOL_METRICS.values())
+    return [m.snapshot() for m in metrics]
@@ -0,0 +1,128 @@
+"""
+Principal cache for get_current_user.
+
+Authenticated requests resolve their token to a `Principal` (id, role,
+is_active) kept for PRINCIPAL_CACHE_TTL_SECONDS under (role, sub, iat), so
+most requests run no user query at all. A principal is dropped as soon as a
+transaction in this process commits a change to its student or staff row
+(password change, staff update, deactivation); other processes pick the
+change up within the TTL. Handlers that need the full row call
+`principal.load(db)`.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .config import settings
+from ..models.student import Student
+from ..models.staff import Staff
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    role: str
+    is_active: bool
+
+    @property
+    def is_staff(self) -> bool:
+        return self.role != "student"
+
+    @property
+    def model(self) -> type:
+        return Staff if self.is_staff else Student
+
+    def load(self, db: Session) -> Optional[Student | Staff]:
+        """The full row; with an AsyncSession use `await db.run_sync(principal.load)`"""
+        return db.get(self.model, self.id)
+
+# (token role, sub, iat)
+PrincipalKey = Tuple[Optional[str], Optional[int], Any]
+
+class PrincipalCache:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[PrincipalKey, Tuple[float, Principal]]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        """Read before loading a principal and pass to put(), so a load racing an invalidation is not cached"""
+        return self._generation
+
+    def get(self, key: PrincipalKey) -> Optional[Principal]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, principal = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return principal
+
+    def put(self, key: PrincipalKey, principal: Principal, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, users: Set[Tuple[bool, int]]) -> None:
+        """Drop the principals of (is_staff, id) pairs"""
+        with self._lock:
+            self._generation += 1
+            for key, (_, principal) in list(self._entries.items()):
+                if (principal.is_staff, principal.id) in users:
+                    del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+principal_cache = PrincipalCache(
+    settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    settings.PRINCIPAL_CACHE_MAX_ENTRIES
+)
+
+def track_principal_invalidation(session_class: type) -> None:
+    """Invalidate principals whose student or staff row a committed transaction changed"""
+    user_tables = {Student.__tablename__, Staff.__tablename__}
+
+    @event.listens_for(session_class, "after_flush")
+    def after_flush(session, flush_context):
+        for instance in (*session.dirty, *session.deleted):
+            if isinstance(instance, (Student, Staff)):
+                session.info.setdefault("principals", set()).add(
+                    (isinstance(instance, Staff), instance.id)
+                )
+
+    @event.listens_for(session_class, "do_orm_execute")
+    def do_orm_execute(orm_execute_state):
+        # Bulk UPDATE/DELETE can touch any row, so forget everyone
+        if orm_execute_state.is_update or orm_execute_state.is_delete:
+            table = getattr(orm_execute_state.statement, "table", None)
+            if getattr(table, "name", None) in user_tables:
+                orm_execute_state.session.info["principals_all"] = True
+
+    @event.listens_for(session_class, "after_commit")
+    def after_commit(session):
+        users = session.info.pop("principals", None)
+        if session.info.pop("principals_all", False):
+            principal_cache.clear()
+        elif users:
+            principal_cache.invalidate(users)
+
+    @event.listens_for(session_class, "after_rollback")
+    def after_rollback(session):
+        session.info.pop("principals", None)
+        session.info.pop("principals_all", None)
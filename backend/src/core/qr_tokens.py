@@ -0,0 +1,75 @@
+"""
+Signed, time-boxed QR attendance tokens.
+
+A token carries the class section, subject, period, issuing teacher and
+expiry together with an HMAC over all of them, so a scan is validated from
+the token alone. Codes invalidated before they expire are kept in
+`revoked_qr_tokens`, which only has to remember them until that expiry.
+"""
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+from typing import Optional, Tuple
+
+from .config import settings
+from .revocations import RevocationSet
+from ..schemas.attendance import QRTokenClaims
+
+TOKEN_VERSION = "v1"
+
+def _signature(payload: str) -> str:
+    key = (settings.QR_TOKEN_SECRET or settings.SECRET_KEY).encode()
+    digest = hmac.new(key, payload.encode(), hashlib.sha256).digest()[:16]
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+def issue_qr_token(
+    class_section_id: int,
+    subject_id: int,
+    period_number: int,
+    teacher_id: int,
+    ttl_seconds: Optional[int] = None
+) -> Tuple[str, int]:
+    """Return a new token and the Unix time it expires"""
+    expires_at = int(time.time()) + (ttl_seconds or settings.QR_TOKEN_TTL_SECONDS)
+    # The nonce identifies this code for revocation; token_hex never contains "."
+    token_id = secrets.token_hex(8)
+    payload = ".".join(str(part) for part in (
+        TOKEN_VERSION, class_section_id, subject_id, period_number,
+        teacher_id, expires_at, token_id
+    ))
+    return f"{payload}.{_signature(payload)}", expires_at
+
+def verify_qr_token(token: str, now: Optional[float] = None) -> QRTokenClaims:
+    """Validate a token in memory, raises ValueError with the reason it was rejected"""
+    payload, _, signature = token.rpartition(".")
+    parts = payload.split(".")
+    if len(parts) != 7 or parts[0] != TOKEN_VERSION:
+        raise ValueError("Malformed QR code")
+    if not hmac.compare_digest(signature, _signature(payload)):
+        raise ValueError("Invalid QR code signature")
+
+    try:
+        class_section_id, subject_id, period_number, teacher_id, expires_at = (
+            int(part) for part in parts[1:6]
+        )
+    except ValueError:
+        raise ValueError("Malformed QR code")
+    token_id = parts[6]
+
+    if expires_at <= (now if now is not None else time.time()):
+        raise ValueError("QR code has expired")
+    if token_id in revoked_qr_tokens:
+        raise ValueError("QR code has been revoked")
+
+    return QRTokenClaims(
+        token_id=token_id,
+        class_section_id=class_section_id,
+        subject_id=subject_id,
+        period_number=period_number,
+        teacher_id=teacher_id,
+        expires_at=expires_at
+    )
+
+revoked_qr_tokens = RevocationSet()
@@ -0,0 +1,38 @@
+"""
+In-memory revocation lists for self-contained tokens.
+
+Tokens validated without a database read (QR codes, access tokens) are
+rejected through a set of revoked ids that every process keeps in memory.
+Each id only needs remembering until the tokens it covers expire, which
+keeps the set small; a background refresher merges in revocations made by
+other processes.
+"""
+import threading
+import time
+from typing import Dict
+
+class RevocationSet:
+    """Revoked token ids, each forgotten once its token would have expired anyway"""
+
+    def __init__(self):
+        self._expiries: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, token_id: str) -> bool:
+        expires_at = self._expiries.get(token_id)
+        return expires_at is not None and expires_at > time.time()
+
+    def add(self, token_id: str, expires_at: float) -> None:
+        with self._lock:
+            self._expiries[token_id] = expires_at
+
+    def merge(self, expiries: Dict[str, float]) -> None:
+        """Fold in revocations made by other processes and drop expired entries"""
+        now = time.time()
+        with self._lock:
+            merged = {**self._expiries, **expiries}
+            self._expiries = {
+                token_id: expires_at
+                for token_id, expires_at in merged.items()
+                if expires_at > now
+            }
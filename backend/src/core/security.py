@@ -1,14 +1,28 @@
+import asyncio
+import hashlib
+import secrets
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Callable, Optional, Tuple, Union
 from passlib.context import CryptContext
-from jose import jwt
 
 from .config import settings
+from .jwt_keys import get_key_ring
+from .revocations import RevocationSet
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes with any other cost are upgraded (or downgraded) on the next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS
+)
 
 def create_access_token(
-    subject: Union[str, Any], expires_delta: timedelta = None, role: str = None
+    subject: Union[str, Any], expires_delta: timedelta = None, role: str = None,
+    session_id: str = None
 ) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -16,14 +30,79 @@ def create_access_token(
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {"exp": expire, "iat": datetime.utcnow(), "sub": str(subject)}
     if role:
         to_encode["role"] = role
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    if session_id:
+        # Lets the session be revoked before the token expires, see revoked_sessions
+        to_encode["sid"] = session_id
+    return get_key_ring().encode(to_encode)
+
+# Session ids (the sid claim) revoked before their access tokens expired
+revoked_sessions = RevocationSet()
+
+def new_session_id() -> str:
+    return secrets.token_hex(8)
+
+def new_refresh_token() -> str:
+    return secrets.token_urlsafe(32)
+
+def hash_refresh_token(token: str) -> str:
+    # Refresh tokens are random, so a fast hash is as good as bcrypt here
+    return hashlib.sha256(token.encode()).hexdigest()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+class PasswordHasherBusy(Exception):
+    """More password operations are pending than PASSWORD_HASH_MAX_PENDING"""
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a bounded thread pool so async handlers never hash on the
+    event loop. bcrypt releases the GIL, so the workers use separate cores.
+    Once `max_pending` operations are queued or running, new ones are
+    refused with PasswordHasherBusy instead of queueing without limit.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="password-hash")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _submit(self, fn: Callable, *args: Any) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHasherBusy()
+            self._pending += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def verify_and_update(
+        self, password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """(verified, new hash when the stored one uses another cost factor)"""
+        return await asyncio.wrap_future(
+            self._submit(pwd_context.verify_and_update, password, hashed_password)
+        )
+
+    async def hash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(pwd_context.hash, password))
+
+password_hasher = PasswordHasher(
+    settings.PASSWORD_HASH_WORKERS,
+    settings.PASSWORD_HASH_MAX_PENDING
+)
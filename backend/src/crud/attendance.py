@@ -1,24 +1,45 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator, Tuple, Union
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
-from datetime import datetime, date
+from sqlalchemy import and_, or_, func, insert, select, update, tuple_, bindparam, literal, literal_column, Date, Float
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime, date, time, timedelta, timezone
+import base64
+import json
 import uuid
 
 from ..models.attendance import (
     StudentAttendance,
     AttendanceAuditLog,
     QRCodeAttendance,
+    QRTokenRevocation,
     GeolocationAttendance,
     OfflineAttendanceSync,
     AttendanceNotification,
-    AttendanceStatus
+    AttendanceDailyRollup,
+    AttendanceStatus,
+    AttendanceMarkingMethod
 )
+from ..models.student import Student
+from ..models.guardian import Guardian
+from ..models.timetable import Period
+from ..models.subject import Subject
+from .geofence import get_geofence_index
+from .attendance_rollup import (
+    record_attendance_changes,
+    STATUS_COLUMNS as ROLLUP_STATUS_COLUMNS
+)
+from ..core.qr_tokens import revoked_qr_tokens, verify_qr_token
+from ..workers.audit_log import audit_log_writer
 from ..schemas.attendance import (
     StudentAttendanceCreate,
     OfflineAttendanceRecord,
     OfflineAttendanceSyncCreate,
     GeolocationAttendanceCreate,
     QRCodeAttendanceCreate,
+    QRScan,
+    QRTokenClaims,
     AttendanceNotificationCreate
 )
 
@@ -27,34 +48,165 @@ def create_attendance(
     db: Session, attendance: StudentAttendanceCreate, user_id: int, 
     ip_address: str, user_agent: str
 ) -> StudentAttendance:
-    db_attendance = StudentAttendance(**attendance.dict())
+    db_attendance = StudentAttendance(**_attendance_row(attendance, user_id))
     db.add(db_attendance)
+    record_attendance_changes(db, [
+        (
+            attendance.student_id, attendance.class_section_id, attendance.subject_id,
+            attendance.date, attendance.status, 1
+        )
+    ])
     db.commit()
     db.refresh(db_attendance)
 
-    # Create audit log
-    audit_log = AttendanceAuditLog(
-        attendance_id=db_attendance.id,
-        modified_by=user_id,
-        old_status=None,
-        new_status=attendance.status,
-        action="CREATE",
-        reason="Initial attendance marking",
-        ip_address=ip_address,
-        user_agent=user_agent
-    )
-    db.add(audit_log)
-    db.commit()
+    # Written by the background audit writer, off the request path
+    audit_log_writer.submit([
+        _audit_entry(
+            db_attendance.id, user_id, None, attendance.status, "CREATE",
+            "Initial attendance marking", ip_address, user_agent
+        )
+    ])
 
     return db_attendance
 
-def get_student_attendance(
+def _audit_entry(
+    attendance_id: int,
+    user_id: int,
+    old_status: Optional[AttendanceStatus],
+    new_status: AttendanceStatus,
+    action: str,
+    reason: str,
+    ip_address: str,
+    user_agent: str
+) -> Dict[str, Any]:
+    # Stamped here rather than by the server default, which would record
+    # when the entry was flushed instead of when the change happened
+    return {
+        "attendance_id": attendance_id,
+        "modified_by": user_id,
+        "old_status": old_status,
+        "new_status": new_status,
+        "action": action,
+        "reason": reason,
+        "ip_address": ip_address,
+        "user_agent": user_agent,
+        "created_at": datetime.utcnow()
+    }
+
+def _attendance_row(
+    attendance: Union[StudentAttendanceCreate, OfflineAttendanceRecord], user_id: int
+) -> Dict[str, Any]:
+    # Keep only the fields that map onto student_attendances columns
+    data = attendance.dict()
+    columns = StudentAttendance.__table__.columns
+    row = {key: value for key, value in data.items() if key in columns}
+    row["note"] = data.get("remarks")
+    row["marked_by"] = user_id
+    return row
+
+def create_attendance_bulk(
+    db: Session,
+    attendances: List[StudentAttendanceCreate],
+    user_id: int,
+    ip_address: str,
+    user_agent: str
+) -> Dict[str, Any]:
+    """
+    Insert a batch of attendance records in a single transaction and hand
+    their audit logs to the background writer. Rows are validated up front
+    so that a bad row is reported individually instead of aborting the
+    whole batch.
+    """
+    results = [
+        {"index": index, "success": False, "attendance_id": None, "error": None}
+        for index in range(len(attendances))
+    ]
+
+    student_ids = {attendance.student_id for attendance in attendances}
+    known_students = {
+        row.id for row in db.query(Student.id).filter(Student.id.in_(student_ids))
+    }
+
+    keys = {
+        (attendance.student_id, attendance.date, attendance.period_number)
+        for attendance in attendances
+    }
+    marked = db.query(
+        StudentAttendance.student_id,
+        StudentAttendance.date,
+        StudentAttendance.period_number
+    ).filter(
+        tuple_(
+            StudentAttendance.student_id,
+            StudentAttendance.date,
+            StudentAttendance.period_number
+        ).in_(keys)
+    )
+    already_marked = {tuple(row) for row in marked} if keys else set()
+
+    accepted = []
+    seen = set()
+    for index, attendance in enumerate(attendances):
+        key = (attendance.student_id, attendance.date, attendance.period_number)
+        if attendance.student_id not in known_students:
+            results[index]["error"] = "Student not found"
+        elif key in already_marked:
+            results[index]["error"] = "Attendance already marked for this period"
+        elif key in seen:
+            results[index]["error"] = "Duplicate record in batch"
+        else:
+            seen.add(key)
+            accepted.append((index, attendance))
+
+    if accepted:
+        try:
+            # Multi-row INSERT ... RETURNING, ids come back in parameter order
+            attendance_ids = db.scalars(
+                insert(StudentAttendance).returning(
+                    StudentAttendance.id, sort_by_parameter_order=True
+                ),
+                [_attendance_row(attendance, user_id) for _, attendance in accepted]
+            ).all()
+
+            record_attendance_changes(db, [
+                (
+                    attendance.student_id, attendance.class_section_id, attendance.subject_id,
+                    attendance.date, attendance.status, 1
+                )
+                for _, attendance in accepted
+            ])
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            for index, _ in accepted:
+                results[index]["error"] = str(getattr(e, "orig", None) or e)
+            accepted = []
+        else:
+            audit_log_writer.submit([
+                _audit_entry(
+                    attendance_id, user_id, None, attendance.status, "CREATE",
+                    "Initial attendance marking", ip_address, user_agent
+                )
+                for attendance_id, (_, attendance) in zip(attendance_ids, accepted)
+            ])
+            for attendance_id, (index, _) in zip(attendance_ids, accepted):
+                results[index]["success"] = True
+                results[index]["attendance_id"] = attendance_id
+
+    return {
+        "total": len(attendances),
+        "created": len(accepted),
+        "failed": len(attendances) - len(accepted),
+        "results": results
+    }
+
+def _student_attendance_query(
     db: Session,
     student_id: int,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     subject_id: Optional[int] = None
-) -> List[StudentAttendance]:
+):
     query = db.query(StudentAttendance).filter(
         StudentAttendance.student_id == student_id
     )
@@ -65,8 +217,57 @@ def get_student_attendance(
         query = query.filter(StudentAttendance.date <= end_date)
     if subject_id:
         query = query.filter(StudentAttendance.subject_id == subject_id)
-        
-    return query.order_by(StudentAttendance.date, StudentAttendance.period_number).all()
+    return query
+
+# Keyset used for history pagination, NULL periods sort first
+HISTORY_KEYSET = (
+    StudentAttendance.date,
+    func.coalesce(StudentAttendance.period_number, 0),
+    StudentAttendance.id
+)
+
+def encode_attendance_cursor(attendance: StudentAttendance) -> str:
+    key = [attendance.date.isoformat(), attendance.period_number or 0, attendance.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+def decode_attendance_cursor(cursor: str) -> Tuple[datetime, int, int]:
+    try:
+        marked_at, period_number, attendance_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode())
+        )
+        return datetime.fromisoformat(marked_at), int(period_number), int(attendance_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def get_student_attendance(
+    db: Session,
+    student_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    subject_id: Optional[int] = None,
+    after: Optional[Tuple[datetime, int, int]] = None,
+    limit: Optional[int] = None
+) -> List[StudentAttendance]:
+    query = _student_attendance_query(db, student_id, start_date, end_date, subject_id)
+    if after:
+        query = query.filter(tuple_(*HISTORY_KEYSET) > after)
+
+    query = query.order_by(*HISTORY_KEYSET)
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+def stream_student_attendance(
+    db: Session,
+    student_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    subject_id: Optional[int] = None,
+    batch_size: int = 500
+) -> Iterator[StudentAttendance]:
+    """Yield the full history from a server-side cursor, batch_size rows at a time"""
+    query = _student_attendance_query(db, student_id, start_date, end_date, subject_id)
+    yield from query.order_by(*HISTORY_KEYSET).yield_per(batch_size)
 
 def update_attendance(
     db: Session,
@@ -86,20 +287,22 @@ def update_attendance(
         db_attendance.status = new_status
         db_attendance.updated_at = datetime.utcnow()
         
-        # Create audit log
-        audit_log = AttendanceAuditLog(
-            attendance_id=attendance_id,
-            modified_by=user_id,
-            old_status=old_status,
-            new_status=new_status,
-            action="UPDATE",
-            reason=reason,
-            ip_address=ip_address,
-            user_agent=user_agent
-        )
-        db.add(audit_log)
+        if old_status != new_status:
+            key = (
+                db_attendance.student_id, db_attendance.class_section_id,
+                db_attendance.subject_id, db_attendance.date
+            )
+            record_attendance_changes(db, [(*key, old_status, -1), (*key, new_status, 1)])
+        
         db.commit()
         db.refresh(db_attendance)
+
+        audit_log_writer.submit([
+            _audit_entry(
+                attendance_id, user_id, old_status, new_status, "UPDATE",
+                reason, ip_address, user_agent
+            )
+        ])
         
     return db_attendance
 
@@ -116,106 +319,569 @@ def create_qr_attendance(
     db.refresh(db_qr)
     return db_qr
 
-def verify_qr_code(
-    db: Session, qr_code: str
-) -> Optional[QRCodeAttendance]:
-    return db.query(QRCodeAttendance).filter(
-        QRCodeAttendance.qr_code == qr_code,
-        QRCodeAttendance.is_valid == True
-    ).first()
+def revoke_qr_token(db: Session, claims: QRTokenClaims, user_id: int) -> None:
+    """Apply a revocation locally at once and persist it for the other processes"""
+    revoked_qr_tokens.add(claims.token_id, claims.expires_at)
+    db.execute(
+        postgresql.insert(QRTokenRevocation)
+        .values(
+            token_id=claims.token_id,
+            expires_at=datetime.utcfromtimestamp(claims.expires_at),
+            revoked_by=user_id
+        )
+        .on_conflict_do_nothing()
+    )
+    db.commit()
+
+def get_active_qr_revocations(db: Session) -> Dict[str, float]:
+    """Revoked token ids mapped to the Unix time their token expires"""
+    rows = db.query(QRTokenRevocation.token_id, QRTokenRevocation.expires_at).filter(
+        QRTokenRevocation.expires_at > datetime.utcnow()
+    )
+    return {
+        row.token_id: row.expires_at.replace(tzinfo=timezone.utc).timestamp()
+        for row in rows
+    }
+
+def record_qr_scans(
+    db: Session,
+    scans: List[QRScan],
+    student_id: Optional[int],
+    ip_address: str,
+    user_agent: str
+) -> Dict[str, Any]:
+    """
+    Mark students present for a batch of QR scans. Tokens are checked in
+    memory, the database is only used to write the marks. `student_id`
+    limits the batch to one student when it comes from a student's device.
+    """
+    results = [
+        {"index": index, "success": False, "attendance_id": None, "error": None}
+        for index in range(len(scans))
+    ]
+    marked_on = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    claimed = []
+    for index, scan in enumerate(scans):
+        if student_id is not None and scan.student_id != student_id:
+            results[index]["error"] = "Scans can only be submitted for yourself"
+            continue
+        try:
+            claimed.append((index, scan, verify_qr_token(scan.token)))
+        except ValueError as e:
+            results[index]["error"] = str(e)
+
+    student_sections = dict(
+        db.query(Student.id, Student.class_section_id)
+        .filter(Student.id.in_({scan.student_id for _, scan, _ in claimed}))
+        .all()
+    ) if claimed else {}
+
+    # Marks are attributed to the teacher who issued the code
+    by_teacher: Dict[int, List[Tuple[int, StudentAttendanceCreate]]] = {}
+    for index, scan, claims in claimed:
+        section_id = student_sections.get(scan.student_id, claims.class_section_id)
+        if section_id != claims.class_section_id:
+            results[index]["error"] = "Student is not in this class section"
+            continue
+        by_teacher.setdefault(claims.teacher_id, []).append((index, StudentAttendanceCreate(
+            student_id=scan.student_id,
+            class_section_id=claims.class_section_id,
+            subject_id=claims.subject_id,
+            teacher_id=claims.teacher_id,
+            date=marked_on,
+            period_number=claims.period_number,
+            status=AttendanceStatus.PRESENT,
+            marking_method=AttendanceMarkingMethod.QR_CODE
+        )))
+
+    for teacher_id, accepted in by_teacher.items():
+        outcome = create_attendance_bulk(
+            db, [attendance for _, attendance in accepted], teacher_id, ip_address, user_agent
+        )
+        for (index, _), row in zip(accepted, outcome["results"]):
+            results[index].update(
+                success=row["success"],
+                attendance_id=row["attendance_id"],
+                error=row["error"]
+            )
+
+    created = sum(1 for result in results if result["success"])
+    return {
+        "total": len(scans),
+        "created": created,
+        "failed": len(scans) - created,
+        "results": results
+    }
 
 # Geolocation Attendance
 def create_geolocation_attendance(
     db: Session,
-    geo_data: GeolocationAttendanceCreate,
-    school_coordinates: Dict[str, float],
-    allowed_radius: float
+    geo_data: GeolocationAttendanceCreate
 ) -> GeolocationAttendance:
-    # Calculate if location is within allowed bounds
-    # This is a simplified check - in production you'd want to use proper
-    # geospatial calculations
-    is_within_bounds = True  # Implement proper calculation here
-    
-    db_geo = GeolocationAttendance(
-        **geo_data.dict(),
-        is_within_bounds=is_within_bounds
+    return create_geolocation_attendance_batch(db, [geo_data])[0]
+
+def create_geolocation_attendance_batch(
+    db: Session,
+    check_ins: List[GeolocationAttendanceCreate]
+) -> List[GeolocationAttendance]:
+    """
+    Check every location against the active geofences in one vectorized pass
+    and store the whole batch with a single multi-row INSERT.
+    """
+    fence_ids = get_geofence_index(db).locate(
+        [check_in.latitude for check_in in check_ins],
+        [check_in.longitude for check_in in check_ins]
     )
-    db.add(db_geo)
+    rows = [
+        {
+            **check_in.dict(),
+            "is_within_bounds": bool(fence_id >= 0),
+            "geofence_id": int(fence_id) if fence_id >= 0 else None
+        }
+        for check_in, fence_id in zip(check_ins, fence_ids)
+    ]
+    created = db.scalars(
+        insert(GeolocationAttendance).returning(
+            GeolocationAttendance, sort_by_parameter_order=True
+        ),
+        rows
+    ).all()
     db.commit()
-    db.refresh(db_geo)
-    return db_geo
+    return created
 
 # Offline Sync
 def create_offline_sync(
-    db: Session, sync_data: OfflineAttendanceSyncCreate
+    db: Session,
+    sync_data: OfflineAttendanceSyncCreate,
+    user_id: int,
+    ip_address: str,
+    user_agent: str
 ) -> OfflineAttendanceSync:
     sync_id = str(uuid.uuid4())
     db_sync = OfflineAttendanceSync(
         sync_id=sync_id,
-        **sync_data.dict(),
-        sync_status="PENDING"
+        **jsonable_encoder(sync_data),
+        sync_status="PENDING",
+        submitted_by=user_id,
+        ip_address=ip_address,
+        user_agent=user_agent
     )
     db.add(db_sync)
     db.commit()
     db.refresh(db_sync)
     return db_sync
 
+def get_offline_sync(
+    db: Session, sync_id: str
+) -> Optional[OfflineAttendanceSync]:
+    return db.query(OfflineAttendanceSync).filter(
+        OfflineAttendanceSync.sync_id == sync_id
+    ).first()
+
+def claim_offline_syncs(db: Session, limit: int = 10) -> List[str]:
+    """
+    Move up to `limit` pending syncs to PROCESSING and return their sync ids.
+    SKIP LOCKED lets concurrent workers claim disjoint batches without
+    blocking on each other. Every claim counts as an attempt.
+    """
+    db_syncs = (
+        db.query(OfflineAttendanceSync)
+        .filter(OfflineAttendanceSync.sync_status == "PENDING")
+        .order_by(OfflineAttendanceSync.created_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    sync_ids = []
+    claimed_at = datetime.utcnow()
+    for db_sync in db_syncs:
+        db_sync.sync_status = "PROCESSING"
+        db_sync.claimed_at = claimed_at
+        db_sync.attempts += 1
+        sync_ids.append(db_sync.sync_id)
+    db.commit()
+    return sync_ids
+
+def release_offline_sync(
+    db: Session, sync_id: str, error: str, max_attempts: int
+) -> Optional[str]:
+    """
+    Hand back a claimed sync whose processing raised: PENDING to be retried,
+    or FAILED once it has used up `max_attempts`. The error is kept either
+    way. Returns the new status, or None if the sync is not claimed.
+    """
+    db_sync = db.query(OfflineAttendanceSync).filter(
+        OfflineAttendanceSync.sync_id == sync_id,
+        OfflineAttendanceSync.sync_status == "PROCESSING"
+    ).with_for_update().first()
+    if not db_sync:
+        return None
+
+    db_sync.error_details = {"error": error, "attempts": db_sync.attempts}
+    db_sync.claimed_at = None
+    if db_sync.attempts >= max_attempts:
+        db_sync.sync_status = "FAILED"
+    else:
+        db_sync.sync_status = "PENDING"
+    db.commit()
+    return db_sync.sync_status
+
+def requeue_stale_offline_syncs(
+    db: Session, claimed_before: datetime, max_attempts: int
+) -> int:
+    """
+    Return syncs whose worker died mid-processing to the queue, failing the
+    ones that have already been claimed `max_attempts` times
+    """
+    stale = db.query(OfflineAttendanceSync).filter(
+        OfflineAttendanceSync.sync_status == "PROCESSING",
+        OfflineAttendanceSync.claimed_at < claimed_before
+    )
+    stale.filter(OfflineAttendanceSync.attempts >= max_attempts).update(
+        {
+            "sync_status": "FAILED",
+            "claimed_at": None,
+            "error_details": {"error": "Processing stalled on every attempt"}
+        },
+        synchronize_session=False
+    )
+    count = stale.filter(OfflineAttendanceSync.attempts < max_attempts).update(
+        {"sync_status": "PENDING", "claimed_at": None},
+        synchronize_session=False
+    )
+    db.commit()
+    return count
+
 def process_offline_sync(
-    db: Session,
-    sync_id: str,
-    user_id: int,
-    ip_address: str,
-    user_agent: str
-) -> bool:
+    db: Session, sync_id: str
+) -> Optional[Dict[str, str]]:
+    """
+    Replay a claimed offline sync as one set-based write. The whole batch is
+    validated before anything is written: records already replayed are
+    DUPLICATE, and records for a period that is already marked, or marked
+    twice in the batch, are rejected individually. Returns a map of local_id
+    to outcome (CREATED, DUPLICATE or the rejection reason), or None if the
+    sync is not claimed.
+    """
     db_sync = db.query(OfflineAttendanceSync).filter(
         OfflineAttendanceSync.sync_id == sync_id,
-        OfflineAttendanceSync.sync_status == "PENDING"
+        OfflineAttendanceSync.sync_status == "PROCESSING"
     ).first()
     
     if not db_sync:
-        return False
-    
+        return None
+
+    user_id = db_sync.submitted_by
+    ip_address = db_sync.ip_address
+    user_agent = db_sync.user_agent
+
+    outcomes: Dict[str, str] = {}
+    records: Dict[str, OfflineAttendanceRecord] = {}
+    for position, raw_record in enumerate(db_sync.sync_data):
+        local_id = str(raw_record.get("local_id") or f"#{position}")
+        if local_id in outcomes:
+            # Same record pushed twice by the device, keep the first copy
+            continue
+        try:
+            records[local_id] = OfflineAttendanceRecord(**raw_record)
+            outcomes[local_id] = "PENDING"
+        except ValueError as e:
+            outcomes[local_id] = f"REJECTED: {e}"
+
+    student_ids = {record.student_id for record in records.values()}
+    known_students = {
+        row.id for row in db.query(Student.id).filter(Student.id.in_(student_ids))
+    }
+    # A slot may already hold a mark made online, or this record's own earlier
+    # replay; any other mark would fail the one-mark-per-period index
+    keys = {
+        (record.student_id, record.date, record.period_number)
+        for record in records.values()
+    }
+    marked = db.query(
+        StudentAttendance.student_id,
+        StudentAttendance.date,
+        StudentAttendance.period_number,
+        StudentAttendance.device_id,
+        StudentAttendance.local_id
+    ).filter(
+        tuple_(
+            StudentAttendance.student_id,
+            StudentAttendance.date,
+            StudentAttendance.period_number
+        ).in_(keys)
+    )
+    marked_by = {tuple(row[:3]): tuple(row[3:]) for row in marked} if keys else {}
+
+    seen = set()
+    for local_id, record in list(records.items()):
+        key = (record.student_id, record.date, record.period_number)
+        if record.student_id not in known_students:
+            outcomes[local_id] = "REJECTED: Student not found"
+        elif marked_by.get(key) == (db_sync.device_id, local_id):
+            outcomes[local_id] = "DUPLICATE"
+        elif key in marked_by:
+            outcomes[local_id] = "REJECTED: Attendance already marked for this period"
+        elif key in seen:
+            outcomes[local_id] = "REJECTED: Duplicate record in batch"
+        else:
+            seen.add(key)
+            continue
+        del records[local_id]
+
     try:
-        for record in db_sync.sync_data:
-            attendance = StudentAttendanceCreate(**record)
-            create_attendance(db, attendance, user_id, ip_address, user_agent)
-        
+        if records:
+            rows = []
+            for record in records.values():
+                row = _attendance_row(record, user_id)
+                row["device_id"] = db_sync.device_id
+                rows.append(row)
+
+            # A mark committed since the check above, a replay on (device_id,
+            # local_id, date) or a slot on the period index, is skipped rather
+            # than failing the whole sync
+            inserted = db.execute(
+                postgresql.insert(StudentAttendance)
+                .on_conflict_do_nothing()
+                .returning(StudentAttendance.id, StudentAttendance.local_id),
+                rows
+            ).all()
+
+            if inserted:
+                # Sync workers are off the request path, so the audit rows
+                # stay in the same transaction as the marks they describe
+                db.execute(
+                    insert(AttendanceAuditLog),
+                    [
+                        _audit_entry(
+                            row.id, user_id, None, records[row.local_id].status, "CREATE",
+                            f"Offline sync {sync_id}", ip_address, user_agent
+                        )
+                        for row in inserted
+                    ]
+                )
+                record_attendance_changes(db, [
+                    (
+                        record.student_id, record.class_section_id, record.subject_id,
+                        record.date, record.status, 1
+                    )
+                    for record in (records[row.local_id] for row in inserted)
+                ])
+
+            created = {row.local_id for row in inserted}
+            for local_id in records:
+                outcomes[local_id] = (
+                    "CREATED" if local_id in created
+                    else "REJECTED: Attendance already marked for this period"
+                )
+
+        rejected = {
+            local_id: outcome for local_id, outcome in outcomes.items()
+            if outcome.startswith("REJECTED")
+        }
         db_sync.sync_status = "SYNCED"
         db_sync.synced_at = datetime.utcnow()
+        db_sync.sync_result = outcomes
+        db_sync.error_details = {"rejected": rejected} if rejected else None
         db.commit()
-        return True
+        return outcomes
         
-    except Exception as e:
+    except SQLAlchemyError as e:
+        db.rollback()
+        outcomes = {local_id: f"FAILED: {e}" for local_id in outcomes}
         db_sync.sync_status = "FAILED"
+        db_sync.sync_result = outcomes
         db_sync.error_details = {"error": str(e)}
         db.commit()
-        return False
+        return outcomes
 
 # Attendance Analytics
+STATUS_COUNT_KEYS = {
+    AttendanceStatus.PRESENT: "present_count",
+    AttendanceStatus.ABSENT: "absent_count",
+    AttendanceStatus.LATE: "late_count",
+    AttendanceStatus.EXCUSED: "leave_count"
+}
+
+def _summarize_counts(counts: Dict[str, int]) -> Dict[str, Union[int, float]]:
+    total_classes = counts["total_classes"]
+    return {
+        **counts,
+        "attendance_percentage": (
+            counts["present_count"] / total_classes * 100
+        ) if total_classes > 0 else 0
+    }
+
 def get_attendance_summary(
     db: Session,
     student_id: int,
     start_date: date,
     end_date: date
 ) -> Dict[str, Any]:
-    attendance_records = db.query(StudentAttendance).filter(
-        StudentAttendance.student_id == student_id,
-        StudentAttendance.date.between(start_date, end_date)
+    # Single grouped pass over the daily rollup, one row per subject
+    rows = db.query(
+        AttendanceDailyRollup.subject_id,
+        *[
+            func.sum(getattr(AttendanceDailyRollup, column))
+            for column in ROLLUP_STATUS_COLUMNS.values()
+        ]
+    ).filter(
+        AttendanceDailyRollup.student_id == student_id,
+        AttendanceDailyRollup.date.between(start_date, end_date)
+    ).group_by(
+        AttendanceDailyRollup.subject_id
     ).all()
+
+    totals = {"total_classes": 0, **{key: 0 for key in STATUS_COUNT_KEYS.values()}}
+    subject_wise_attendance = {}
+    for subject_id, *status_counts in rows:
+        counts = {
+            STATUS_COUNT_KEYS[status]: count or 0
+            for status, count in zip(ROLLUP_STATUS_COLUMNS, status_counts)
+        }
+        counts = {"total_classes": sum(counts.values()), **counts}
+        for key, count in counts.items():
+            totals[key] += count
+        subject_key = str(subject_id) if subject_id is not None else "unassigned"
+        subject_wise_attendance[subject_key] = _summarize_counts(counts)
     
-    total_classes = len(attendance_records)
-    present_count = sum(1 for a in attendance_records if a.status == AttendanceStatus.PRESENT)
-    absent_count = sum(1 for a in attendance_records if a.status == AttendanceStatus.ABSENT)
-    late_count = sum(1 for a in attendance_records if a.status == AttendanceStatus.LATE)
-    leave_count = sum(1 for a in attendance_records if a.status == AttendanceStatus.ON_LEAVE)
-    
     return {
+        "student_id": student_id,
+        **_summarize_counts(totals),
+        "subject_wise_attendance": subject_wise_attendance
+    }
+
+def get_class_attendance_summaries(
+    db: Session,
+    class_section_ids: List[int],
+    on_date: date,
+    period_number: Optional[int] = None,
+    subject_id: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Marking summary for one day across any number of sections: the marks
+    made in each section and its active roster, one grouped query each.
+    """
+    day_start = datetime.combine(on_date, time.min)
+    filters = [
+        StudentAttendance.class_section_id.in_(class_section_ids),
+        StudentAttendance.date >= day_start,
+        StudentAttendance.date < day_start + timedelta(days=1)
+    ]
+    if period_number is not None:
+        filters.append(StudentAttendance.period_number == period_number)
+    if subject_id:
+        filters.append(StudentAttendance.subject_id == subject_id)
+
+    rows = db.query(
+        StudentAttendance.class_section_id,
+        *[
+            func.count().filter(StudentAttendance.status == status)
+            for status in STATUS_COUNT_KEYS
+        ]
+    ).filter(*filters).group_by(StudentAttendance.class_section_id).all()
+    counts_by_section = {row[0]: row[1:] for row in rows}
+
+    roster_sizes = dict(
+        db.query(Student.class_section_id, func.count())
+        .filter(
+            Student.class_section_id.in_(class_section_ids),
+            Student.is_active == True
+        )
+        .group_by(Student.class_section_id)
+        .all()
+    )
+
+    summaries = []
+    for class_section_id in class_section_ids:
+        status_counts = counts_by_section.get(class_section_id, (0,) * len(STATUS_COUNT_KEYS))
+        counts = dict(zip(STATUS_COUNT_KEYS.values(), status_counts))
+        total_marks = sum(status_counts)
+        summaries.append({
+            "class_section_id": class_section_id,
+            "date": day_start,
+            "period_number": period_number,
+            "subject_id": subject_id,
+            "total_students": roster_sizes.get(class_section_id, 0),
+            **counts,
+            "attendance_percentage": (
+                counts["present_count"] / total_marks * 100
+            ) if total_marks > 0 else 0
+        })
+    return summaries
+
+def get_subject_attendance_report(
+    db: Session,
+    subject_id: int,
+    class_section_ids: List[int],
+    start_date: date,
+    end_date: date,
+    trend_window: int = 7
+) -> Optional[Dict[str, Any]]:
+    """
+    Subject attendance over a date range. total_classes counts the distinct
+    (date, period) slots marked. Daily buckets come from the rollup, and
+    window functions over those buckets give the overall average and a
+    moving-average trend in the same query.
+    """
+    subject = db.query(Subject.id, Subject.name).filter(Subject.id == subject_id).first()
+    if not subject:
+        return None
+
+    present = func.sum(AttendanceDailyRollup.present_count)
+    total = func.sum(
+        AttendanceDailyRollup.present_count
+        + AttendanceDailyRollup.absent_count
+        + AttendanceDailyRollup.late_count
+        + AttendanceDailyRollup.excused_count
+    )
+    daily_percentage = 100.0 * present / func.nullif(total, 0)
+
+    filters = [
+        AttendanceDailyRollup.subject_id == subject_id,
+        AttendanceDailyRollup.date.between(start_date, end_date)
+    ]
+    if class_section_ids:
+        filters.append(AttendanceDailyRollup.class_section_id.in_(class_section_ids))
+
+    rows = db.query(
+        AttendanceDailyRollup.date,
+        daily_percentage.label("attendance_percentage"),
+        func.avg(daily_percentage).over(
+            order_by=AttendanceDailyRollup.date,
+            rows=(-(trend_window - 1), 0)
+        ).label("moving_average"),
+        (100.0 * func.sum(present).over() / func.nullif(func.sum(total).over(), 0)).label("average_attendance")
+    ).filter(*filters).group_by(
+        AttendanceDailyRollup.date
+    ).order_by(AttendanceDailyRollup.date).all()
+
+    # The rollup is per day, so the number of periods taught comes from the marks
+    slot_filters = [
+        StudentAttendance.subject_id == subject_id,
+        StudentAttendance.date >= start_date,
+        StudentAttendance.date < end_date + timedelta(days=1)
+    ]
+    if class_section_ids:
+        slot_filters.append(StudentAttendance.class_section_id.in_(class_section_ids))
+    total_classes = db.query(
+        func.count(tuple_(StudentAttendance.date, StudentAttendance.period_number).distinct())
+    ).filter(*slot_filters).scalar()
+
+    return {
+        "subject_id": subject.id,
+        "subject_name": subject.name,
         "total_classes": total_classes,
-        "present_count": present_count,
-        "absent_count": absent_count,
-        "late_count": late_count,
-        "leave_count": leave_count,
-        "attendance_percentage": (present_count / total_classes * 100) if total_classes > 0 else 0
+        "average_attendance": float(rows[0].average_attendance or 0) if rows else 0.0,
+        "attendance_trend": [
+            {
+                "date": datetime.combine(row.date, time.min),
+                "attendance_percentage": float(row.attendance_percentage or 0),
+                "moving_average": float(row.moving_average or 0)
+            }
+            for row in rows
+        ]
     }
 
 # Notifications
@@ -249,3 +915,181 @@ def update_notification_status(
         db.refresh(db_notification)
         
     return db_notification
+
+def generate_absence_notifications(
+    db: Session, on_date: date, period_number: int
+) -> int:
+    """
+    Queue an ABSENCE notice for every student marked absent in this period
+    with one INSERT ... SELECT. Students already notified that day are
+    skipped by the unique (student_id, notification_type, attendance_date)
+    index, so the job is safe to re-run. Returns how many notices were created.
+    """
+    notifications = AttendanceNotification.__table__
+    attendances = StudentAttendance.__table__
+    students = Student.__table__
+    day_start = datetime.combine(on_date, time.min)
+    absent = (
+        select(
+            attendances.c.student_id,
+            func.concat(
+                students.c.name,
+                f" was marked absent in period {period_number} on {on_date:%d %b %Y}."
+            ),
+            literal("ABSENCE"),
+            literal("PENDING"),
+            literal(on_date, Date)
+        )
+        .join(students, students.c.id == attendances.c.student_id)
+        .where(
+            # A range on the partition key keeps the scan to one partition
+            attendances.c.date >= day_start,
+            attendances.c.date < day_start + timedelta(days=1),
+            attendances.c.period_number == period_number,
+            attendances.c.status == AttendanceStatus.ABSENT
+        )
+    )
+    result = db.execute(
+        postgresql.insert(notifications)
+        .from_select(
+            ["student_id", "message", "notification_type", "status", "attendance_date"],
+            absent
+        )
+        .on_conflict_do_nothing(
+            index_elements=["student_id", "notification_type", "attendance_date"],
+            index_where=notifications.c.attendance_date.isnot(None)
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+def get_period_closing_times(db: Session, day_of_week: int) -> List[Tuple[int, time]]:
+    """
+    (period_number, end time) for the day, where period_number is the period's
+    position in its class section's day and the end time is the latest across sections
+    """
+    periods = Period.__table__
+    numbered = (
+        select(
+            periods.c.end_time,
+            func.row_number().over(
+                partition_by=periods.c.class_section_id,
+                order_by=periods.c.start_time
+            ).label("period_number")
+        )
+        .where(periods.c.day_of_week == day_of_week, periods.c.is_active == True)
+        .subquery()
+    )
+    rows = db.execute(
+        select(numbered.c.period_number, func.max(numbered.c.end_time))
+        .group_by(numbered.c.period_number)
+        .order_by(numbered.c.period_number)
+    ).all()
+    return [(period_number, end_time) for period_number, end_time in rows]
+
+def claim_notifications(db: Session, limit: int = 100) -> List[Any]:
+    """
+    Move up to `limit` due PENDING notifications to SENDING in one statement
+    and return them with their guardian's contact details. SKIP LOCKED lets
+    several dispatchers claim disjoint batches.
+    """
+    notifications = AttendanceNotification.__table__
+    students = Student.__table__
+    guardians = Guardian.__table__
+    due = (
+        select(notifications.c.id)
+        .where(
+            notifications.c.status == "PENDING",
+            or_(
+                notifications.c.next_attempt_at.is_(None),
+                notifications.c.next_attempt_at <= func.now()
+            )
+        )
+        .order_by(notifications.c.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    rows = db.execute(
+        update(notifications)
+        .where(
+            notifications.c.id.in_(due.scalar_subquery()),
+            students.c.id == notifications.c.student_id,
+            guardians.c.id == students.c.guardian_id
+        )
+        .values(status="SENDING", claimed_at=func.now())
+        .returning(
+            notifications.c.id,
+            notifications.c.message,
+            notifications.c.channel,
+            notifications.c.attempts,
+            guardians.c.id.label("guardian_id"),
+            guardians.c.full_name.label("guardian_name"),
+            guardians.c.email,
+            guardians.c.contact_number
+        )
+    ).all()
+    db.commit()
+    return rows
+
+def requeue_stale_notifications(db: Session, stale_after_seconds: int) -> int:
+    """Return notifications whose dispatcher died mid-send to the queue"""
+    notifications = AttendanceNotification.__table__
+    result = db.execute(
+        update(notifications)
+        .where(
+            notifications.c.status == "SENDING",
+            notifications.c.claimed_at < func.now() - literal_column("interval '1 second'") * stale_after_seconds
+        )
+        .values(status="PENDING", claimed_at=None)
+    )
+    db.commit()
+    return result.rowcount
+
+def record_notification_outcomes(
+    db: Session,
+    delivered_ids: List[int],
+    failures: List[Dict[str, Any]]
+) -> None:
+    """
+    Write the outcome of a dispatch round with one UPDATE for everything
+    delivered and one executemany for the failures. Each failure carries
+    notification_id, status (PENDING to retry or FAILED), attempts, error
+    and retry_delay in seconds.
+    """
+    notifications = AttendanceNotification.__table__
+    if delivered_ids:
+        db.execute(
+            update(notifications)
+            .where(notifications.c.id.in_(delivered_ids))
+            .values(
+                status="SENT",
+                attempts=notifications.c.attempts + 1,
+                sent_at=func.now(),
+                claimed_at=None,
+                error_message=None
+            )
+        )
+    if failures:
+        db.execute(
+            update(notifications)
+            .where(notifications.c.id == bindparam("notification_id"))
+            .values(
+                status=bindparam("new_status"),
+                attempts=bindparam("new_attempts"),
+                error_message=bindparam("error"),
+                next_attempt_at=func.now()
+                + literal_column("interval '1 second'") * bindparam("retry_delay", type_=Float),
+                claimed_at=None
+            ),
+            [
+                {
+                    "notification_id": failure["notification_id"],
+                    "new_status": failure["status"],
+                    "new_attempts": failure["attempts"],
+                    "error": failure["error"],
+                    "retry_delay": failure["retry_delay"]
+                }
+                for failure in failures
+            ]
+        )
+    db.commit()
@@ -0,0 +1,100 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import json
+
+from ..core.config import settings
+from ..models.attendance import StudentAttendance, AttendanceStatus
+from ..models.student import Student
+
+# Postgres NOTIFY channel carrying {"YYYY-MM-DD": [class_section_id, ...]}
+PROGRESS_CHANNEL = "attendance_progress"
+
+def notify_attendance_progress(
+    db: Session, section_days: Iterable[Tuple[Optional[int], date]]
+) -> None:
+    """
+    Tell live listeners in every process which class sections were marked on
+    which days. NOTIFY is transactional, so it is only delivered if the
+    surrounding transaction commits. Does not commit.
+    """
+    if not settings.LIVE_ATTENDANCE_ENABLED:
+        return
+    days: Dict[str, Set[int]] = {}
+    for class_section_id, day in section_days:
+        if class_section_id is not None:
+            days.setdefault(day.isoformat(), set()).add(class_section_id)
+    if not days:
+        return
+    payload = json.dumps({day: sorted(sections) for day, sections in days.items()})
+    db.execute(select(func.pg_notify(PROGRESS_CHANNEL, payload)))
+
+def parse_progress_payload(payload: str) -> Set[Tuple[int, date]]:
+    return {
+        (class_section_id, date.fromisoformat(day))
+        for day, sections in json.loads(payload).items()
+        for class_section_id in sections
+    }
+
+def get_live_progress(
+    db: Session, day: date, class_section_ids: Iterable[int]
+) -> List[Dict[str, Any]]:
+    """
+    Marking progress for each class section on the day: its active roster,
+    and per period how many marks were made in it, how many absent and who.
+    """
+    class_section_ids = list(class_section_ids)
+    attendances = StudentAttendance.__table__
+    students = Student.__table__
+
+    totals = dict(db.execute(
+        select(students.c.class_section_id, func.count())
+        .where(
+            students.c.class_section_id.in_(class_section_ids),
+            students.c.is_active == True
+        )
+        .group_by(students.c.class_section_id)
+    ).all())
+
+    day_start = datetime.combine(day, time.min)
+    absent = attendances.c.status == AttendanceStatus.ABSENT
+    # Marks count under the section they were made in, as in the rollup and
+    # the NOTIFY payload; the students join only supplies absentee names
+    rows = db.execute(
+        select(
+            attendances.c.class_section_id,
+            attendances.c.period_number,
+            func.count(),
+            func.count().filter(absent),
+            func.json_agg(
+                func.json_build_object("student_id", students.c.id, "name", students.c.name)
+            ).filter(absent)
+        )
+        .join(students, students.c.id == attendances.c.student_id)
+        .where(
+            attendances.c.date >= day_start,
+            attendances.c.date < day_start + timedelta(days=1),
+            attendances.c.class_section_id.in_(class_section_ids)
+        )
+        .group_by(attendances.c.class_section_id, attendances.c.period_number)
+        .order_by(attendances.c.period_number)
+    ).all()
+
+    progress = {
+        class_section_id: {
+            "class_section_id": class_section_id,
+            "date": day,
+            "total": totals.get(class_section_id, 0),
+            "periods": []
+        }
+        for class_section_id in class_section_ids
+    }
+    for class_section_id, period_number, marked, absent_count, absentees in rows:
+        progress[class_section_id]["periods"].append({
+            "period_number": period_number,
+            "marked": marked,
+            "absent": absent_count,
+            "absentees": absentees or []
+        })
+    return list(progress.values())
@@ -0,0 +1,125 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from datetime import date
+from typing import Dict, List, Optional
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Range-partitioned tables and the column they are partitioned on
+PARTITIONED_TABLES = {
+    "student_attendances": "date",
+    "attendance_audit_logs": "created_at"
+}
+
+MONTHLY_PARTITION = re.compile(r"_y(\d{4})m(\d{2})$")
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+def get_attached_partitions(db: Session, table: str) -> Dict[str, Optional[date]]:
+    """Map each attached partition of `table` to its month (None for the default partition)"""
+    rows = db.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits"
+            " JOIN pg_class parent ON parent.oid = pg_inherits.inhparent"
+            " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+            " WHERE parent.relname = :table"
+        ),
+        {"table": table}
+    ).scalars()
+    partitions = {}
+    for name in rows:
+        match = MONTHLY_PARTITION.search(name)
+        partitions[name] = date(int(match.group(1)), int(match.group(2)), 1) if match else None
+    return partitions
+
+def create_attendance_partitions(db: Session, start: date, end: date) -> List[str]:
+    """
+    Create the monthly partitions covering start through end, plus a default
+    partition that catches marks dated outside every month. Partitions that
+    already exist are left alone; rows the default partition already holds
+    for a new month are moved into it. Returns the names of the created
+    partitions.
+    """
+    created = []
+    for table, column in PARTITIONED_TABLES.items():
+        existing = get_attached_partitions(db, table)
+        db.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+
+        month = month_start(start)
+        while month <= end:
+            name = partition_name(table, month)
+            if name not in existing:
+                bounds = f"FROM ('{month}') TO ('{add_months(month, 1)}')"
+                in_month = f"{column} >= '{month}' AND {column} < '{add_months(month, 1)}'"
+                stranded = db.execute(text(
+                    f"SELECT EXISTS (SELECT 1 FROM {table}_default WHERE {in_month})"
+                )).scalar()
+                if stranded:
+                    # Postgres refuses a partition whose rows sit in the default
+                    # one, so take the default out while they are moved across
+                    db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {table}_default"))
+                    db.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES {bounds}"))
+                    moved = db.execute(text(
+                        f"WITH moved AS (DELETE FROM {table}_default WHERE {in_month} RETURNING *)"
+                        f" INSERT INTO {name} SELECT * FROM moved"
+                    )).rowcount
+                    db.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {table}_default DEFAULT"))
+                    logger.warning(f"Moved {moved} rows from {table}_default into {name}")
+                else:
+                    db.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES {bounds}"))
+                created.append(name)
+            month = add_months(month, 1)
+
+    db.commit()
+    for name in created:
+        logger.info(f"Created partition {name}")
+    return created
+
+def ensure_attendance_partitions(db: Session, months_ahead: int) -> List[str]:
+    """Make sure the current month and the next `months_ahead` months have partitions"""
+    current = month_start(date.today())
+    return create_attendance_partitions(db, current, add_months(current, months_ahead))
+
+def count_default_partition_rows(db: Session) -> Dict[str, int]:
+    """Rows that fell outside every monthly partition"""
+    return {
+        table: db.execute(text(f"SELECT count(*) FROM {table}_default")).scalar()
+        for table in PARTITIONED_TABLES
+    }
+
+def detach_attendance_partitions(
+    db: Session,
+    before: date,
+    tablespace: Optional[str] = None
+) -> List[str]:
+    """
+    Detach the monthly partitions that end on or before `before`. Detached
+    partitions stay behind as plain tables, optionally moved to a cold
+    tablespace, so they can be archived and dropped. The daily rollup keeps
+    their counts, so summaries still cover the detached months.
+    """
+    quote = db.get_bind().dialect.identifier_preparer.quote
+    detached = []
+    for table in PARTITIONED_TABLES:
+        for name, month in sorted(get_attached_partitions(db, table).items()):
+            if month is None or add_months(month, 1) > before:
+                continue
+            db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            if tablespace:
+                db.execute(text(f"ALTER TABLE {name} SET TABLESPACE {quote(tablespace)}"))
+            detached.append(name)
+
+    db.commit()
+    for name in detached:
+        logger.info(f"Detached partition {name}")
+    return detached
@@ -0,0 +1,152 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import Date, cast, func, insert, select
+from sqlalchemy.dialects import postgresql
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from ..models.attendance import (
+    StudentAttendance,
+    AttendanceDailyRollup,
+    AttendanceStatus
+)
+from .attendance_live import notify_attendance_progress
+
+STATUS_COLUMNS = {
+    AttendanceStatus.PRESENT: "present_count",
+    AttendanceStatus.ABSENT: "absent_count",
+    AttendanceStatus.LATE: "late_count",
+    AttendanceStatus.EXCUSED: "excused_count"
+}
+
+# (student_id, class_section_id, subject_id, marked date, status, +1 / -1)
+RollupChange = Tuple[int, Optional[int], Optional[int], datetime, AttendanceStatus, int]
+
+def record_attendance_changes(db: Session, changes: Iterable[RollupChange]) -> None:
+    """
+    Fold attendance writes into the daily rollup with one upsert. Must be
+    called inside the transaction that writes the attendance rows so that
+    the counters never drift from the raw marks. Changes carry the section
+    stored on the attendance row, so a correction made after the student
+    changed section still lands on the counter it was first added to. Does
+    not commit.
+    """
+    deltas: Dict[Tuple[date, Optional[int], Optional[int], int], Dict[str, int]] = {}
+    for student_id, class_section_id, subject_id, marked_on, status, delta in changes:
+        day = marked_on.date() if isinstance(marked_on, datetime) else marked_on
+        counters = deltas.setdefault(
+            (day, class_section_id, subject_id, student_id),
+            {column: 0 for column in STATUS_COLUMNS.values()}
+        )
+        counters[STATUS_COLUMNS[AttendanceStatus(status)]] += delta
+
+    if not deltas:
+        return
+
+    stmt = postgresql.insert(AttendanceDailyRollup)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_attendance_daily_rollup_key",
+        set_={
+            **{
+                column: getattr(AttendanceDailyRollup, column) + getattr(stmt.excluded, column)
+                for column in STATUS_COLUMNS.values()
+            },
+            "updated_at": func.now()
+        }
+    )
+    db.execute(
+        stmt,
+        [
+            {
+                "date": day,
+                "class_section_id": class_section_id,
+                "subject_id": subject_id,
+                "student_id": student_id,
+                **counters
+            }
+            for (day, class_section_id, subject_id, student_id), counters in deltas.items()
+        ]
+    )
+
+    # Every attendance write passes through here inside its transaction,
+    # so this is where live dashboards learn which sections changed
+    notify_attendance_progress(db, {
+        (class_section_id, day) for day, class_section_id, _, _ in deltas
+    })
+
+def rebuild_attendance_rollup(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> int:
+    """
+    Recompute the rollup from the raw marks for the given range (or all of
+    it) with a single INSERT ... SELECT. Intended for backfills, run it for
+    ranges that are not being marked concurrently.
+    """
+    day = cast(StudentAttendance.date, Date)
+    # Filter on the bare column so only the matching partitions are scanned
+    source_filters = []
+    rollup_filters = []
+    if start_date:
+        source_filters.append(StudentAttendance.date >= start_date)
+        rollup_filters.append(AttendanceDailyRollup.date >= start_date)
+    if end_date:
+        source_filters.append(StudentAttendance.date < end_date + timedelta(days=1))
+        rollup_filters.append(AttendanceDailyRollup.date <= end_date)
+
+    db.query(AttendanceDailyRollup).filter(*rollup_filters).delete(
+        synchronize_session=False
+    )
+
+    source = (
+        select(
+            day,
+            StudentAttendance.class_section_id,
+            StudentAttendance.subject_id,
+            StudentAttendance.student_id,
+            *[
+                func.count().filter(StudentAttendance.status == status)
+                for status in STATUS_COLUMNS
+            ]
+        )
+        .where(*source_filters)
+        .group_by(
+            day,
+            StudentAttendance.class_section_id,
+            StudentAttendance.subject_id,
+            StudentAttendance.student_id
+        )
+    )
+    result = db.execute(
+        insert(AttendanceDailyRollup).from_select(
+            ["date", "class_section_id", "subject_id", "student_id", *STATUS_COLUMNS.values()],
+            source
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+def get_rollup_counts(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    student_id: Optional[int] = None,
+    class_section_id: Optional[int] = None,
+    subject_id: Optional[int] = None
+) -> Dict[AttendanceStatus, int]:
+    """Status counters summed over the rollup rows in the date range"""
+    filters = [AttendanceDailyRollup.date.between(start_date, end_date)]
+    if student_id:
+        filters.append(AttendanceDailyRollup.student_id == student_id)
+    if class_section_id:
+        filters.append(AttendanceDailyRollup.class_section_id == class_section_id)
+    if subject_id:
+        filters.append(AttendanceDailyRollup.subject_id == subject_id)
+
+    row = db.query(
+        *[
+            func.coalesce(func.sum(getattr(AttendanceDailyRollup, column)), 0)
+            for column in STATUS_COLUMNS.values()
+        ]
+    ).filter(*filters).one()
+    return dict(zip(STATUS_COLUMNS, row))
@@ -1,37 +1,38 @@
+from collections import Counter, defaultdict
+from itertools import groupby
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, between
+from sqlalchemy import func, and_
 from datetime import date, timedelta
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from ..models.attendance import StudentAttendance
+from ..models.attendance import StudentAttendance, AttendanceStatus
 from ..schemas import attendance_stats as schemas
+from .attendance_rollup import get_rollup_counts
 
-def calculate_attendance_stats(records: List[StudentAttendance]) -> schemas.AttendanceStats:
-    total = len(records)
-    if total == 0:
-        return schemas.AttendanceStats(
-            total_classes=0,
-            present=0,
-            absent=0,
-            late=0,
-            on_leave=0,
-            percentage=0.0
-        )
+def stats_from_counts(counts: Dict[AttendanceStatus, int]) -> schemas.AttendanceStats:
+    total = sum(counts.values())
+    present = counts.get(AttendanceStatus.PRESENT, 0)
+    late = counts.get(AttendanceStatus.LATE, 0)
 
-    present = sum(1 for r in records if r.status == 'PRESENT')
-    absent = sum(1 for r in records if r.status == 'ABSENT')
-    late = sum(1 for r in records if r.status == 'LATE')
-    on_leave = sum(1 for r in records if r.status == 'ON_LEAVE')
-    
     return schemas.AttendanceStats(
         total_classes=total,
         present=present,
-        absent=absent,
+        absent=counts.get(AttendanceStatus.ABSENT, 0),
         late=late,
-        on_leave=on_leave,
+        on_leave=counts.get(AttendanceStatus.EXCUSED, 0),
         percentage=((present + late) / total * 100) if total > 0 else 0.0
     )
 
+def marked_between(start_date: date, end_date: date) -> List:
+    """
+    Marks from start_date through the whole of end_date. The column is a
+    timestamp, so BETWEEN would stop at midnight on end_date.
+    """
+    return [
+        StudentAttendance.date >= start_date,
+        StudentAttendance.date < end_date + timedelta(days=1)
+    ]
+
 def get_student_attendance_stats(
     db: Session,
     student_id: int,
@@ -39,25 +40,30 @@ def get_student_attendance_stats(
     end_date: date,
     subject_id: Optional[int] = None
 ) -> schemas.StudentAttendanceReport:
-    query = db.query(StudentAttendance).filter(
-        and_(
-            StudentAttendance.student_id == student_id,
-            between(StudentAttendance.date, start_date, end_date)
-        )
-    )
+    filters = [
+        StudentAttendance.student_id == student_id,
+        *marked_between(start_date, end_date)
+    ]
 
     if subject_id:
-        query = query.filter(StudentAttendance.subject_id == subject_id)
+        filters.append(StudentAttendance.subject_id == subject_id)
 
-    records = query.all()
-    stats = calculate_attendance_stats(records)
+    stats = stats_from_counts(get_rollup_counts(
+        db,
+        start_date,
+        end_date,
+        student_id=student_id,
+        subject_id=subject_id
+    ))
     
     daily_records = [
         schemas.DailyAttendance(
-            date=record.date,
+            date=record.date.date(),
             status=record.status
         )
-        for record in records
+        for record in db.query(StudentAttendance.date, StudentAttendance.status)
+        .filter(*filters)
+        .order_by(StudentAttendance.date, StudentAttendance.period_number)
     ]
 
     return schemas.StudentAttendanceReport(
@@ -73,51 +79,54 @@ def get_class_attendance_stats(
     end_date: date,
     subject_id: Optional[int] = None
 ) -> schemas.ClassAttendanceReport:
-    query = db.query(StudentAttendance).filter(
-        and_(
-            StudentAttendance.class_section_id == class_id,
-            between(StudentAttendance.date, start_date, end_date)
-        )
-    )
+    # Marks made in the section, as the rollup and class summaries count them
+    filters = [
+        StudentAttendance.class_section_id == class_id,
+        *marked_between(start_date, end_date)
+    ]
 
     if subject_id:
-        query = query.filter(StudentAttendance.subject_id == subject_id)
+        filters.append(StudentAttendance.subject_id == subject_id)
 
-    records = query.all()
-    
-    # Group records by student
-    student_records = {}
-    for record in records:
-        if record.student_id not in student_records:
-            student_records[record.student_id] = []
-        student_records[record.student_id].append(record)
-
-    # Calculate stats for each student
-    student_stats = []
-    for student_id, student_records in student_records.items():
-        stats = calculate_attendance_stats(student_records)
-        daily_records = [
-            schemas.DailyAttendance(
-                date=record.date,
-                status=record.status
-            )
-            for record in student_records
-        ]
-        student_stats.append(
-            schemas.StudentAttendanceReport(
-                student_id=student_id,
-                total_stats=stats,
-                daily_records=daily_records
-            )
+    # Per-student status counters in one grouped query
+    student_counts: Dict[int, Dict[AttendanceStatus, int]] = defaultdict(dict)
+    class_counts: Counter = Counter()
+    for student_id, status, count in (
+        db.query(StudentAttendance.student_id, StudentAttendance.status, func.count())
+        .filter(*filters)
+        .group_by(StudentAttendance.student_id, StudentAttendance.status)
+    ):
+        student_counts[student_id][status] = count
+        class_counts[status] += count
+
+    # Daily records streamed once, ordered so each student's rows are contiguous
+    daily_rows = (
+        db.query(StudentAttendance.student_id, StudentAttendance.date, StudentAttendance.status)
+        .filter(*filters)
+        .order_by(
+            StudentAttendance.student_id,
+            StudentAttendance.date,
+            StudentAttendance.period_number
         )
+        .yield_per(1000)
+    )
 
-    # Calculate overall class stats
-    total_stats = calculate_attendance_stats(records)
+    student_stats = [
+        schemas.StudentAttendanceReport(
+            student_id=student_id,
+            total_stats=stats_from_counts(student_counts[student_id]),
+            daily_records=[
+                schemas.DailyAttendance(date=row.date.date(), status=row.status)
+                for row in rows
+            ]
+        )
+        for student_id, rows in groupby(daily_rows, key=lambda row: row.student_id)
+    ]
 
     return schemas.ClassAttendanceReport(
         class_id=class_id,
         subject_id=subject_id,
-        total_stats=total_stats,
+        total_stats=stats_from_counts(class_counts),
         student_stats=student_stats
     )
 
@@ -1,14 +1,52 @@
-from typing import Optional
+from typing import Any, Dict, Iterable, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from datetime import datetime
+from sqlalchemy import and_, insert, select, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Row
+from datetime import datetime, timedelta, timezone
 
 from ..models.student import Student
 from ..models.staff import Staff
+from ..models.identity import Identity
+from ..models.refresh_token import RefreshToken, RevokedSession
 from ..schemas.auth import UserCreate, UserUpdate
-from ..core.security import get_password_hash, verify_password
+from ..core.config import settings
+from ..core.security import (
+    get_password_hash,
+    hash_refresh_token,
+    new_refresh_token,
+    new_session_id,
+    revoked_sessions,
+    verify_password
+)
 
 class CRUDAuth:
+    def get_identity(
+        self,
+        db: Session,
+        *,
+        email: str,
+        role: str = None
+    ) -> Optional[Row]:
+        """
+        (kind, user_id, role, hashed_password, is_active) for a login email,
+        one index lookup whichever table the user is in. `role` ("student" or
+        "staff") picks one when the email is in both; otherwise the student wins.
+        """
+        identities = Identity.__table__
+        query = select(
+            identities.c.kind,
+            identities.c.user_id,
+            identities.c.role,
+            identities.c.hashed_password,
+            identities.c.is_active
+        ).where(identities.c.email == email)
+        if role in ("student", "staff"):
+            query = query.where(identities.c.kind == role)
+        return db.execute(
+            query.order_by((identities.c.kind == "student").desc()).limit(1)
+        ).first()
+
     def authenticate(
         self,
         db: Session,
@@ -17,22 +55,26 @@ class CRUDAuth:
         password: str,
         role: str = None
     ) -> Optional[Student | Staff]:
-        if role == "student":
-            user = db.query(Student).filter(Student.email == email).first()
-        elif role == "staff":
-            user = db.query(Staff).filter(Staff.email == email).first()
-        else:
-            # If role not specified, check both tables
-            user = (
-                db.query(Student).filter(Student.email == email).first() or
-                db.query(Staff).filter(Staff.email == email).first()
-            )
-        
-        if not user:
+        """Verifies inline; async callers use get_identity and security.password_hasher"""
+        identity = self.get_identity(db, email=email, role=role)
+        if not identity:
             return None
-        if not verify_password(password, user.hashed_password):
+        if not verify_password(password, identity.hashed_password):
             return None
-        return user
+        return db.get(Student if identity.kind == "student" else Staff, identity.user_id)
+
+    def update_password_hash(
+        self,
+        db: Session,
+        *,
+        kind: str,
+        user_id: int,
+        hashed_password: str
+    ) -> None:
+        """Store a rehash of the same password, e.g. after the bcrypt cost changed"""
+        user = db.get(Student if kind == "student" else Staff, user_id)
+        user.hashed_password = hashed_password
+        db.commit()
 
     def change_password(
         self,
@@ -45,8 +87,144 @@ class CRUDAuth:
         user.hashed_password = hashed_password
         user.updated_at = datetime.utcnow()
         db.add(user)
+        # Sessions opened with the old password end with it
+        self._revoke_sessions(db, self._active_session_ids(
+            db, kind="student" if isinstance(user, Student) else "staff", user_id=user.id
+        ))
         db.commit()
         db.refresh(user)
         return user
 
+    # Sessions and refresh tokens
+
+    def create_session(self, db: Session, *, kind: str, user_id: int) -> Tuple[str, str]:
+        """Start a login session, return its id and first refresh token"""
+        session_id = new_session_id()
+        refresh_token = self._insert_refresh_token(db, session_id=session_id, kind=kind, user_id=user_id)
+        db.commit()
+        return session_id, refresh_token
+
+    def rotate_refresh_token(self, db: Session, *, refresh_token: str) -> Optional[Dict[str, Any]]:
+        """
+        Exchange a refresh token for its successor. Returns the session id,
+        user id, role and new refresh token, or None if the token is unknown,
+        expired, already used or its user is inactive. Presenting an already
+        rotated token revokes the whole session.
+        """
+        tokens = RefreshToken.__table__
+        identities = Identity.__table__
+        row = db.execute(
+            select(
+                tokens.c.id,
+                tokens.c.session_id,
+                tokens.c.kind,
+                tokens.c.user_id,
+                tokens.c.expires_at,
+                tokens.c.rotated_at,
+                tokens.c.revoked_at,
+                identities.c.role,
+                identities.c.is_active
+            )
+            .join(
+                identities,
+                and_(identities.c.kind == tokens.c.kind, identities.c.user_id == tokens.c.user_id),
+                isouter=True
+            )
+            .where(tokens.c.token_hash == hash_refresh_token(refresh_token))
+            .with_for_update(of=tokens)
+        ).first()
+        if row is None:
+            return None
+        if row.rotated_at is not None or row.revoked_at is not None:
+            # Someone else holds a copy of this token; end the session for both
+            self._revoke_sessions(db, [row.session_id])
+            db.commit()
+            return None
+        if row.expires_at <= datetime.utcnow() or not row.is_active:
+            db.rollback()
+            return None
+
+        db.execute(update(tokens).where(tokens.c.id == row.id).values(rotated_at=datetime.utcnow()))
+        successor = self._insert_refresh_token(
+            db, session_id=row.session_id, kind=row.kind, user_id=row.user_id
+        )
+        db.commit()
+        return {
+            "session_id": row.session_id,
+            "user_id": row.user_id,
+            "role": row.role,
+            "refresh_token": successor
+        }
+
+    def revoke_refresh_token_session(self, db: Session, *, refresh_token: str) -> bool:
+        """Log out the session a refresh token belongs to"""
+        tokens = RefreshToken.__table__
+        session_id = db.execute(
+            select(tokens.c.session_id).where(tokens.c.token_hash == hash_refresh_token(refresh_token))
+        ).scalar()
+        if session_id is None:
+            return False
+        self._revoke_sessions(db, [session_id])
+        db.commit()
+        return True
+
+    def get_active_session_revocations(self, db: Session) -> Dict[str, float]:
+        """Revoked session ids mapped to the Unix time their last access token expires"""
+        revoked = RevokedSession.__table__
+        rows = db.execute(
+            select(revoked.c.session_id, revoked.c.expires_at)
+            .where(revoked.c.expires_at > datetime.utcnow())
+        )
+        return {
+            row.session_id: row.expires_at.replace(tzinfo=timezone.utc).timestamp()
+            for row in rows
+        }
+
+    def _insert_refresh_token(self, db: Session, *, session_id: str, kind: str, user_id: int) -> str:
+        refresh_token = new_refresh_token()
+        db.execute(insert(RefreshToken.__table__).values(
+            token_hash=hash_refresh_token(refresh_token),
+            session_id=session_id,
+            kind=kind,
+            user_id=user_id,
+            expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        ))
+        return refresh_token
+
+    def _active_session_ids(self, db: Session, *, kind: str, user_id: int) -> list:
+        tokens = RefreshToken.__table__
+        return list(db.execute(
+            select(tokens.c.session_id).distinct().where(
+                tokens.c.kind == kind,
+                tokens.c.user_id == user_id,
+                tokens.c.revoked_at.is_(None),
+                tokens.c.rotated_at.is_(None)
+            )
+        ).scalars())
+
+    def _revoke_sessions(self, db: Session, session_ids: Iterable[str]) -> None:
+        """Revoke locally at once and persist for the other processes; does not commit"""
+        session_ids = list(session_ids)
+        if not session_ids:
+            return
+        now = datetime.utcnow()
+        # Access tokens issued for these sessions are all gone by then
+        expires_at = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        for session_id in session_ids:
+            revoked_sessions.add(session_id, expires_at.replace(tzinfo=timezone.utc).timestamp())
+        tokens = RefreshToken.__table__
+        db.execute(
+            update(tokens)
+            .where(tokens.c.session_id.in_(session_ids), tokens.c.revoked_at.is_(None))
+            .values(revoked_at=now)
+        )
+        statement = postgresql.insert(RevokedSession.__table__)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["session_id"],
+                set_={"expires_at": statement.excluded.expires_at}
+            ),
+            [{"session_id": session_id, "expires_at": expires_at} for session_id in session_ids]
+        )
+
 auth_crud = CRUDAuth()
@@ -0,0 +1,66 @@
+import threading
+import time
+from typing import List, Optional
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.geofence import GeofenceIndex
+from ..models.geofence import Geofence
+from ..schemas.geofence import GeofenceCreate, GeofenceUpdate
+from .base import CRUDBase
+
+class CRUDGeofence(CRUDBase[Geofence, GeofenceCreate, GeofenceUpdate]):
+    def get_active(self, db: Session, *, campus: Optional[str] = None) -> List[Geofence]:
+        query = db.query(Geofence).filter(Geofence.is_active == True)
+        if campus:
+            query = query.filter(Geofence.campus == campus)
+        return query.order_by(Geofence.id).all()
+
+    def create(self, db: Session, *, obj_in: GeofenceCreate) -> Geofence:
+        db_obj = super().create(db, obj_in=obj_in)
+        invalidate_geofence_index()
+        return db_obj
+
+    def update(self, db: Session, *, db_obj: Geofence, obj_in: GeofenceUpdate) -> Geofence:
+        # Replace the whole shape so a circle turned polygon drops its center and radius
+        db_obj = super().update(db, db_obj=db_obj, obj_in=obj_in.dict())
+        invalidate_geofence_index()
+        return db_obj
+
+    def deactivate(self, db: Session, *, db_obj: Geofence) -> Geofence:
+        db_obj = super().update(db, db_obj=db_obj, obj_in={"is_active": False})
+        invalidate_geofence_index()
+        return db_obj
+
+geofence = CRUDGeofence(Geofence)
+
+# In-memory index of the active geofences, shared by every request in the process.
+# Changes made here invalidate it right away; other processes pick them up
+# within GEOFENCE_CACHE_SECONDS.
+_index: Optional[GeofenceIndex] = None
+_index_loaded_at = 0.0
+# Bumped by invalidation, so an index loaded before it is not installed after it
+_index_generation = 0
+_index_lock = threading.Lock()
+
+def get_geofence_index(db: Session) -> GeofenceIndex:
+    global _index, _index_loaded_at
+    with _index_lock:
+        index, loaded_at, generation = _index, _index_loaded_at, _index_generation
+    if index is not None and time.monotonic() - loaded_at <= settings.GEOFENCE_CACHE_SECONDS:
+        return index
+
+    # Load without holding the lock: under AsyncSession.run_sync the query
+    # suspends this greenlet on the event loop thread, and another check-in
+    # waiting on the lock there would block the loop it needs to resume
+    index = GeofenceIndex(geofence.get_active(db), settings.GEOFENCE_GRID_DEGREES)
+    with _index_lock:
+        if generation == _index_generation:
+            _index, _index_loaded_at = index, time.monotonic()
+    return index
+
+def invalidate_geofence_index() -> None:
+    global _index, _index_generation
+    with _index_lock:
+        _index = None
+        _index_generation += 1
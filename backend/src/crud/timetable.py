@@ -3,6 +3,7 @@ from sqlalchemy import and_, or_, func, case
 from datetime import datetime, time
 from typing import List, Optional
 from ..models.timetable import Period, TimetableSlot, Attendance, TimetableConfig, TimetableChangeLog
+from ..models.attendance import AttendanceDailyRollup
 from ..schemas.timetable import (
     PeriodCreate, PeriodUpdate,
     TimetableSlotCreate, TimetableSlotUpdate,
@@ -96,39 +97,34 @@ class AttendanceCRUD:
         ).all()
 
     def generate_report(self, db: Session, params: AttendanceReportParams) -> List[AttendanceReport]:
-        # Base query
+        # Read the per-day rollup instead of re-scanning raw attendance marks
         query = db.query(
-            Attendance.student_id,
-            func.count(Attendance.id).label('total_days'),
-            func.sum(case((Attendance.status == 'present', 1), else_=0)).label('present_days'),
-            func.sum(case((Attendance.status == 'absent', 1), else_=0)).label('absent_days'),
-            func.sum(case((Attendance.status == 'late', 1), else_=0)).label('late_days'),
-            func.sum(case((Attendance.status == 'excused', 1), else_=0)).label('excused_days')
+            AttendanceDailyRollup.student_id,
+            func.sum(AttendanceDailyRollup.present_count).label('present_days'),
+            func.sum(AttendanceDailyRollup.absent_count).label('absent_days'),
+            func.sum(AttendanceDailyRollup.late_count).label('late_days'),
+            func.sum(AttendanceDailyRollup.excused_count).label('excused_days')
         ).filter(
-            Attendance.date >= params.start_date,
-            Attendance.date <= params.end_date
+            AttendanceDailyRollup.date >= params.start_date.date(),
+            AttendanceDailyRollup.date <= params.end_date.date()
         )
 
         # Apply filters
         if params.class_section_id:
-            query = query.join(TimetableSlot).join(Period).filter(
-                Period.class_section_id == params.class_section_id
-            )
+            query = query.filter(AttendanceDailyRollup.class_section_id == params.class_section_id)
         if params.student_id:
-            query = query.filter(Attendance.student_id == params.student_id)
+            query = query.filter(AttendanceDailyRollup.student_id == params.student_id)
         if params.subject_id:
-            query = query.join(TimetableSlot).filter(
-                TimetableSlot.subject_id == params.subject_id
-            )
+            query = query.filter(AttendanceDailyRollup.subject_id == params.subject_id)
 
         # Group by student
-        query = query.group_by(Attendance.student_id)
+        query = query.group_by(AttendanceDailyRollup.student_id)
 
         # Convert to report format
         results = []
         for row in query.all():
-            total_possible = row.total_days
             present_days = row.present_days or 0
+            total_possible = present_days + (row.absent_days or 0) + (row.late_days or 0) + (row.excused_days or 0)
             percentage = (present_days / total_possible * 100) if total_possible > 0 else 0
 
             report = AttendanceReport(
@@ -1,8 +1,13 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from .core.config import settings
 from .core.init_db import init_db
+from .core.jwt_keys import get_key_ring
+from .core.pool_metrics import pool_metrics_snapshot
+from .workers.audit_log import audit_log_writer
+from .workers.qr_revocations import qr_revocation_refresher
+from .workers.session_revocations import session_revocation_refresher
 from .api import router
 
 app = FastAPI(
@@ -22,6 +27,17 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    # Fail at startup rather than on the first login if the signing keys are misconfigured
+    get_key_ring()
+    # QR scans are checked against an in-memory revocation set kept fresh here
+    qr_revocation_refresher.start()
+    # Likewise access tokens of logged-out sessions
+    session_revocation_refresher.start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    # Write out audit log entries still buffered in this process
+    audit_log_writer.stop()
 
 app.include_router(router, prefix=settings.API_V1_STR)
 
@@ -32,3 +48,17 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/health/db")
+async def db_pool_health():
+    return {"pools": pool_metrics_snapshot()}
+
+@app.get("/health/audit-log")
+async def audit_log_health():
+    return audit_log_writer.stats()
+
+@app.get("/.well-known/jwks.json")
+async def jwks(response: Response):
+    # Public keys for verifying access tokens without calling the API
+    response.headers["Cache-Control"] = f"public, max-age={settings.JWKS_CACHE_SECONDS}"
+    return get_key_ring().jwks()
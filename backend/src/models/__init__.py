@@ -7,4 +7,7 @@ from .subject import Subject  # noqa: F401
 from .class_section import ClassSection  # noqa: F401
 from .teaching_assignment import TeachingAssignment  # noqa: F401
 from .fees import FeePayment  # noqa: F401
+from .geofence import Geofence  # noqa: F401
+from .identity import Identity  # noqa: F401
+from .refresh_token import RefreshToken, RevokedSession  # noqa: F401
 from .timetable import TimetableSlot, Period, TimetableConfig  # noqa: F401
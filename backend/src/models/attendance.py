@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, Boolean, JSON, Float
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Enum, Text, Boolean, JSON, Float, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -17,20 +17,43 @@ class AttendanceStatus(str, enum.Enum):
 
 class StudentAttendance(Base):
     __tablename__ = "student_attendances"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Offline records are replayed idempotently on (device_id, local_id);
+        # unique constraints on a partitioned table must include the partition key
+        UniqueConstraint("device_id", "local_id", "date", name="uq_student_attendances_device_local"),
+        # One mark per student per period
+        Index("uq_student_attendances_student_date_period", "student_id", "date", "period_number", unique=True),
+        Index("ix_student_attendances_student_subject_date", "student_id", "subject_id", "date"),
+        # Daily class summaries, by the section each mark was made in
+        Index("ix_student_attendances_section_date", "class_section_id", "date"),
+        # Periods taught in subject reports
+        Index("ix_student_attendances_subject_date_period", "subject_id", "date", "period_number"),
+        # Absence notification job: absent students in one period of one day
+        Index(
+            "ix_student_attendances_absent_date_period",
+            "date", "period_number",
+            postgresql_where=text("status = 'ABSENT'")
+        ),
+        # Monthly partitions are managed by crud.attendance_partitions
+        {'extend_existing': True, 'postgresql_partition_by': 'RANGE (date)'}
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
     student_profile_id = Column(Integer, ForeignKey("student_profiles.id"), nullable=True)
     timetable_slot_id = Column(Integer, ForeignKey("timetable_slots.id"), nullable=True)
     status = Column(Enum(AttendanceStatus), nullable=False)
-    date = Column(DateTime, nullable=False)
+    date = Column(DateTime, primary_key=True)
     note = Column(Text)
     marked_by = Column(Integer, ForeignKey("staff.id"), nullable=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
     period_number = Column(Integer)
     subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=True)
+    # Section the mark was made in, which keys its rollup counters even after the student moves
+    class_section_id = Column(Integer, ForeignKey("class_sections.id"), nullable=True)
+    device_id = Column(String, nullable=True)
+    local_id = Column(String, nullable=True)
     
     # Relationships
     student = relationship("Student", back_populates="attendances")
@@ -38,11 +61,47 @@ class StudentAttendance(Base):
     timetable_slot = relationship("TimetableSlot", back_populates="attendances")
     teacher = relationship("Staff", foreign_keys=[marked_by])
 
+# Matches the keyset used to page through a student's history
+Index(
+    "ix_student_attendances_student_history",
+    StudentAttendance.student_id,
+    StudentAttendance.date,
+    func.coalesce(StudentAttendance.period_number, 0),
+    StudentAttendance.id
+)
+
+class AttendanceDailyRollup(Base):
+    """Per-status attendance counters for one student, subject and day"""
+    __tablename__ = "attendance_daily_rollup"
+    __table_args__ = (
+        UniqueConstraint(
+            "date", "class_section_id", "subject_id", "student_id",
+            name="uq_attendance_daily_rollup_key",
+            postgresql_nulls_not_distinct=True
+        ),
+        Index("ix_attendance_daily_rollup_student_date", "student_id", "date"),
+        Index("ix_attendance_daily_rollup_class_section_date", "class_section_id", "date"),
+        Index("ix_attendance_daily_rollup_subject_date", "subject_id", "date"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    date = Column(Date, nullable=False)
+    class_section_id = Column(Integer, ForeignKey("class_sections.id"), nullable=True)
+    subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=True)
+    student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
+    present_count = Column(Integer, nullable=False, default=0)
+    absent_count = Column(Integer, nullable=False, default=0)
+    late_count = Column(Integer, nullable=False, default=0)
+    excused_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
 class AttendanceAuditLog(Base):
     __tablename__ = "attendance_audit_logs"
+    __table_args__ = {'postgresql_partition_by': 'RANGE (created_at)'}
     
-    id = Column(Integer, primary_key=True, index=True)
-    attendance_id = Column(Integer, ForeignKey("student_attendances.id"), nullable=False)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    # No foreign key: student_attendances.id is only unique together with date
+    attendance_id = Column(Integer, nullable=False, index=True)
     modified_by = Column(Integer, ForeignKey("staff.id"), nullable=False)
     old_status = Column(Enum(AttendanceStatus), nullable=True)
     new_status = Column(Enum(AttendanceStatus), nullable=False)
@@ -50,18 +109,27 @@ class AttendanceAuditLog(Base):
     reason = Column(Text)
     ip_address = Column(String)
     user_agent = Column(String)
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(DateTime, primary_key=True, server_default=func.now())
 
 class QRCodeAttendance(Base):
     __tablename__ = "qr_code_attendances"
     
     id = Column(Integer, primary_key=True, index=True)
-    qr_code = Column(String, nullable=False)
+    qr_code = Column(String, nullable=False, index=True)
     student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
     is_valid = Column(Boolean, default=True)
     scanned_at = Column(DateTime, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
 
+class QRTokenRevocation(Base):
+    """QR tokens invalidated before their expiry, mirrored in memory by every API process"""
+    __tablename__ = "qr_token_revocations"
+    
+    token_id = Column(String, primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_by = Column(Integer, ForeignKey("staff.id"), nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+
 class GeolocationAttendance(Base):
     __tablename__ = "geolocation_attendances"
     
@@ -69,28 +137,76 @@ class GeolocationAttendance(Base):
     student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
+    accuracy = Column(Float, nullable=True)
+    device_info = Column(JSON, nullable=True)
     is_within_bounds = Column(Boolean, nullable=False)
+    geofence_id = Column(Integer, ForeignKey("geofences.id"), nullable=True)
     created_at = Column(DateTime, server_default=func.now())
 
 class OfflineAttendanceSync(Base):
     __tablename__ = "offline_attendance_syncs"
+    __table_args__ = (
+        # Worker queue lookups only ever touch PENDING / PROCESSING rows
+        Index(
+            "ix_offline_attendance_syncs_pending",
+            "created_at",
+            postgresql_where=text("sync_status = 'PENDING'")
+        ),
+        Index(
+            "ix_offline_attendance_syncs_processing",
+            "claimed_at",
+            postgresql_where=text("sync_status = 'PROCESSING'")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     sync_id = Column(String, nullable=False, unique=True)
+    device_id = Column(String, nullable=True)
     sync_data = Column(JSON, nullable=False)
-    sync_status = Column(String, nullable=False)
+    sync_status = Column(String, nullable=False)  # PENDING, PROCESSING, SYNCED, FAILED
+    sync_result = Column(JSON, nullable=True)  # Per-record outcome keyed by local_id
     error_details = Column(JSON, nullable=True)
+    submitted_by = Column(Integer, ForeignKey("staff.id"), nullable=True)
+    ip_address = Column(String)
+    user_agent = Column(String)
+    attempts = Column(Integer, nullable=False, server_default=text("0"))  # Claims, up to OFFLINE_SYNC_MAX_ATTEMPTS
+    claimed_at = Column(DateTime, nullable=True)
     synced_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
 
 class AttendanceNotification(Base):
     __tablename__ = "attendance_notifications"
+    __table_args__ = (
+        # The dispatcher claims PENDING rows that are due and requeues stale SENDING ones
+        Index(
+            "ix_attendance_notifications_pending",
+            "next_attempt_at",
+            postgresql_where=text("status = 'PENDING'")
+        ),
+        Index(
+            "ix_attendance_notifications_sending",
+            "claimed_at",
+            postgresql_where=text("status = 'SENDING'")
+        ),
+        # Generated absence notices go out at most once per student, type and day
+        Index(
+            "uq_attendance_notifications_student_type_date",
+            "student_id", "notification_type", "attendance_date",
+            unique=True,
+            postgresql_where=text("attendance_date IS NOT NULL")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
     message = Column(Text, nullable=False)
     notification_type = Column(String, nullable=False)
-    status = Column(String, nullable=False)
+    channel = Column(String, nullable=True)  # NOTIFICATION_DEFAULT_CHANNEL when unset
+    attendance_date = Column(Date, nullable=True)  # Set on notices generated from attendance
+    status = Column(String, nullable=False)  # PENDING, SENDING, SENT or FAILED
+    attempts = Column(Integer, nullable=False, server_default=text("0"))
+    next_attempt_at = Column(DateTime, server_default=func.now())
+    claimed_at = Column(DateTime, nullable=True)
     error_message = Column(Text, nullable=True)
     sent_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
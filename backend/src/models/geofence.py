@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, JSON
+from sqlalchemy.sql import func
+from .base import Base
+
+class Geofence(Base):
+    """
+    A campus area that counts as on-site for geolocation attendance. Either a
+    circle (center and radius) or a polygon of [latitude, longitude] vertices.
+    """
+    __tablename__ = "geofences"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    campus = Column(String, nullable=False, index=True)
+    center_latitude = Column(Float, nullable=True)
+    center_longitude = Column(Float, nullable=True)
+    radius_meters = Column(Float, nullable=True)
+    polygon = Column(JSON, nullable=True)  # [[latitude, longitude], ...]
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, onupdate=func.now())
@@ -0,0 +1,74 @@
+from sqlalchemy import Column, Integer, String, Boolean, UniqueConstraint, event, text
+from .base import Base
+
+class Identity(Base):
+    """
+    Login lookup across students and staff: one row per student and per staff
+    member, maintained by database triggers on both tables, so the application
+    only reads it. A student and a staff member may share an email; logins
+    that do not say which they are get the student, as the old
+    student-then-staff lookup did.
+    """
+    __tablename__ = "identities"
+    __table_args__ = (
+        UniqueConstraint("kind", "email", name="uq_identities_kind_email"),
+    )
+
+    kind = Column(String, primary_key=True)  # "student" or "staff"
+    user_id = Column(Integer, primary_key=True)
+    email = Column(String, nullable=False, index=True)
+    role = Column(String, nullable=False)  # "student" or the staff role
+    hashed_password = Column(String, nullable=False)
+    is_active = Column(Boolean)
+
+# Upserts or deletes the identity of the changed row; the trigger argument is its kind.
+# Kept in step with the identities migration, which installs the same on existing databases.
+SYNC_IDENTITY_TRIGGER = """
+CREATE OR REPLACE FUNCTION sync_identity_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM identities WHERE kind = TG_ARGV[0] AND user_id = OLD.id;
+        RETURN NULL;
+    END IF;
+    INSERT INTO identities (kind, user_id, email, role, hashed_password, is_active)
+    VALUES (
+        TG_ARGV[0], NEW.id, NEW.email,
+        coalesce(lower(to_jsonb(NEW) ->> 'role'), 'student'),
+        NEW.hashed_password, NEW.is_active
+    )
+    ON CONFLICT (kind, user_id) DO UPDATE SET
+        email = EXCLUDED.email,
+        role = EXCLUDED.role,
+        hashed_password = EXCLUDED.hashed_password,
+        is_active = EXCLUDED.is_active;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# table -> (kind, columns whose updates are synced)
+SYNC_IDENTITY_TABLES = {
+    "students": ("student", "email, hashed_password, is_active"),
+    "staff": ("staff", "email, hashed_password, is_active, role"),
+}
+
+def install_identity_sync(target, connection, tables=(), **kw) -> None:
+    """Triggers and backfill for identities when create_all builds the table"""
+    if Identity.__table__ not in tables:
+        return
+    connection.execute(text(SYNC_IDENTITY_TRIGGER))
+    for table, (kind, columns) in SYNC_IDENTITY_TABLES.items():
+        connection.execute(text(
+            f"CREATE TRIGGER {table}_sync_identity "
+            f"AFTER INSERT OR DELETE OR UPDATE OF {columns} ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION sync_identity_trigger('{kind}')"
+        ))
+    connection.execute(text(
+        "INSERT INTO identities (kind, user_id, email, role, hashed_password, is_active)"
+        " SELECT 'student', id, email, 'student', hashed_password, is_active FROM students"
+        " UNION ALL"
+        " SELECT 'staff', id, email, lower(role::text), hashed_password, is_active FROM staff"
+    ))
+
+# After every table exists, since the triggers live on students and staff
+event.listen(Base.metadata, "after_create", install_identity_sync)
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index, text
+from sqlalchemy.sql import func
+from .base import Base
+
+class RefreshToken(Base):
+    """
+    One refresh token of a login session. Every use rotates it: the row is
+    marked rotated and a successor with the same session_id is issued, so
+    presenting a rotated token again means it leaked and the whole session
+    is revoked. Only the SHA-256 of the token is stored.
+    """
+    __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        # Revoking every session of a user on password change
+        Index(
+            "ix_refresh_tokens_user_active", "kind", "user_id",
+            postgresql_where=text("revoked_at IS NULL AND rotated_at IS NULL")
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    token_hash = Column(String, nullable=False, unique=True, index=True)
+    session_id = Column(String, nullable=False, index=True)
+    kind = Column(String, nullable=False)  # "student" or "staff", see Identity
+    user_id = Column(Integer, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    rotated_at = Column(DateTime, nullable=True)
+    revoked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+class RevokedSession(Base):
+    """Revoked login sessions, mirrored in memory and checked against the sid of access tokens"""
+    __tablename__ = "revoked_sessions"
+
+    session_id = Column(String, primary_key=True)
+    # When the last access token issued for the session expires
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, server_default=func.now())
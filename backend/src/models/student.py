@@ -23,7 +23,7 @@ class Student(Base):
     address = Column(String)
     phone_number = Column(String(20))
     guardian_id = Column(Integer, ForeignKey("guardians.id"), nullable=False)
-    class_section_id = Column(Integer, ForeignKey("class_sections.id"))
+    class_section_id = Column(Integer, ForeignKey("class_sections.id"), index=True)
     is_active = Column(Boolean, default=True)
     admission_status = Column(Enum(AdmissionStatus), default=AdmissionStatus.PENDING)
     created_at = Column(DateTime, server_default=func.now())
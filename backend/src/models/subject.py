@@ -25,7 +25,7 @@ class TimetableSlot(Base):
     __tablename__ = "timetable_slots"
     __table_args__ = {'extend_existing': True}  # Allow table redefinition
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)  # ix_timetable_slots_id comes from models.timetable
     subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=False)
     class_section_id = Column(Integer, ForeignKey("class_sections.id"), nullable=False)
     teaching_staff_id = Column(Integer, ForeignKey("staff.id"), nullable=False)
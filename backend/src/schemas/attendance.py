@@ -27,6 +27,21 @@ class StudentAttendance(StudentAttendanceBase):
     class Config:
         from_attributes = True
 
+class StudentAttendanceBulkCreate(BaseModel):
+    records: List[StudentAttendanceCreate] = Field(..., min_length=1, max_length=1000)
+
+class BulkAttendanceRowResult(BaseModel):
+    index: int
+    success: bool
+    attendance_id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkAttendanceResult(BaseModel):
+    total: int
+    created: int
+    failed: int
+    results: List[BulkAttendanceRowResult]
+
 class AttendanceAuditLogBase(BaseModel):
     attendance_id: int
     modified_by: int
@@ -64,8 +79,34 @@ class QRCodeAttendance(QRCodeAttendanceBase):
     class Config:
         from_attributes = True
 
+class QRTokenCreate(BaseModel):
+    class_section_id: int
+    subject_id: int
+    period_number: int
+
+class QRToken(QRTokenCreate):
+    token: str
+    teacher_id: int
+    expires_at: datetime
+
+class QRTokenClaims(QRTokenCreate):
+    token_id: str
+    teacher_id: int
+    expires_at: int  # Unix timestamp
+
+class QRTokenRevoke(BaseModel):
+    token: str
+
+class QRScan(BaseModel):
+    token: str
+    student_id: int
+    device_info: Optional[Dict[str, Any]] = None
+
+class QRScanBatch(BaseModel):
+    scans: List[QRScan] = Field(..., min_length=1, max_length=1000)
+
 class GeolocationAttendanceBase(BaseModel):
-    attendance_id: int
+    student_id: int
     latitude: float = Field(..., ge=-90, le=90)
     longitude: float = Field(..., ge=-180, le=180)
     accuracy: float
@@ -80,9 +121,13 @@ class GeolocationAttendanceBase(BaseModel):
 class GeolocationAttendanceCreate(GeolocationAttendanceBase):
     pass
 
+class GeolocationAttendanceBatch(BaseModel):
+    check_ins: List[GeolocationAttendanceCreate] = Field(..., min_length=1, max_length=1000)
+
 class GeolocationAttendance(GeolocationAttendanceBase):
     id: int
     is_within_bounds: bool
+    geofence_id: Optional[int] = None
     created_at: datetime
 
     class Config:
@@ -119,11 +164,23 @@ class OfflineAttendanceSync(OfflineAttendanceSyncBase):
     class Config:
         from_attributes = True
 
+class OfflineAttendanceSyncAccepted(BaseModel):
+    sync_id: str
+    sync_status: str
+    status_url: str
+
+class OfflineAttendanceSyncResult(BaseModel):
+    sync_id: str
+    sync_status: str
+    synced_at: Optional[datetime] = None
+    error_details: Optional[Dict[str, Any]] = None
+    outcomes: Optional[Dict[str, str]] = None
+
 class AttendanceNotificationBase(BaseModel):
     student_id: int
-    attendance_id: int
     notification_type: str
-    content: str
+    message: str
+    channel: Optional[str] = None
 
 class AttendanceNotificationCreate(AttendanceNotificationBase):
     pass
@@ -131,10 +188,11 @@ class AttendanceNotificationCreate(AttendanceNotificationBase):
 class AttendanceNotification(AttendanceNotificationBase):
     id: int
     status: str
+    attempts: int
+    next_attempt_at: Optional[datetime] = None
     error_message: Optional[str]
     sent_at: Optional[datetime]
     created_at: datetime
-    updated_at: datetime
 
     class Config:
         from_attributes = True
@@ -156,8 +214,8 @@ class StudentAttendanceSummary(BaseModel):
 class ClassAttendanceSummary(BaseModel):
     class_section_id: int
     date: datetime
-    period_number: int
-    subject_id: int
+    period_number: Optional[int] = None
+    subject_id: Optional[int] = None
     total_students: int
     present_count: int
     absent_count: int
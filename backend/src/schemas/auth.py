@@ -4,10 +4,15 @@ from pydantic import BaseModel
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
 
 class TokenPayload(BaseModel):
     sub: Optional[int] = None
     role: Optional[str] = None
+    sid: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 class UserCreate(BaseModel):
     email: str
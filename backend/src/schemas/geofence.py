@@ -0,0 +1,42 @@
+from typing import Optional, List
+from datetime import datetime
+from pydantic import BaseModel, Field, validator
+
+class GeofenceBase(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    campus: str = Field(..., min_length=1, max_length=100)
+    center_latitude: Optional[float] = Field(None, ge=-90, le=90)
+    center_longitude: Optional[float] = Field(None, ge=-180, le=180)
+    radius_meters: Optional[float] = Field(None, gt=0)
+    polygon: Optional[List[List[float]]] = None
+    is_active: bool = True
+
+    @validator('polygon', always=True)
+    def validate_shape(cls, v, values):
+        circle = [values.get(key) for key in ('center_latitude', 'center_longitude', 'radius_meters')]
+        if v is None:
+            if None in circle:
+                raise ValueError('Provide either center and radius or a polygon')
+            return v
+        if any(value is not None for value in circle):
+            raise ValueError('A geofence is either a circle or a polygon, not both')
+        if len(v) < 3:
+            raise ValueError('A polygon needs at least 3 vertices')
+        for vertex in v:
+            if len(vertex) != 2 or not -90 <= vertex[0] <= 90 or not -180 <= vertex[1] <= 180:
+                raise ValueError('Polygon vertices must be [latitude, longitude] pairs')
+        return v
+
+class GeofenceCreate(GeofenceBase):
+    pass
+
+class GeofenceUpdate(GeofenceBase):
+    pass
+
+class Geofence(GeofenceBase):
+    id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
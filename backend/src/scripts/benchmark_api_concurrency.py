@@ -0,0 +1,64 @@
+"""
+Load test an API endpoint at increasing concurrency.
+
+Run against a running server with:
+python -m src.scripts.benchmark_api_concurrency --url http://localhost:8000/api/v1/attendance/summary/class/1 --token <jwt>
+
+Each level keeps that many requests in flight for --duration seconds and
+reports throughput and latency percentiles, so it shows whether requests per
+second keep growing with concurrency or flatline on a blocked event loop.
+"""
+import argparse
+import logging
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def worker(url: str, headers: dict, deadline: float) -> Tuple[List[float], int]:
+    latencies, errors = [], 0
+    while time.perf_counter() < deadline:
+        request = urllib.request.Request(url, headers=headers)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+            latencies.append(time.perf_counter() - started)
+        except (urllib.error.URLError, OSError):
+            errors += 1
+    return latencies, errors
+
+def run_level(url: str, headers: dict, concurrency: int, duration: float) -> None:
+    deadline = time.perf_counter() + duration
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(
+            lambda _: worker(url, headers, deadline), range(concurrency)
+        ))
+    latencies = sorted(latency for result, _ in results for latency in result)
+    errors = sum(errors for _, errors in results)
+    if not latencies:
+        logger.error(f"concurrency {concurrency}: every request failed ({errors} errors)")
+        return
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+    logger.info(
+        f"concurrency {concurrency:>4}: {len(latencies) / duration:8.1f} req/s, "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms, p95 {p95 * 1000:7.1f} ms, "
+        f"{errors} errors"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test an API endpoint at increasing concurrency")
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--token", default=None, help="Bearer token sent with every request")
+    parser.add_argument("--levels", default="1,4,16,64", help="Comma separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per level")
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    for level in (int(level) for level in args.levels.split(",")):
+        run_level(args.url, headers, level, args.duration)
@@ -0,0 +1,87 @@
+"""
+Drive the connection pool to saturation.
+
+Run with: python -m src.scripts.benchmark_db_pool --workers 60 --pool-size 5 --max-overflow 10
+Each worker repeatedly checks out a connection, holds it for --hold-ms with
+pg_sleep (standing in for a roll-call query) and returns it. With more
+workers than pool_size + max_overflow the report shows the checkout wait
+growing and, past --pool-timeout, `QueuePool limit` timeouts. Pass
+--pgbouncer to compare against a connection per checkout.
+"""
+import argparse
+import logging
+import threading
+import time
+
+from sqlalchemy import create_engine, exc, text
+
+from ..core.config import settings
+from ..core.database import engine_options
+from ..core.pool_metrics import TimedQueuePool, instrument_engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def run_worker(bench_engine, hold_seconds: float, deadline: float, counts: dict, lock: threading.Lock) -> None:
+    while time.perf_counter() < deadline:
+        try:
+            with bench_engine.connect() as connection:
+                connection.execute(text("SELECT pg_sleep(:seconds)"), {"seconds": hold_seconds})
+            outcome = "completed"
+        except exc.TimeoutError:
+            outcome = "timed_out"
+        except exc.OperationalError:
+            # Typically "too many clients" once the server's max_connections is hit
+            outcome = "failed"
+        with lock:
+            counts[outcome] += 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Saturate the database connection pool")
+    parser.add_argument("--workers", type=int, default=60)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--hold-ms", type=float, default=50.0, help="How long each checkout is held")
+    parser.add_argument("--pool-size", type=int, default=settings.DB_POOL_SIZE)
+    parser.add_argument("--max-overflow", type=int, default=settings.DB_MAX_OVERFLOW)
+    parser.add_argument("--pool-timeout", type=float, default=settings.DB_POOL_TIMEOUT)
+    parser.add_argument("--pgbouncer", action="store_true", help="Open a connection per checkout")
+    args = parser.parse_args()
+
+    overrides = {} if args.pgbouncer else {
+        "pool_size": args.pool_size,
+        "max_overflow": args.max_overflow,
+        "pool_timeout": args.pool_timeout
+    }
+    options = engine_options("benchmark", TimedQueuePool, pgbouncer=args.pgbouncer, **overrides)
+    bench_engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI), **options)
+    metrics = instrument_engine(bench_engine, "benchmark")
+
+    counts = {"completed": 0, "timed_out": 0, "failed": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    workers = [
+        threading.Thread(
+            target=run_worker,
+            args=(bench_engine, args.hold_ms / 1000, deadline, counts, lock),
+            daemon=True
+        )
+        for _ in range(args.workers)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    snapshot = metrics.snapshot()
+    logger.info(
+        f"{args.workers} workers, {snapshot['pool_class']}: "
+        f"{counts['completed'] / elapsed:.1f} checkouts/s, "
+        f"{counts['timed_out']} timeouts, {counts['failed']} failures"
+    )
+    logger.info(
+        f"checkout wait avg {snapshot['avg_wait_ms']} ms, max {snapshot['max_wait_ms']} ms, "
+        f"{snapshot['connects']} connections opened"
+    )
+    bench_engine.dispose()
@@ -0,0 +1,113 @@
+"""
+Benchmark geofence evaluation for a batch of check-ins.
+
+Run with: python -m src.scripts.benchmark_geofence --points 10000 --campuses 200
+Builds synthetic circle and polygon campuses around one city, needs no database,
+and compares the grid index against checking every point against every fence.
+"""
+import argparse
+import logging
+import math
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from ..core.config import settings
+from ..core.geofence import GeofenceIndex, EARTH_RADIUS_METERS, METERS_PER_DEGREE
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CITY_LATITUDE = 13.0827
+CITY_LONGITUDE = 80.2707
+CITY_SPAN_DEGREES = 0.3
+
+def build_campuses(count: int, rng: np.random.Generator) -> list:
+    campuses = []
+    for campus_id in range(1, count + 1):
+        lat = CITY_LATITUDE + rng.uniform(-CITY_SPAN_DEGREES, CITY_SPAN_DEGREES)
+        lon = CITY_LONGITUDE + rng.uniform(-CITY_SPAN_DEGREES, CITY_SPAN_DEGREES)
+        radius = rng.uniform(100, 600)
+        if campus_id % 2:
+            campuses.append(SimpleNamespace(
+                id=campus_id, polygon=None,
+                center_latitude=lat, center_longitude=lon, radius_meters=radius
+            ))
+        else:
+            angles = np.sort(rng.uniform(0, 2 * math.pi, 8))
+            half = radius / METERS_PER_DEGREE
+            campuses.append(SimpleNamespace(
+                id=campus_id,
+                polygon=[[lat + half * math.sin(a), lon + half * math.cos(a)] for a in angles],
+                center_latitude=None, center_longitude=None, radius_meters=None
+            ))
+    return campuses
+
+def naive_locate(campuses: list, latitudes: np.ndarray, longitudes: np.ndarray) -> list:
+    """One point and one fence at a time, as a per-request check would"""
+    result = []
+    for lat, lon in zip(latitudes.tolist(), longitudes.tolist()):
+        found = -1
+        for campus in campuses:
+            if campus.polygon:
+                inside = False
+                vertices = campus.polygon
+                for (lat1, lon1), (lat2, lon2) in zip(vertices, vertices[-1:] + vertices[:-1]):
+                    if (lat1 > lat) != (lat2 > lat):
+                        if lon < lon1 + (lat - lat1) * (lon2 - lon1) / (lat2 - lat1):
+                            inside = not inside
+            else:
+                phi, center_phi = math.radians(lat), math.radians(campus.center_latitude)
+                a = (
+                    math.sin((phi - center_phi) / 2) ** 2
+                    + math.cos(phi) * math.cos(center_phi)
+                    * math.sin(math.radians(lon - campus.center_longitude) / 2) ** 2
+                )
+                inside = 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(a)) <= campus.radius_meters
+            if inside:
+                found = campus.id
+                break
+        result.append(found)
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark geofence evaluation")
+    parser.add_argument("--points", type=int, default=10000)
+    parser.add_argument("--campuses", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    campuses = build_campuses(args.campuses, rng)
+    latitudes = CITY_LATITUDE + rng.uniform(-CITY_SPAN_DEGREES, CITY_SPAN_DEGREES, args.points)
+    longitudes = CITY_LONGITUDE + rng.uniform(-CITY_SPAN_DEGREES, CITY_SPAN_DEGREES, args.points)
+
+    started = time.perf_counter()
+    index = GeofenceIndex(campuses, settings.GEOFENCE_GRID_DEGREES)
+    logger.info(f"Indexed {len(index)} campuses in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        located = index.locate(latitudes, longitudes)
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    logger.info(
+        f"Grid index: {best * 1000:.2f} ms per batch of {args.points}, "
+        f"{best / args.points * 1e6:.3f} us per point, {int((located >= 0).sum())} inside"
+    )
+
+    started = time.perf_counter()
+    expected = naive_locate(campuses, latitudes, longitudes)
+    naive = time.perf_counter() - started
+    logger.info(
+        f"Point by point: {naive * 1000:.2f} ms per batch, "
+        f"{naive / args.points * 1e6:.3f} us per point ({naive / best:.0f}x slower)"
+    )
+
+    # The index returns the lowest matching id, as does the naive scan over ids in order
+    mismatches = int((np.asarray(expected) != located).sum())
+    if mismatches:
+        logger.error(f"{mismatches} points located differently by the index")
@@ -0,0 +1,208 @@
+"""
+Fail if any attendance hot-path query plans to a sequential scan, or if a
+query bounded to one month reads more than that month's partition.
+
+Run against a migrated database with: python -m src.scripts.check_attendance_query_plans
+CI runs it on every push and pull request, see .github/workflows/build.yml.
+Sequential scans are disabled for the session so small development tables
+still report whether a usable index exists rather than the cheapest plan.
+"""
+import logging
+import sys
+from datetime import date, datetime
+
+from sqlalchemy import and_, func, select, text, tuple_
+from sqlalchemy.dialects import postgresql
+
+from ..core.database import SessionLocal
+from ..models.attendance import (
+    StudentAttendance,
+    AttendanceAuditLog,
+    QRCodeAttendance,
+    OfflineAttendanceSync,
+    AttendanceNotification,
+    AttendanceDailyRollup
+)
+from ..models.student import Student
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Plain tables keep the check independent of ORM mapper configuration
+attendances = StudentAttendance.__table__
+audit_logs = AttendanceAuditLog.__table__
+qr_codes = QRCodeAttendance.__table__
+syncs = OfflineAttendanceSync.__table__
+notifications = AttendanceNotification.__table__
+rollup = AttendanceDailyRollup.__table__
+students = Student.__table__
+
+HISTORY_KEYSET = (
+    attendances.c.date,
+    func.coalesce(attendances.c.period_number, 0),
+    attendances.c.id
+)
+
+HOT_QUERIES = {
+    "student history page": (
+        select(attendances)
+        .where(attendances.c.student_id == 1)
+        .where(tuple_(*HISTORY_KEYSET) > (date(2024, 6, 1), 0, 0))
+        .order_by(*HISTORY_KEYSET)
+        .limit(100)
+    ),
+    "student subject range": (
+        select(attendances)
+        .where(attendances.c.student_id == 1)
+        .where(attendances.c.subject_id == 1)
+        .where(attendances.c.date.between(date(2024, 6, 1), date(2024, 12, 31)))
+    ),
+    "bulk duplicate precheck": (
+        select(attendances.c.student_id, attendances.c.date, attendances.c.period_number)
+        .where(
+            tuple_(attendances.c.student_id, attendances.c.date, attendances.c.period_number)
+            .in_([(1, date(2024, 6, 1), 1), (2, date(2024, 6, 1), 1)])
+        )
+    ),
+    "class summary for a day": (
+        select(attendances.c.class_section_id, attendances.c.status, func.count())
+        .where(attendances.c.class_section_id == 1)
+        .where(attendances.c.date == date(2024, 6, 1))
+        .group_by(attendances.c.class_section_id, attendances.c.status)
+    ),
+    "class roster size": (
+        select(students.c.class_section_id, func.count())
+        .where(students.c.class_section_id == 1)
+        .where(students.c.is_active == True)
+        .group_by(students.c.class_section_id)
+    ),
+    "subject periods taught": (
+        select(func.count(tuple_(attendances.c.date, attendances.c.period_number).distinct()))
+        .where(attendances.c.subject_id == 1)
+        .where(attendances.c.date >= date(2024, 6, 1))
+        .where(attendances.c.date < date(2025, 1, 1))
+    ),
+    "audit logs for a mark": (
+        select(audit_logs).where(audit_logs.c.attendance_id == 1)
+    ),
+    "qr code lookup": (
+        select(qr_codes).where(qr_codes.c.qr_code == "code")
+    ),
+    "offline sync claim": (
+        select(syncs.c.id)
+        .where(syncs.c.sync_status == "PENDING")
+        .order_by(syncs.c.created_at)
+        .limit(10)
+        .with_for_update(skip_locked=True)
+    ),
+    "stale sync requeue": (
+        select(syncs.c.id)
+        .where(and_(
+            syncs.c.sync_status == "PROCESSING",
+            syncs.c.claimed_at < datetime(2024, 6, 1)
+        ))
+    ),
+    "absent students in a period": (
+        select(attendances.c.student_id)
+        .where(attendances.c.date >= datetime(2024, 6, 1))
+        .where(attendances.c.date < datetime(2024, 6, 2))
+        .where(attendances.c.period_number == 1)
+        .where(attendances.c.status == "ABSENT")
+    ),
+    "notification claim": (
+        select(notifications.c.id)
+        .where(notifications.c.status == "PENDING")
+        .where(notifications.c.next_attempt_at <= datetime(2024, 6, 1))
+        .order_by(notifications.c.next_attempt_at)
+        .limit(500)
+        .with_for_update(skip_locked=True)
+    ),
+    "stale notification requeue": (
+        select(notifications.c.id)
+        .where(and_(
+            notifications.c.status == "SENDING",
+            notifications.c.claimed_at < datetime(2024, 6, 1)
+        ))
+    ),
+    "rollup by student": (
+        select(rollup)
+        .where(rollup.c.student_id == 1)
+        .where(rollup.c.date.between(date(2024, 6, 1), date(2024, 12, 31)))
+    ),
+    "rollup by class section": (
+        select(rollup)
+        .where(rollup.c.class_section_id == 1)
+        .where(rollup.c.date.between(date(2024, 6, 1), date(2024, 12, 31)))
+    ),
+    "rollup by subject": (
+        select(rollup)
+        .where(rollup.c.subject_id == 1)
+        .where(rollup.c.date.between(date(2024, 6, 1), date(2024, 12, 31)))
+    ),
+}
+
+# Each of these is bounded to a single month and must prune to one partition
+PRUNED_QUERIES = {
+    "student month range": (
+        select(attendances)
+        .where(attendances.c.student_id == 1)
+        .where(attendances.c.date >= date(2024, 6, 1))
+        .where(attendances.c.date < date(2024, 7, 1))
+    ),
+    "class summary for a day": HOT_QUERIES["class summary for a day"],
+    "absent students in a period": HOT_QUERIES["absent students in a period"],
+}
+
+def seq_scans(plan: dict) -> list:
+    """Return the relations read by Seq Scan nodes anywhere in the plan tree"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+def attendance_partitions(plan: dict) -> set:
+    """Return the student_attendances partitions read anywhere in the plan tree"""
+    found = set()
+    if plan.get("Relation Name", "").startswith("student_attendances"):
+        found.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found |= attendance_partitions(child)
+    return found
+
+def explain(db, query) -> dict:
+    sql = query.compile(
+        dialect=postgresql.dialect(),
+        compile_kwargs={"literal_binds": True}
+    )
+    return db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()[0]["Plan"]
+
+def check_query_plans(db) -> list:
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    failures = []
+    for name, query in HOT_QUERIES.items():
+        scanned = seq_scans(explain(db, query))
+        if scanned:
+            failures.append(name)
+            logger.error(f"{name}: sequential scan on {', '.join(scanned)}")
+        else:
+            logger.info(f"{name}: ok")
+
+    for name, query in PRUNED_QUERIES.items():
+        partitions = attendance_partitions(explain(db, query))
+        if len(partitions) > 1:
+            failures.append(name)
+            logger.error(f"{name}: reads {len(partitions)} partitions instead of one")
+        else:
+            logger.info(f"{name}: pruned")
+    return failures
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        failures = check_query_plans(db)
+    finally:
+        db.rollback()
+        db.close()
+    sys.exit(1 if failures else 0)
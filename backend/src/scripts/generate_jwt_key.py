@@ -0,0 +1,74 @@
+"""
+Add or retire access token signing keys in JWT_KEYS_DIR.
+
+Run with: python -m src.scripts.generate_jwt_key --kid 2026-10 --algorithm ES256
+Writes <kid>.pem, readable by its owner only. The key is published in the
+JWKS after the next restart but only signs once JWT_ACTIVE_KEY_ID names it.
+--retire <kid> replaces a key with its public half (<kid>.pub.pem) so tokens
+it signed keep verifying until they expire. See core/jwt_keys.py.
+"""
+import argparse
+import logging
+import os
+from datetime import date
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+from ..core.config import settings
+from ..core.jwt_keys import PRIVATE_SUFFIX, PUBLIC_SUFFIX
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def generate_private_key(algorithm: str):
+    if algorithm == "RS256":
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return ec.generate_private_key(ec.SECP256R1())
+
+def private_pem(private_key) -> bytes:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    )
+
+def public_pem(public_key) -> bytes:
+    return public_key.public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+def add_key(directory: str, kid: str, algorithm: str) -> None:
+    path = os.path.join(directory, kid + PRIVATE_SUFFIX)
+    if os.path.exists(path) or os.path.exists(os.path.join(directory, kid + PUBLIC_SUFFIX)):
+        raise SystemExit(f"Key {kid!r} already exists in {directory}")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(private_pem(generate_private_key(algorithm)))
+    logger.info(f"Wrote {algorithm} key {path}; set JWT_ACTIVE_KEY_ID={kid} to sign with it")
+
+def retire_key(directory: str, kid: str) -> None:
+    path = os.path.join(directory, kid + PRIVATE_SUFFIX)
+    with open(path, "rb") as f:
+        private_key = serialization.load_pem_private_key(f.read(), password=None)
+    with open(os.path.join(directory, kid + PUBLIC_SUFFIX), "wb") as f:
+        f.write(public_pem(private_key.public_key()))
+    os.remove(path)
+    logger.info(f"Retired key {kid}; it only verifies from now on")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage access token signing keys")
+    parser.add_argument("--dir", default=settings.JWT_KEYS_DIR)
+    parser.add_argument("--kid", default=date.today().strftime("%Y-%m-%d"))
+    parser.add_argument("--algorithm", choices=["RS256", "ES256"], default="RS256")
+    parser.add_argument("--retire", metavar="KID")
+    args = parser.parse_args()
+
+    if not args.dir:
+        parser.error("--dir is required when JWT_KEYS_DIR is not set")
+    os.makedirs(args.dir, exist_ok=True)
+    if args.retire:
+        retire_key(args.dir, args.retire)
+    else:
+        add_key(args.dir, args.kid, args.algorithm)
@@ -0,0 +1,27 @@
+"""
+Create upcoming attendance partitions and detach expired ones, once.
+
+The attendance-partitions compose service (python -m src.workers.attendance_partitions)
+does this on a schedule; run this by hand with:
+python -m src.scripts.maintain_attendance_partitions
+Pass --detach-before 2023-06-01 or set ATTENDANCE_PARTITION_RETENTION_MONTHS to
+detach old months; detached partitions are left as plain tables for archiving.
+"""
+import argparse
+import logging
+from datetime import date
+
+from ..core.config import settings
+from ..workers.attendance_partitions import maintain_partitions, retention_cutoff
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain monthly attendance partitions")
+    parser.add_argument("--months-ahead", type=int, default=settings.ATTENDANCE_PARTITION_MONTHS_AHEAD)
+    parser.add_argument("--detach-before", type=date.fromisoformat, default=None)
+    parser.add_argument("--tablespace", default=settings.ATTENDANCE_ARCHIVE_TABLESPACE)
+    args = parser.parse_args()
+
+    maintain_partitions(args.months_ahead, args.detach_before or retention_cutoff(), args.tablespace)
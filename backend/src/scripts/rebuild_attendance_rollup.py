@@ -0,0 +1,28 @@
+"""
+Rebuild the attendance_daily_rollup table from raw attendance marks.
+
+Run with: python -m src.scripts.rebuild_attendance_rollup --start 2024-06-01 --end 2025-03-31
+Omitting both dates rebuilds the whole table.
+"""
+import argparse
+import logging
+from datetime import date
+
+from ..core.database import SessionLocal
+from ..crud.attendance_rollup import rebuild_attendance_rollup
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill the daily attendance rollup")
+    parser.add_argument("--start", type=date.fromisoformat, default=None)
+    parser.add_argument("--end", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows = rebuild_attendance_rollup(db, start_date=args.start, end_date=args.end)
+        logger.info(f"Rebuilt {rows} attendance rollup rows")
+    finally:
+        db.close()
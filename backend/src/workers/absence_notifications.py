@@ -0,0 +1,74 @@
+"""
+Scheduled job that queues guardian notices for absent students.
+
+Once a period's marking window has closed (its latest end time across class
+sections plus ABSENCE_NOTIFICATION_GRACE_MINUTES), one INSERT ... SELECT
+queues a notice for every student marked absent in it. The notification
+dispatcher delivers them.
+
+Runs as the absence-notifications compose service, or by hand with:
+python -m src.workers.absence_notifications
+Or for a single period: python -m src.workers.absence_notifications --date 2024-01-15 --period 2
+"""
+import argparse
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Set
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..crud import attendance as crud
+
+logger = logging.getLogger(__name__)
+
+def generate_for_period(on_date: date, period_number: int) -> int:
+    db = SessionLocal()
+    try:
+        created = crud.generate_absence_notifications(db, on_date, period_number)
+    finally:
+        db.close()
+    logger.info(f"Queued {created} absence notifications for period {period_number} on {on_date}")
+    return created
+
+def generate_closed_periods(today: date, done: Set[int]) -> None:
+    """Run the job for every period of today that has closed and is not in `done`"""
+    grace = timedelta(minutes=settings.ABSENCE_NOTIFICATION_GRACE_MINUTES)
+    db = SessionLocal()
+    try:
+        closing_times = crud.get_period_closing_times(db, today.weekday())
+    finally:
+        db.close()
+
+    now = datetime.now()
+    for period_number, end_time in closing_times:
+        if period_number in done or datetime.combine(today, end_time) + grace > now:
+            continue
+        generate_for_period(today, period_number)
+        done.add(period_number)
+
+def run(poll_interval: float = settings.ABSENCE_NOTIFICATION_POLL_SECONDS) -> None:
+    # On (re)start every period already closed today is processed once more;
+    # the per-day dedupe makes that harmless
+    logger.info("Absence notification job started")
+    today, done = date.today(), set()
+    while True:
+        if date.today() != today:
+            today, done = date.today(), set()
+        try:
+            generate_closed_periods(today, done)
+        except Exception:
+            logger.exception("Absence notification job error")
+        time.sleep(poll_interval)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Queue notifications for absent students")
+    parser.add_argument("--date", type=date.fromisoformat, default=None)
+    parser.add_argument("--period", type=int, default=None)
+    parser.add_argument("--poll-interval", type=float, default=settings.ABSENCE_NOTIFICATION_POLL_SECONDS)
+    args = parser.parse_args()
+
+    if args.period is not None:
+        generate_for_period(args.date or date.today(), args.period)
+    else:
+        run(args.poll_interval)
@@ -0,0 +1,68 @@
+"""
+Scheduled job that keeps attendance partitions ahead of the calendar.
+
+Every ATTENDANCE_PARTITION_POLL_SECONDS it creates the partitions for the
+current month and the next ATTENDANCE_PARTITION_MONTHS_AHEAD, and detaches
+months older than ATTENDANCE_PARTITION_RETENTION_MONTHS when that is set.
+
+Run with: python -m src.workers.attendance_partitions
+"""
+import argparse
+import logging
+import time
+from datetime import date
+from typing import Optional
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..crud.attendance_partitions import (
+    add_months,
+    month_start,
+    ensure_attendance_partitions,
+    count_default_partition_rows,
+    detach_attendance_partitions
+)
+
+logger = logging.getLogger(__name__)
+
+def retention_cutoff() -> Optional[date]:
+    """First month kept attached, None when every month is kept"""
+    if settings.ATTENDANCE_PARTITION_RETENTION_MONTHS <= 0:
+        return None
+    return add_months(month_start(date.today()), -settings.ATTENDANCE_PARTITION_RETENTION_MONTHS)
+
+def maintain_partitions(
+    months_ahead: int = settings.ATTENDANCE_PARTITION_MONTHS_AHEAD,
+    detach_before: Optional[date] = None,
+    tablespace: Optional[str] = settings.ATTENDANCE_ARCHIVE_TABLESPACE
+) -> None:
+    db = SessionLocal()
+    try:
+        created = ensure_attendance_partitions(db, months_ahead)
+        logger.info(f"Created {len(created)} attendance partitions")
+
+        for table, rows in count_default_partition_rows(db).items():
+            if rows:
+                logger.warning(f"{rows} rows in {table}_default fall outside every monthly partition")
+
+        if detach_before:
+            detached = detach_attendance_partitions(db, detach_before, tablespace)
+            logger.info(f"Detached {len(detached)} attendance partitions before {detach_before}")
+    finally:
+        db.close()
+
+def run(poll_interval: float = settings.ATTENDANCE_PARTITION_POLL_SECONDS) -> None:
+    logger.info("Attendance partition job started")
+    while True:
+        try:
+            maintain_partitions(detach_before=retention_cutoff())
+        except Exception:
+            logger.exception("Attendance partition job error")
+        time.sleep(poll_interval)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep monthly attendance partitions created ahead of time")
+    parser.add_argument("--poll-interval", type=float, default=settings.ATTENDANCE_PARTITION_POLL_SECONDS)
+    args = parser.parse_args()
+
+    run(args.poll_interval)
@@ -0,0 +1,167 @@
+"""
+Background writer that batches attendance audit log entries.
+
+Request handlers hand entries to `audit_log_writer.submit` and return; a
+daemon thread writes them with one multi-row INSERT every
+AUDIT_LOG_FLUSH_INTERVAL_MS or AUDIT_LOG_FLUSH_SIZE entries, whichever comes
+first. Whatever is still buffered is flushed on shutdown.
+
+Nothing is dropped. Once AUDIT_LOG_BUFFER_SIZE entries are buffered the
+submitting request writes its own entries synchronously, and only if that
+insert fails too (the database is down) does it wait for room in the
+buffer. Entries the database rejects outright are logged with their
+contents. /health/audit-log reports the counters.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.attendance import AttendanceAuditLog
+
+logger = logging.getLogger(__name__)
+
+# The plain table, so writes never depend on ORM mapper configuration
+audit_logs = AttendanceAuditLog.__table__
+
+class AuditLogWriter:
+    def __init__(self, flush_interval: float, flush_size: int, buffer_size: int):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=buffer_size)
+        self.spilled = 0
+        self.rejected = 0
+        self._overflowing = False
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        atexit.register(self.stop)
+
+    def start(self) -> None:
+        # Threads do not survive a fork, so each worker process starts its own
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="audit-log-writer", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush everything buffered and stop the writer thread"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if not thread or not thread.is_alive():
+            return
+        self._stopping.set()
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.error(
+                f"Audit log writer did not finish within {timeout}s, "
+                f"{self._queue.qsize()} buffered entries may be lost"
+            )
+
+    def submit(self, entries: Iterable[Dict[str, Any]]) -> None:
+        """Buffer entries for the next flush, writing them here while the buffer is full"""
+        self.start()
+        overflow = []
+        for entry in entries:
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                overflow.append(entry)
+        with self._lock:
+            self.spilled += len(overflow)
+            if overflow and not self._overflowing:
+                logger.warning(
+                    f"Audit log buffer is full ({self._queue.maxsize} entries), "
+                    f"writing entries synchronously until the writer catches up"
+                )
+            elif not overflow and self._overflowing:
+                logger.info(f"Audit log buffer recovered, {self.spilled} entries written synchronously so far")
+            self._overflowing = bool(overflow)
+        if overflow:
+            # Only unwritable when the database is unreachable; wait for room then
+            for entry in self._write(overflow):
+                self._queue.put(entry)
+
+    def stats(self) -> Dict[str, int]:
+        return {"buffered": self._queue.qsize(), "spilled": self.spilled, "rejected": self.rejected}
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        entries = []
+        while len(entries) < limit:
+            try:
+                entries.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return entries
+
+    def _write(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Write a batch with one multi-row INSERT, return the entries to retry"""
+        db = SessionLocal()
+        try:
+            db.execute(insert(audit_logs), entries)
+            db.commit()
+            return []
+        except (IntegrityError, DataError) as e:
+            db.rollback()
+            if len(entries) == 1:
+                with self._lock:
+                    self.rejected += 1
+                logger.error(f"Rejected audit log entry {entries[0]}: {getattr(e, 'orig', e)}")
+                return []
+        except Exception:
+            db.rollback()
+            logger.exception(f"Failed to write {len(entries)} audit log entries")
+            return entries
+        finally:
+            db.close()
+
+        # Retrying cannot fix a bad entry; bisect the batch so only it is rejected
+        middle = len(entries) // 2
+        return self._write(entries[:middle]) + self._write(entries[middle:])
+
+    def _run(self) -> None:
+        pending: List[Dict[str, Any]] = []
+        while True:
+            stopping = self._stopping.is_set()
+            if stopping:
+                pending.extend(self._drain(self._queue.qsize()))
+            else:
+                deadline = time.monotonic() + self.flush_interval
+                while len(pending) < self.flush_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0 or self._stopping.is_set():
+                        break
+                    try:
+                        pending.append(self._queue.get(timeout=timeout))
+                    except queue.Empty:
+                        break
+                    pending.extend(self._drain(self.flush_size - len(pending)))
+
+            if pending:
+                pending = self._write(pending)
+                if pending:
+                    # Keep the batch and retry; submitters write their own entries
+                    # once the buffer fills, and stop() gives up after its timeout
+                    time.sleep(self.flush_interval)
+                    continue
+
+            if stopping:
+                return
+
+audit_log_writer = AuditLogWriter(
+    flush_interval=settings.AUDIT_LOG_FLUSH_INTERVAL_MS / 1000,
+    flush_size=settings.AUDIT_LOG_FLUSH_SIZE,
+    buffer_size=settings.AUDIT_LOG_BUFFER_SIZE
+)
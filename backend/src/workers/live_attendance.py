@@ -0,0 +1,171 @@
+"""
+Fan-out of live attendance progress to dashboard subscribers.
+
+Attendance writes in any process NOTIFY the `attendance_progress` channel
+on commit. Each API process runs one listener thread that collects the
+changed (class section, day) pairs, and a publisher thread that, every
+LIVE_ATTENDANCE_COALESCE_SECONDS, recomputes progress for the changed
+sections someone is watching and hands one update per section to each
+subscriber. A burst of marks for a section therefore costs one query and
+one event per interval, however many subscribers there are.
+
+Both threads start with the first subscription.
+"""
+import asyncio
+import logging
+import select
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from ..core.config import settings
+from ..core.database import SessionLocal, engine
+from ..crud.attendance_live import (
+    PROGRESS_CHANNEL,
+    get_live_progress,
+    parse_progress_payload
+)
+
+logger = logging.getLogger(__name__)
+
+class Subscription:
+    """One subscriber's pending progress updates, consumed on its event loop"""
+
+    def __init__(self, class_section_ids: Optional[Iterable[int]]):
+        self.class_section_ids = set(class_section_ids) if class_section_ids else None
+        self.loop = asyncio.get_running_loop()
+        # At most one update per (class section, day), so a slow subscriber
+        # holds one snapshot per watched section rather than a backlog
+        self.pending: Dict[Tuple[int, date], Dict[str, Any]] = {}
+        self.ready = asyncio.Event()
+
+    def wants(self, class_section_id: int) -> bool:
+        return self.class_section_ids is None or class_section_id in self.class_section_ids
+
+    def offer(self, update: Dict[str, Any]) -> None:
+        # Each update is a full snapshot of its section, so a newer one replaces any not yet sent
+        self.pending[(update["class_section_id"], update["date"])] = update
+        self.ready.set()
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        if not self.pending:
+            self.ready.clear()
+            try:
+                await asyncio.wait_for(self.ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self.pending.pop(next(iter(self.pending)))
+
+class LiveAttendanceBroker:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._subscriptions: Set[Subscription] = set()
+        self._dirty: Set[Tuple[int, date]] = set()
+        self._lock = threading.Lock()
+        self._threads: Dict[str, threading.Thread] = {}
+
+    def start(self) -> None:
+        with self._lock:
+            for name, target in (
+                ("live-attendance-listener", self._listen),
+                ("live-attendance-publisher", self._publish_loop)
+            ):
+                thread = self._threads.get(name)
+                if thread and thread.is_alive():
+                    continue
+                thread = threading.Thread(target=target, name=name, daemon=True)
+                thread.start()
+                self._threads[name] = thread
+
+    def subscribe(self, class_section_ids: Optional[Iterable[int]] = None) -> Subscription:
+        """Must be called from the subscriber's event loop"""
+        subscription = Subscription(class_section_ids)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        self.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def mark_dirty(self, section_days: Iterable[Tuple[int, date]]) -> None:
+        with self._lock:
+            self._dirty.update(section_days)
+
+    def flush(self) -> int:
+        """Publish progress for everything changed since the last flush, return the update count"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            subscriptions = list(self._subscriptions)
+        watched: Dict[date, Set[int]] = {}
+        for class_section_id, day in dirty:
+            if any(subscription.wants(class_section_id) for subscription in subscriptions):
+                watched.setdefault(day, set()).add(class_section_id)
+        if not watched:
+            return 0
+
+        db = SessionLocal()
+        try:
+            updates = [
+                update
+                for day, class_section_ids in watched.items()
+                for update in get_live_progress(db, day, class_section_ids)
+            ]
+        finally:
+            db.close()
+
+        for update in updates:
+            for subscription in subscriptions:
+                if subscription.wants(update["class_section_id"]):
+                    try:
+                        subscription.loop.call_soon_threadsafe(subscription.offer, update)
+                    except RuntimeError:
+                        # The subscriber's event loop has closed
+                        self.unsubscribe(subscription)
+        return len(updates)
+
+    def _publish_loop(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to publish live attendance progress")
+
+    def _listen(self) -> None:
+        # A dedicated connection outside the pool, held for as long as the process runs
+        listen_engine = create_engine(engine.url, poolclass=NullPool)
+        while True:
+            try:
+                connection = listen_engine.raw_connection()
+                try:
+                    self._consume(connection.driver_connection)
+                finally:
+                    connection.close()
+            except Exception:
+                logger.exception("Live attendance listener lost its connection, reconnecting")
+                time.sleep(self.interval)
+
+    def _consume(self, connection) -> None:
+        # Notifications are only delivered between transactions
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {PROGRESS_CHANNEL}")
+        logger.info(f"Listening for {PROGRESS_CHANNEL} notifications")
+        while True:
+            if select.select([connection], [], [], 60.0) == ([], [], []):
+                continue
+            connection.poll()
+            while connection.notifies:
+                notification = connection.notifies.pop(0)
+                try:
+                    self.mark_dirty(parse_progress_payload(notification.payload))
+                except ValueError:
+                    logger.warning(f"Ignoring malformed progress payload {notification.payload!r}")
+
+live_attendance_broker = LiveAttendanceBroker(settings.LIVE_ATTENDANCE_COALESCE_SECONDS)
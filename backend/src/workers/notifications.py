@@ -0,0 +1,168 @@
+"""
+Dispatcher that delivers pending attendance notifications to guardians.
+
+Each round claims a batch of due notifications in one statement, merges
+those for the same guardian and channel into a single message, sends the
+messages through rate-limited channels on a small thread pool and writes
+every outcome back in bulk. Failed sends are retried with exponential
+backoff until NOTIFICATION_MAX_ATTEMPTS.
+
+Runs as the notification-dispatcher compose service, or by hand with:
+python -m src.workers.notifications
+"""
+import argparse
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.notifications import (
+    DeliveryError,
+    GuardianMessage,
+    NotificationChannel,
+    build_channels
+)
+from ..crud import attendance as crud
+
+logger = logging.getLogger(__name__)
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before the next attempt, with jitter so a recovered gateway is not hit all at once"""
+    delay = min(
+        settings.NOTIFICATION_RETRY_MAX_SECONDS,
+        settings.NOTIFICATION_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    )
+    return delay * random.uniform(0.5, 1.0)
+
+def group_by_guardian(rows: Sequence[Any]) -> List[GuardianMessage]:
+    messages: Dict[Tuple[int, str], GuardianMessage] = {}
+    for row in rows:
+        channel = row.channel or settings.NOTIFICATION_DEFAULT_CHANNEL
+        message = messages.get((row.guardian_id, channel))
+        if message is None:
+            message = messages[(row.guardian_id, channel)] = GuardianMessage(
+                guardian_id=row.guardian_id,
+                guardian_name=row.guardian_name,
+                email=row.email,
+                contact_number=row.contact_number,
+                channel=channel,
+                notification_ids=[],
+                attempts=[]
+            )
+        message.notification_ids.append(row.id)
+        message.attempts.append(row.attempts)
+        message.lines.append(row.message)
+    return list(messages.values())
+
+class NotificationDispatcher:
+    def __init__(
+        self,
+        channels: Optional[Dict[str, NotificationChannel]] = None,
+        batch_size: int = settings.NOTIFICATION_BATCH_SIZE,
+        concurrency: int = settings.NOTIFICATION_SEND_CONCURRENCY
+    ):
+        self.channels = channels if channels is not None else build_channels()
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(concurrency, thread_name_prefix="notification-send")
+
+    def dispatch_batch(self, db) -> int:
+        """Claim, send and record one batch, return how many notifications it held"""
+        rows = crud.claim_notifications(db, limit=self.batch_size)
+        if not rows:
+            return 0
+
+        by_channel: Dict[str, List[GuardianMessage]] = {}
+        for message in group_by_guardian(rows):
+            by_channel.setdefault(message.channel, []).append(message)
+
+        delivered: List[int] = []
+        failures: List[Dict[str, Any]] = []
+        pending = []
+        for name, messages in by_channel.items():
+            channel = self.channels.get(name)
+            if channel is None:
+                error = DeliveryError(f"Unknown notification channel {name}", retryable=False)
+                for message in messages:
+                    failures.extend(self._failures(message, error))
+                continue
+            # The channel's token bucket is shared, so splitting only adds concurrency
+            for chunk in (messages[i::self.concurrency] for i in range(self.concurrency)):
+                if chunk:
+                    pending.append((chunk, self._executor.submit(channel.send_batch, chunk)))
+
+        for chunk, future in pending:
+            for message, error in zip(chunk, future.result()):
+                if error is None:
+                    delivered.extend(message.notification_ids)
+                else:
+                    failures.extend(self._failures(message, error))
+
+        crud.record_notification_outcomes(db, delivered, failures)
+        if failures:
+            logger.warning(f"{len(failures)} of {len(rows)} notifications failed to send")
+        return len(rows)
+
+    def _failures(self, message: GuardianMessage, error: DeliveryError) -> List[Dict[str, Any]]:
+        failures = []
+        for notification_id, attempts in zip(message.notification_ids, message.attempts):
+            attempts += 1
+            retry = error.retryable and attempts < settings.NOTIFICATION_MAX_ATTEMPTS
+            failures.append({
+                "notification_id": notification_id,
+                "status": "PENDING" if retry else "FAILED",
+                "attempts": attempts,
+                "error": str(error),
+                "retry_delay": retry_delay(attempts) if retry else 0.0
+            })
+        return failures
+
+    def drain(self) -> int:
+        """Dispatch batches until nothing is due, return how many notifications were handled"""
+        handled = 0
+        db = SessionLocal()
+        try:
+            while True:
+                count = self.dispatch_batch(db)
+                if not count:
+                    break
+                handled += count
+        finally:
+            db.close()
+        return handled
+
+    def requeue_stale(self) -> int:
+        db = SessionLocal()
+        try:
+            return crud.requeue_stale_notifications(db, settings.NOTIFICATION_STALE_AFTER_SECONDS)
+        finally:
+            db.close()
+
+    def run(self, poll_interval: float = settings.NOTIFICATION_POLL_INTERVAL) -> None:
+        logger.info("Notification dispatcher started")
+        while True:
+            try:
+                requeued = self.requeue_stale()
+                if requeued:
+                    logger.warning(f"Requeued {requeued} stale notifications")
+                if not self.drain():
+                    time.sleep(poll_interval)
+            except Exception:
+                logger.exception("Notification dispatcher error")
+                time.sleep(poll_interval)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deliver pending attendance notifications")
+    parser.add_argument("--poll-interval", type=float, default=settings.NOTIFICATION_POLL_INTERVAL)
+    parser.add_argument("--once", action="store_true", help="Drain due notifications once and exit")
+    parser.add_argument("--fake", action="store_true", help="Record messages instead of sending them")
+    args = parser.parse_args()
+
+    dispatcher = NotificationDispatcher(build_channels(fake=args.fake or None))
+    if args.once:
+        logger.info(f"Dispatched {dispatcher.drain()} notifications")
+    else:
+        dispatcher.run(args.poll_interval)
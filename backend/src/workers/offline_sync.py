@@ -0,0 +1,98 @@
+"""
+Worker pool that drains the offline attendance sync queue.
+
+Run with: python -m src.workers.offline_sync --workers 4
+"""
+import argparse
+import logging
+import multiprocessing
+import time
+from datetime import datetime, timedelta
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..crud import attendance as crud
+
+logger = logging.getLogger(__name__)
+
+def drain_offline_syncs(batch_size: int = settings.OFFLINE_SYNC_BATCH_SIZE) -> int:
+    """Process pending syncs until the queue is empty, return how many ran"""
+    processed = 0
+    db = SessionLocal()
+    try:
+        while True:
+            sync_ids = crud.claim_offline_syncs(db, limit=batch_size)
+            if not sync_ids:
+                break
+            for sync_id in sync_ids:
+                try:
+                    crud.process_offline_sync(db, sync_id)
+                except Exception as e:
+                    db.rollback()
+                    logger.exception(f"Error processing offline sync {sync_id}")
+                    status = crud.release_offline_sync(
+                        db, sync_id, str(e), settings.OFFLINE_SYNC_MAX_ATTEMPTS
+                    )
+                    if status == "FAILED":
+                        logger.error(f"Offline sync {sync_id} failed after {settings.OFFLINE_SYNC_MAX_ATTEMPTS} attempts")
+                processed += 1
+    finally:
+        db.close()
+    return processed
+
+def requeue_stale_syncs() -> int:
+    db = SessionLocal()
+    try:
+        claimed_before = datetime.utcnow() - timedelta(
+            seconds=settings.OFFLINE_SYNC_STALE_AFTER_SECONDS
+        )
+        return crud.requeue_stale_offline_syncs(
+            db, claimed_before, settings.OFFLINE_SYNC_MAX_ATTEMPTS
+        )
+    finally:
+        db.close()
+
+def run_worker(poll_interval: float = settings.OFFLINE_SYNC_POLL_INTERVAL) -> None:
+    logger.info(f"Offline sync worker {multiprocessing.current_process().name} started")
+    while True:
+        try:
+            requeued = requeue_stale_syncs()
+            if requeued:
+                logger.warning(f"Requeued {requeued} stale offline syncs")
+            if not drain_offline_syncs():
+                time.sleep(poll_interval)
+        except Exception:
+            logger.exception("Offline sync worker error")
+            time.sleep(poll_interval)
+
+def run_pool(workers: int, poll_interval: float) -> None:
+    # Spawn so that every worker builds its own engine and connection pool
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=run_worker,
+            args=(poll_interval,),
+            name=f"offline-sync-{index}"
+        )
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drain the offline attendance sync queue")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--poll-interval", type=float, default=settings.OFFLINE_SYNC_POLL_INTERVAL)
+    parser.add_argument("--once", action="store_true", help="Drain the queue once in-process and exit")
+    args = parser.parse_args()
+
+    if args.once:
+        logger.info(f"Processed {drain_offline_syncs()} offline syncs")
+    else:
+        run_pool(args.workers, args.poll_interval)
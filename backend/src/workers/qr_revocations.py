@@ -0,0 +1,18 @@
+"""
+Background refresh of revoked QR attendance codes.
+
+Scans are validated against `revoked_qr_tokens` only; this thread folds in
+revocations made by other processes every QR_REVOCATION_REFRESH_SECONDS so
+the scan path never reads the database.
+"""
+from ..core.config import settings
+from ..core.qr_tokens import revoked_qr_tokens
+from ..crud import attendance as crud
+from .revocations import RevocationRefresher
+
+qr_revocation_refresher = RevocationRefresher(
+    "qr-revocation-refresher",
+    settings.QR_REVOCATION_REFRESH_SECONDS,
+    revoked_qr_tokens,
+    crud.get_active_qr_revocations
+)
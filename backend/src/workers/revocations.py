@@ -0,0 +1,56 @@
+"""
+Background refresh of in-memory revocation sets.
+
+Tokens checked against a `core.revocations.RevocationSet` never read the
+database on the request path; a `RevocationRefresher` thread per set folds
+in revocations made by other processes every `interval` seconds. See
+workers/qr_revocations.py and workers/session_revocations.py.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from ..core.database import SessionLocal
+from ..core.revocations import RevocationSet
+
+logger = logging.getLogger(__name__)
+
+class RevocationRefresher:
+    def __init__(
+        self,
+        name: str,
+        interval: float,
+        revocations: RevocationSet,
+        load: Callable[..., Dict[str, float]]
+    ):
+        self.name = name
+        self.interval = interval
+        self.revocations = revocations
+        self.load = load
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name=self.name, daemon=True
+            )
+            self._thread.start()
+
+    def refresh(self) -> None:
+        db = SessionLocal()
+        try:
+            self.revocations.merge(self.load(db))
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception(f"{self.name} failed to refresh revocations")
+            time.sleep(self.interval)
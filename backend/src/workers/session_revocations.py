@@ -0,0 +1,20 @@
+"""
+Background refresh of revoked login sessions.
+
+get_current_user rejects access tokens whose "sid" claim is in
+`security.revoked_sessions`. Logouts, refresh token reuse and password
+changes add to it at once in the process that handled them; this thread
+folds in revocations made by other processes every
+SESSION_REVOCATION_REFRESH_SECONDS.
+"""
+from ..core.config import settings
+from ..core.security import revoked_sessions
+from ..crud.auth import auth_crud
+from .revocations import RevocationRefresher
+
+session_revocation_refresher = RevocationRefresher(
+    "session-revocation-refresher",
+    settings.SESSION_REVOCATION_REFRESH_SECONDS,
+    revoked_sessions,
+    auth_crud.get_active_session_revocations
+)